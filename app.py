@@ -1,17 +1,62 @@
+import os
+import time
+
 from flask import Flask
-from models.database import init_db
+from models.database import get_pool, get_replicas, init_db_session
+from models.lifecycle import start_lifecycle
+from models.notify import start_listener
+from models.timeline import TIMELINE_ENABLED, timeline
 from controllers.events_controller import events_bp
 from controllers.api_controller import api_bp
+from controllers.metrics_controller import init_metrics
+from controllers.json_provider import init_json
+from controllers.compression import init_compression
+from controllers.rate_limit import init_rate_limit
+from controllers.assets import init_assets
+from controllers.health_controller import init_boot
+from cli import register_commands
 
 
 def create_app() -> Flask:
-    app = Flask(__name__)
+    started = time.perf_counter()
+    # Статику раздаёт controllers/assets.py: имена с хэшем и заранее сжатые файлы
+    app = Flask(__name__, static_folder=None)
     app.config["SECRET_KEY"] = "super-secret-key-for-dev"
+    # Кэширование ответов JSON API на стороне клиентов
+    app.config["API_CACHE_CONTROL"] = os.environ.get("API_CACHE_CONTROL", "no-cache")
+    app.config["API_ACTIVE_MAX_AGE"] = int(os.environ.get("API_ACTIVE_MAX_AGE", "30"))
+    # Быстрый JSON (orjson) с датами в ISO-8601 для jsonify() и API
+    init_json(app)
+    init_assets(app, os.path.join(app.root_path, "static"))
 
-    init_db()
+    # Хуки метрик раньше хуков транзакции — чтобы commit попадал во время ответа
+    init_metrics(app)
+    # Лимит запросов — после метрик (429 тоже считаются), до транзакции
+    init_rate_limit(app)
+    # after_request выполняются в обратном порядке: сжатие — после commit
+    # (транзакция не ждёт сжатия), но его время попадает в метрики
+    init_compression(app)
+    init_db_session(app)
 
     app.register_blueprint(events_bp)
     app.register_blueprint(api_bp)
+    register_commands(app)
+
+    # БД, миграции и прогрев — в фоне (models/boot.py): воркер не ждёт базу
+    # при импорте, готовность показывает /readyz
+    warmups = [("pool", get_pool), ("replicas", get_replicas)]
+    # Индекс активных ивентов строим заранее, чтобы первый запрос не ждал загрузки
+    if TIMELINE_ENABLED:
+        warmups.append(("timeline", timeline.load))
+    # Слушатель LISTEN/NOTIFY: сбрасывает кэши, когда данные меняет другой воркер
+    if os.environ.get("DB_CHANGE_LISTENER", "1") != "0":
+        warmups.append(("listener", start_listener))
+    # Деактивация и архивация закончившихся ивентов в потоке воркера; обычно
+    # её запускают отдельным процессом — `flask lifecycle`
+    if os.environ.get("LIFECYCLE_WORKER", "0") == "1":
+        warmups.append(("lifecycle", start_lifecycle))
+    boot = init_boot(app, warmups)
+    boot.record("app", time.perf_counter() - started)
 
     return app
 
@@ -0,0 +1,6 @@
+from app import app as flask_app
+from controllers.async_api_controller import create_asgi_app
+
+# Асинхронный режим: чтение /api на asyncpg, админка и остальное — тот же Flask.
+# Запуск: uvicorn asgi:app --host 0.0.0.0 --port 8000
+app = create_asgi_app(flask_app)
@@ -0,0 +1,27 @@
+"""
+Бенчмарки в стиле pytest-benchmark (нужен пакет pytest-benchmark):
+
+    BENCH_EVENTS=50000 pytest benchmarks/bench_api.py benchmarks/bench_data_layer.py
+
+Файлы называются bench_*.py, чтобы не попадать в обычный прогон тестов.
+"""
+import random
+
+import pytest
+
+from benchmarks.runner import ENDPOINTS
+
+pytest.importorskip("pytest_benchmark")
+
+
+@pytest.mark.parametrize("name", sorted(ENDPOINTS))
+def test_endpoint(benchmark, client, seeded_db, name):
+    path = ENDPOINTS[name]
+
+    def request():
+        url = path.format(event_id=random.choice(seeded_db)) if "{event_id}" in path else path
+        resp = client.get(url)
+        assert resp.status_code == 200
+        return resp
+
+    benchmark(request)
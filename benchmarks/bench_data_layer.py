@@ -0,0 +1,63 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import cache
+from models import event as event_model
+from models import reward as reward_model
+from models.database import fetch_all
+from models.timeline import timeline
+
+pytest.importorskip("pytest_benchmark")
+
+
+@pytest.fixture(autouse=True)
+def no_caches():
+    # Меряем стоимость запросов к БД, а не попадания в кэш
+    names = list(cache.cache_stats())
+    for name in names:
+        cache.configure(name, enabled=False)
+    yield
+    for name in names:
+        cache.configure(name, enabled=True)
+
+
+def test_get_all_events(benchmark, seeded_db):
+    benchmark(event_model.get_all_events)
+
+
+def test_get_active_events(benchmark, seeded_db):
+    benchmark(event_model.get_active_events)
+
+
+def test_active_events_query(benchmark, seeded_db):
+    # Тот же ответ прямо из БД — для сравнения с индексом в памяти
+    benchmark(lambda: fetch_all(event_model.ACTIVE_EVENTS_QUERY, (datetime.utcnow(),) * 2))
+
+
+def test_timeline_in_window(benchmark, seeded_db):
+    now = datetime.utcnow()
+    benchmark(timeline.in_window, now - timedelta(days=1), now + timedelta(days=1))
+
+
+def test_timeline_upcoming(benchmark, seeded_db):
+    benchmark(timeline.upcoming, datetime.utcnow(), 20)
+
+
+def test_get_events_page(benchmark, seeded_db):
+    benchmark(event_model.get_events_page, limit=50)
+
+
+def test_get_event_by_id(benchmark, seeded_db):
+    benchmark(lambda: event_model.get_event_by_id(random.choice(seeded_db)))
+
+
+def test_get_rewards_for_events(benchmark, seeded_db):
+    ids = seeded_db[:100]
+    benchmark(reward_model.get_rewards_for_events, ids)
+
+
+def test_search_events(benchmark, seeded_db):
+    # Редкое слово: GIN-индекс отбирает несколько строк из всей таблицы
+    benchmark(event_model.search_events, "Synthetic 4242", limit=50)
@@ -0,0 +1,44 @@
+"""
+Кодирование ответа /api/events: прежний путь (Flask DefaultJSONProvider,
+stdlib json) против FastJSONProvider на orjson и на stdlib.
+
+    pytest benchmarks/bench_json.py
+"""
+import pytest
+from flask.json.provider import DefaultJSONProvider
+
+from controllers import json_provider
+from controllers.api_controller import _with_rewards
+from models import event as event_model
+from models.event import MAX_PAGE_SIZE
+
+pytest.importorskip("pytest_benchmark")
+
+
+@pytest.fixture(scope="module")
+def payload(app, seeded_db):
+    # Максимальная страница /api/events?include=rewards — самый тяжёлый ответ
+    with app.app_context():
+        page = event_model.get_events_page(limit=MAX_PAGE_SIZE)
+        return _with_rewards(page["items"])
+
+
+def test_encode_flask_default(benchmark, app, payload):
+    provider = DefaultJSONProvider(app)
+    benchmark(lambda: provider.dumps(payload, separators=(",", ":")).encode())
+
+
+@pytest.mark.parametrize("encoder", ["orjson", "stdlib"])
+def test_encode_fast_provider(benchmark, app, payload, monkeypatch, encoder):
+    if encoder == "orjson" and json_provider.orjson is None:
+        pytest.skip("orjson не установлен")
+    monkeypatch.setattr(json_provider, "USE_ORJSON", encoder == "orjson")
+    provider = json_provider.FastJSONProvider(app)
+    benchmark(provider.encode, payload)
+
+
+def test_events_page_cached_body(benchmark, client, seeded_db):
+    # Повторный запрос с тем же ETag: тело берётся готовым из кэша
+    path = f"/api/events?limit={MAX_PAGE_SIZE}&include=rewards"
+    client.get(path)
+    benchmark(lambda: client.get(path).data)
@@ -0,0 +1,35 @@
+import os
+
+import pytest
+
+# Объём данных: BENCH_EVENTS / BENCH_REWARDS_PER_EVENT.
+# ВНИМАНИЕ: таблицы events и rewards очищаются — запускать на отдельной базе.
+BENCH_EVENTS = int(os.environ.get("BENCH_EVENTS", "10000"))
+BENCH_REWARDS_PER_EVENT = int(os.environ.get("BENCH_REWARDS_PER_EVENT", "3"))
+
+
+@pytest.fixture(scope="session")
+def app():
+    # Импорт внутри фикстуры: conftest загружается и при обычном прогоне тестов
+    os.environ.setdefault("DB_CHANGE_LISTENER", "0")
+    from app import create_app
+    from models.boot import current_boot
+
+    app = create_app()
+    current_boot().wait(60)
+    return app
+
+
+@pytest.fixture()
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture(scope="session")
+def seeded_db(app):
+    from benchmarks.seed import reset_tables, sample_event_ids, seed
+
+    reset_tables()
+    seed(BENCH_EVENTS, BENCH_REWARDS_PER_EVENT)
+    yield sample_event_ids()
+    reset_tables()
@@ -0,0 +1,148 @@
+"""
+Сравнение обычной схемы и разделов по месяцам (models/partitions.py).
+
+Пример (база только под бенчмарк — перевод на разделы необратим):
+    python -m benchmarks.partitions --database-url postgresql://.../gameevents_bench_parts \\
+        --reset --events 10000000 --output partitions.json
+
+Наполняем базу, меряем ключевые запросы списка на обычных таблицах,
+переводим их на разделы и меряем снова. Для каждого запроса — перцентили
+задержки и сколько разделов попало в план (EXPLAIN).
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable
+
+from benchmarks.runner import _count_query, bench_callable
+
+
+def _scanned(node: dict[str, Any]) -> set[str]:
+    """Таблицы и разделы, которые читает план."""
+    names = {node["Relation Name"]} if "Relation Name" in node else set()
+    for child in node.get("Plans", ()):
+        names |= _scanned(child)
+    return names
+
+
+def scenarios(now: datetime, event_ids: list[int]) -> dict[str, Callable[[], tuple[str, tuple]]]:
+    """Запрос и параметры для каждого сценария; id ивента — случайный на каждый вызов."""
+    from models import event as event_model
+    from models import reward as reward_model
+
+    # Курсор середины истории: страница «где-то полгода назад»
+    middle = event_model.get_events_page(limit=1, window_end=now - timedelta(days=180))["next_cursor"]
+
+    def page(cursor: str | None = None, window: tuple[datetime, datetime] | None = None) -> tuple[str, tuple]:
+        start, end = window or (None, None)
+        query, params, _ = event_model.events_page_query(50, cursor, None, None, start, end)
+        return query, params
+
+    return {
+        "active": lambda: (event_model.ACTIVE_EVENTS_QUERY, (now, now)),
+        "page_first": lambda: page(),
+        "page_middle": lambda: page(middle),
+        "window_week": lambda: page(window=(now - timedelta(days=100), now - timedelta(days=93))),
+        "event_by_id": lambda: (event_model.EVENT_BY_ID_QUERY + ";", (random.choice(event_ids),)),
+        "rewards_for_event": lambda: (reward_model.REWARDS_FOR_EVENT_QUERY, (random.choice(event_ids),)),
+    }
+
+
+def measure(now: datetime, event_ids: list[int], iterations: int) -> dict[str, Any]:
+    from models.database import fetch_all
+
+    results = {}
+    for name, build in scenarios(now, event_ids).items():
+        query, params = build()
+        plan = fetch_all("EXPLAIN (FORMAT JSON) " + query, params)[0]["QUERY PLAN"][0]["Plan"]
+
+        def run() -> None:
+            fetch_all(*build())
+
+        results[name] = bench_callable(run, iterations)
+        results[name]["relations"] = sorted(_scanned(plan))
+        print(
+            f"[BENCH] {name}: p50 {results[name]['p50_ms']:.3f} мс, "
+            f"таблиц в плане {len(results[name]['relations'])}",
+            file=sys.stderr,
+        )
+    return results
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Бенчмарк GameEvents: разделы по месяцам против обычной схемы")
+    parser.add_argument("--database-url", help="База для прогона (по умолчанию DATABASE_URL)")
+    parser.add_argument("--events", type=int, default=10_000_000, help="Сколько ивентов создать")
+    parser.add_argument("--rewards-per-event", type=int, default=3)
+    parser.add_argument("--reset", action="store_true", help="Очистить events/rewards перед наполнением")
+    parser.add_argument("--no-seed", action="store_true", help="Не наполнять базу, взять текущие данные")
+    parser.add_argument("--iterations", type=int, default=200, help="Вызовов на запрос")
+    parser.add_argument("--output", help="Куда записать JSON с результатами (по умолчанию stdout)")
+    args = parser.parse_args(argv)
+
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    os.environ.setdefault("DB_CHANGE_LISTENER", "0")
+
+    from app import create_app
+    from benchmarks.seed import reset_tables, sample_event_ids, seed
+    from models import partitions
+    from models.boot import current_boot
+    from models.database import add_query_listener, fetch_one
+
+    create_app()
+    if not current_boot().wait(120):
+        sys.exit(f"[BENCH] База не готова: {current_boot().error}")
+    if partitions.is_partitioned():
+        sys.exit("[BENCH] Таблицы уже разбиты на разделы — нужна база с обычной схемой")
+    add_query_listener(_count_query)
+
+    if args.reset:
+        reset_tables()
+    if not args.no_seed:
+        t0 = time.perf_counter()
+        seed(args.events, args.rewards_per_event)
+        print(f"[BENCH] Наполнение: {time.perf_counter() - t0:.1f} с", file=sys.stderr)
+
+    now = datetime.now(timezone.utc)
+    event_ids = sample_event_ids() or [0]
+    results: dict[str, Any] = {
+        "meta": {
+            "timestamp": now.isoformat(),
+            "events": fetch_one("SELECT count(*) AS n FROM events;")["n"],
+            "rewards": fetch_one("SELECT count(*) AS n FROM rewards;")["n"],
+            "iterations": args.iterations,
+        },
+        "plain": measure(now, event_ids, args.iterations),
+    }
+
+    t0 = time.perf_counter()
+    results["meta"]["conversion"] = partitions.partition_tables()
+    results["meta"]["conversion_s"] = round(time.perf_counter() - t0, 3)
+    print(f"[BENCH] Перевод на разделы: {results['meta']['conversion_s']:.1f} с", file=sys.stderr)
+    results["partitioned"] = measure(now, event_ids, args.iterations)
+
+    for name, plain in results["plain"].items():
+        parted = results["partitioned"][name]
+        print(
+            f"{name}: p50 {plain['p50_ms']:.3f} -> {parted['p50_ms']:.3f} мс, "
+            f"p99 {plain['p99_ms']:.3f} -> {parted['p99_ms']:.3f} мс, "
+            f"таблиц в плане {len(parted['relations'])}",
+            file=sys.stderr,
+        )
+
+    output = json.dumps(results, indent=2, ensure_ascii=False, default=str)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            fh.write(output)
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,250 @@
+"""
+Нагрузочный прогон приложения и слоя данных.
+
+Пример:
+    python -m benchmarks.runner --database-url postgresql://.../gameevents_bench \\
+        --reset --events 50000 --concurrency 8 --requests 400 --output bench.json
+    python -m benchmarks.runner --no-seed --compare bench.json
+
+Результат — JSON с перцентилями задержки, пропускной способностью и числом
+SQL-запросов на HTTP-запрос по каждому эндпоинту; --compare сравнивает
+с прошлым прогоном и завершается с кодом 1 при регрессии.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable
+
+# Эндпоинты для прогона; {event_id} подставляется случайным id из базы
+ENDPOINTS = {
+    "index": "/",
+    "event_page": "/events/{event_id}",
+    "api_events": "/api/events",
+    "api_events_limit_500": "/api/events?limit=500",
+    "api_events_include_rewards": "/api/events?include=rewards",
+    "api_active": "/api/events/active",
+    "api_active_include_rewards": "/api/events/active?include=rewards",
+    "api_event_detail": "/api/events/{event_id}",
+    "api_event_rewards": "/api/events/{event_id}/rewards",
+}
+
+_local = threading.local()
+
+
+def _count_query(query: str, duration: float, rowcount: int) -> None:
+    _local.queries = getattr(_local, "queries", 0) + 1
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Перцентиль методом ближайшего ранга."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, min(len(ordered), round(pct / 100 * len(ordered) + 0.5)))
+    return ordered[rank - 1]
+
+
+def summarize(latencies: list[float], elapsed: float, errors: int, queries: list[int]) -> dict[str, Any]:
+    ms = [v * 1000 for v in latencies]
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "mean_ms": round(sum(ms) / len(ms), 3) if ms else 0.0,
+        "p50_ms": round(percentile(ms, 50), 3),
+        "p90_ms": round(percentile(ms, 90), 3),
+        "p99_ms": round(percentile(ms, 99), 3),
+        "max_ms": round(max(ms), 3) if ms else 0.0,
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed > 0 else 0.0,
+        "queries_per_request": round(sum(queries) / len(queries), 2) if queries else 0.0,
+    }
+
+
+def bench_endpoint(app: Any, path: str, event_ids: list[int], requests: int, concurrency: int) -> dict[str, Any]:
+    """Гоняем эндпоинт через WSGI (test client) из concurrency потоков."""
+    latencies: list[float] = []
+    queries: list[int] = []
+    errors = 0
+    lock = threading.Lock()
+
+    def one_request(_: int) -> None:
+        nonlocal errors
+        client = getattr(_local, "client", None)
+        if client is None:
+            client = _local.client = app.test_client()
+        url = path.format(event_id=random.choice(event_ids)) if "{event_id}" in path else path
+
+        _local.queries = 0
+        started = time.perf_counter()
+        resp = client.get(url)
+        resp.get_data()
+        latency = time.perf_counter() - started
+
+        with lock:
+            latencies.append(latency)
+            queries.append(_local.queries)
+            if resp.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one_request, range(requests)))
+    return summarize(latencies, time.perf_counter() - started, errors, queries)
+
+
+def bench_callable(fn: Callable[[], Any], iterations: int) -> dict[str, Any]:
+    """Последовательные вызовы функции слоя данных."""
+    latencies: list[float] = []
+    queries: list[int] = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        _local.queries = 0
+        t0 = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - t0)
+        queries.append(_local.queries)
+    return summarize(latencies, time.perf_counter() - started, 0, queries)
+
+
+def compare(current: dict[str, Any], baseline: dict[str, Any], threshold: float) -> bool:
+    """Печатаем изменения p50/p99 относительно baseline. True — есть регрессия."""
+    regressed = False
+    for section in ("endpoints", "data_layer"):
+        for name, result in current.get(section, {}).items():
+            old = baseline.get(section, {}).get(name)
+            if not old:
+                continue
+            for metric in ("p50_ms", "p99_ms"):
+                before, after = old[metric], result[metric]
+                change = (after - before) / before if before else 0.0
+                mark = ""
+                if change > threshold:
+                    mark = "  <-- регрессия"
+                    regressed = True
+                print(f"{section}.{name}.{metric}: {before:.3f} -> {after:.3f} ({change:+.1%}){mark}")
+    return regressed
+
+
+def _git_revision() -> str | None:
+    try:
+        out = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Бенчмарк GameEvents: эндпоинты и слой данных")
+    parser.add_argument("--database-url", help="База для прогона (по умолчанию DATABASE_URL)")
+    parser.add_argument("--events", type=int, default=10_000, help="Сколько ивентов создать")
+    parser.add_argument("--rewards-per-event", type=int, default=3)
+    parser.add_argument("--reset", action="store_true", help="Очистить events/rewards перед наполнением")
+    parser.add_argument("--no-seed", action="store_true", help="Не наполнять базу, взять текущие данные")
+    parser.add_argument("--requests", type=int, default=200, help="Запросов на эндпоинт")
+    parser.add_argument("--concurrency", type=int, default=8, help="Параллельных клиентов")
+    parser.add_argument("--iterations", type=int, default=50, help="Вызовов на функцию слоя данных")
+    parser.add_argument("--endpoints", help="Через запятую, подмножество: " + ", ".join(ENDPOINTS))
+    parser.add_argument("--disable-caches", action="store_true", help="Выключить кэши моделей")
+    parser.add_argument("--output", help="Куда записать JSON с результатами (по умолчанию stdout)")
+    parser.add_argument("--compare", help="JSON прошлого прогона для сравнения")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Допустимый рост p50/p99 (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    # Настройки модулей читаются при импорте — выставляем окружение заранее
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    os.environ.setdefault("DB_CHANGE_LISTENER", "0")
+    os.environ.setdefault("DB_POOL_MAX", str(max(10, args.concurrency + 2)))
+
+    from app import create_app
+    from benchmarks.seed import reset_tables, sample_event_ids, seed
+    from models import cache
+    from models import event as event_model
+    from models.boot import current_boot
+    from models.database import add_query_listener
+
+    app = create_app()
+    if not current_boot().wait(120):
+        sys.exit(f"[BENCH] База не готова: {current_boot().error}")
+    add_query_listener(_count_query)
+
+    if args.reset:
+        reset_tables()
+    if not args.no_seed:
+        t0 = time.perf_counter()
+        seed(args.events, args.rewards_per_event)
+        print(f"[BENCH] Наполнение: {time.perf_counter() - t0:.1f} с", file=sys.stderr)
+
+    if args.disable_caches:
+        for name in cache.cache_stats():
+            cache.configure(name, enabled=False)
+
+    event_ids = sample_event_ids() or [0]
+    selected = args.endpoints.split(",") if args.endpoints else list(ENDPOINTS)
+
+    results: dict[str, Any] = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "events": _count_rows("events"),
+            "rewards": _count_rows("rewards"),
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "caches_enabled": not args.disable_caches,
+        },
+        "endpoints": {},
+        "data_layer": {},
+    }
+
+    for name in selected:
+        print(f"[BENCH] {name}", file=sys.stderr)
+        results["endpoints"][name] = bench_endpoint(app, ENDPOINTS[name], event_ids, args.requests, args.concurrency)
+
+    # Слой данных меряем без кэшей: интересна стоимость самих запросов
+    saved = {name: stats["enabled"] for name, stats in cache.cache_stats().items()}
+    for name in saved:
+        cache.configure(name, enabled=False)
+    data_layer = {
+        "get_all_events": event_model.get_all_events,
+        "get_active_events": event_model.get_active_events,
+        "get_events_page": lambda: event_model.get_events_page(limit=50),
+        "get_event_by_id": lambda: event_model.get_event_by_id(random.choice(event_ids)),
+    }
+    for name, fn in data_layer.items():
+        print(f"[BENCH] {name}", file=sys.stderr)
+        iterations = max(1, args.iterations // 10) if name == "get_all_events" else args.iterations
+        results["data_layer"][name] = bench_callable(fn, iterations)
+    for name, enabled in saved.items():
+        cache.configure(name, enabled=enabled)
+
+    output = json.dumps(results, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+def _count_rows(table: str) -> int:
+    from models.database import fetch_one
+
+    return fetch_one(f"SELECT count(*) AS n FROM {table};")["n"]
+
+
+if __name__ == "__main__":
+    sys.exit(main())
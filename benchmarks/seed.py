@@ -0,0 +1,68 @@
+from models import partitions
+from models.cache import invalidate_all
+from models.database import execute, fetch_all, fetch_one
+
+EVENT_TYPES = ["Daily", "PvP", "Seasonal", "Quest"]
+REWARD_TYPES = ["Gold", "XP", "Gem", "Item"]
+
+
+def reset_tables() -> None:
+    """Полностью очищаем events и rewards (только для базы под бенчмарки!)."""
+    execute("TRUNCATE rewards, events RESTART IDENTITY CASCADE;")
+    invalidate_all()
+
+
+def seed(events: int, rewards_per_event: int = 3, history_days: int = 365) -> None:
+    """
+    Наполняем базу синтетическими ивентами одним INSERT ... SELECT.
+
+    Старты равномерно распределены по последним history_days дням и
+    ближайшему месяцу, длительность — от часа до недели, каждый пятый
+    ивент выключен. Так часть ивентов активна «сейчас», как в проде.
+    """
+    if events <= 0:
+        return
+
+    # Награды добавляем только новым ивентам, если база уже не пустая
+    last_id = fetch_one("SELECT coalesce(max(id), 0) AS last_id FROM events;")["last_id"]
+    execute(
+        """
+        INSERT INTO events (title, description, event_type, starts_at, ends_at, is_active)
+        SELECT
+            'Bench event ' || g,
+            'Synthetic event #' || g,
+            (%s::text[])[1 + g %% 4],
+            start_at,
+            start_at + ((1 + g %% 168) * interval '1 hour'),
+            g %% 5 <> 0
+        FROM generate_series(1, %s) AS g,
+             LATERAL (
+                 SELECT now() - %s * interval '1 day'
+                        + (g::double precision / %s) * (%s + 30) * interval '1 day' AS start_at
+             ) AS s;
+        """,
+        (EVENT_TYPES, events, history_days, events, history_days),
+    )
+
+    if rewards_per_event > 0:
+        # В схеме с разделами награда хранит starts_at своего ивента
+        starts = ", event_starts_at" if partitions.is_partitioned() else ""
+        execute(
+            f"""
+            INSERT INTO rewards (event_id, reward_type, amount, description{starts})
+            SELECT e.id, (%s::text[])[1 + (e.id + r) %% 4], 10 * r, 'Synthetic reward'{starts and ', e.starts_at'}
+            FROM events AS e, generate_series(1, %s) AS r
+            WHERE e.id > %s;
+            """,
+            (REWARD_TYPES, rewards_per_event, last_id),
+        )
+
+    execute("ANALYZE events;")
+    execute("ANALYZE rewards;")
+    invalidate_all()
+
+
+def sample_event_ids(limit: int = 1000) -> list[int]:
+    """Случайные id ивентов для запросов к /api/events/<id>."""
+    rows = fetch_all("SELECT id FROM events ORDER BY random() LIMIT %s;", (limit,))
+    return [row["id"] for row in rows]
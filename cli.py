@@ -0,0 +1,108 @@
+import json
+import sys
+
+import click
+from flask import Flask
+
+from models import importer
+from models import lifecycle
+from models import partitions
+from models import reward as reward_model
+from models.boot import current_boot
+from models.database import init_db
+
+
+def register_commands(app: Flask) -> None:
+    """Команды `flask ...` для обслуживания приложения."""
+
+    @app.cli.command("import-events")
+    @click.argument("path", type=click.Path(exists=True, dir_okay=False, allow_dash=True))
+    @click.option(
+        "--format",
+        "fmt",
+        type=click.Choice(importer.IMPORT_FORMATS),
+        help="Формат файла; по умолчанию — по расширению.",
+    )
+    @click.option("--skip-invalid", is_flag=True, help="Импортировать корректные записи, даже если есть ошибки.")
+    def import_events_command(path: str, fmt: str | None, skip_invalid: bool) -> None:
+        """Массовый импорт ивентов и наград из JSON / NDJSON / CSV файла."""
+        if fmt is None:
+            fmt = path.rsplit(".", 1)[-1].lower() if "." in path else ""
+            if fmt not in importer.IMPORT_FORMATS:
+                raise click.UsageError("Не удалось определить формат по расширению, укажите --format")
+
+        with click.open_file(path, "rb") as f:
+            data = f.read()
+        try:
+            records = importer.parse_records(data, fmt)
+        except ValueError as exc:
+            raise click.ClickException(str(exc)) from exc
+
+        report = importer.import_records(records, skip_invalid=skip_invalid)
+        for error in report["errors"]:
+            click.echo(f"Запись {error['row']}: {error['error']}", err=True)
+        click.echo(
+            f"Ивентов: {report['events_created']}, наград: {report['rewards_created']}, "
+            f"{report['rows_per_sec']} строк/с"
+        )
+        if report["event_ids"]:
+            click.echo(json.dumps(report["event_ids"], ensure_ascii=False))
+        if not report["committed"]:
+            click.echo("Импорт отменён из-за ошибок в данных", err=True)
+            sys.exit(1)
+
+    @app.cli.command("migrate")
+    @click.option("--retries", type=int, default=5, show_default=True, help="Попыток подключения к БД.")
+    def migrate_command(retries: int) -> None:
+        """Накатываем миграции схемы — один раз перед стартом воркеров (DB_MIGRATE=off)."""
+        init_db(retries=retries)
+
+    @app.cli.command("refresh-reward-summary")
+    @click.option("--event-id", "event_ids", type=int, multiple=True, help="Только эти ивенты (можно несколько раз).")
+    def refresh_reward_summary_command(event_ids: tuple[int, ...]) -> None:
+        """Пересчёт сводки наград в events (заполнение и починка)."""
+        changed = reward_model.refresh_reward_summaries(list(event_ids) or None)
+        click.echo(f"Исправлено ивентов: {changed}")
+
+    @app.cli.command("lifecycle")
+    @click.option("--once", is_flag=True, help="Один проход и выход (например, из cron).")
+    def lifecycle_command(once: bool) -> None:
+        """Планировщик: снимает is_active с закончившихся ивентов и переносит старые в архив."""
+        boot = current_boot()
+        if boot is not None:
+            boot.wait()
+        if once:
+            result = lifecycle.run_lifecycle()
+            click.echo(f"Деактивировано: {result['deactivated']}, в архив: {result['archived']}")
+            return
+
+        worker = lifecycle.start_lifecycle()
+        try:
+            while worker.is_alive():
+                worker.join(1.0)
+        except KeyboardInterrupt:
+            lifecycle.stop_lifecycle(timeout=5.0)
+
+    @app.cli.command("partition-events")
+    @click.option(
+        "--months-ahead",
+        type=int,
+        default=partitions.PARTITION_MONTHS_AHEAD,
+        show_default=True,
+        help="На сколько месяцев вперёд создать разделы.",
+    )
+    def partition_events_command(months_ahead: int) -> None:
+        """
+        Разбиваем events и rewards на разделы по месяцам starts_at. Таблицы
+        заблокированы, пока копируются данные, — запускать в окно обслуживания.
+        """
+        boot = current_boot()
+        if boot is not None:
+            boot.wait()
+        result = partitions.partition_tables(months_ahead=months_ahead)
+        if result["converted"]:
+            click.echo(
+                f"Разделов: {result['partitions']}, ивентов: {result['events']}, наград: {result['rewards']}"
+            )
+        else:
+            click.echo(f"Таблицы уже разбиты, создано разделов: {len(result['created'])}")
@@ -1,39 +1,472 @@
+import hashlib
 from datetime import datetime
+from typing import Any, Callable, Iterator
 
-from flask import Blueprint, jsonify
+from flask import Blueprint, Response, current_app, jsonify, request, url_for
 
+from models import archive as archive_model
 from models import event as event_model
+from models import importer
+from models import push
 from models import reward as reward_model
+from models import versions as versions_model
+from models.cache import to_naive_utc
+from models.database import fresh_reads
+from models.event import MAX_PAGE_SIZE
+
+from .json_provider import cached_body, cached_payload
+from .params import parse_bool, parse_datetime, parse_event_filters, parse_id_list, parse_include, parse_limit
 
 api_bp = Blueprint("api", __name__, url_prefix="/api")
 
 
+def _etag_for(*tables: str, extra: str = "") -> tuple[str, datetime | None]:
+    """
+    ETag и Last-Modified по счётчикам изменений таблиц — без основного запроса.
+    URL входит в ETag, потому что от параметров зависит содержимое ответа.
+    """
+    tag, updated_at = versions_model.data_version(*tables)
+    return _make_etag(tag, extra), updated_at
+
+
+def _make_etag(version_tag: str, extra: str = "") -> str:
+    return make_etag(version_tag, request.full_path, extra)
+
+
+def make_etag(version_tag: str, full_path: str, extra: str = "") -> str:
+    """ETag по версии данных и URL (общий для WSGI и асинхронного API)."""
+    raw = f"{version_tag}|{full_path}|{extra}"
+    return hashlib.sha1(raw.encode()).hexdigest()[:24]
+
+
+def _is_not_modified(etag: str, last_modified: datetime | None) -> bool:
+    # If-None-Match приоритетнее If-Modified-Since (RFC 9110)
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if last_modified is not None and request.if_modified_since is not None:
+        return last_modified.replace(microsecond=0) <= request.if_modified_since
+    return False
+
+
+def _with_rewards(events: list[dict]) -> list[dict]:
+    """Встраиваем награды в ивенты — один запрос на весь список."""
+    rewards = reward_model.get_rewards_for_events([e["id"] for e in events])
+    # Новые словари: исходные могут лежать в кэше моделей
+    return [{**e, "rewards": rewards[e["id"]]} for e in events]
+
+
+def _conditional(
+    etag: str,
+    last_modified: datetime | None,
+    build: Callable[[], Response],
+    cache_control: str | None = None,
+) -> Response:
+    """Отвечаем 304, если у клиента актуальная версия, иначе строим ответ через build()."""
+    if _is_not_modified(etag, last_modified):
+        resp = current_app.response_class(status=304)
+    else:
+        resp = build()
+
+    # Слабый ETag: тело может отличаться байтами (например, при сжатии)
+    resp.set_etag(etag, weak=True)
+    if last_modified is not None:
+        resp.last_modified = last_modified
+    resp.headers["Cache-Control"] = cache_control or current_app.config["API_CACHE_CONTROL"]
+    return resp
+
+
+def _set_page_links(resp: Response, endpoint: str, cursors: dict[str, str | None]) -> None:
+    """Курсоры соседних страниц — в заголовки X-Next-Cursor / X-Prev-Cursor и Link."""
+    links = []
+    for rel, header in (("next", "X-Next-Cursor"), ("prev", "X-Prev-Cursor")):
+        cursor = cursors.get(rel)
+        if cursor is None:
+            continue
+        resp.headers[header] = cursor
+        args = {**request.args.to_dict(), "cursor": cursor}
+        links.append(f'<{url_for(endpoint, **args)}>; rel="{rel}"')
+    if links:
+        resp.headers["Link"] = ", ".join(links)
+
+
 @api_bp.get("/events")
 def api_events():
-    """Все ивенты (для интеграции с внешними клиентами)."""
-    events = event_model.get_all_events()
-    return jsonify(events)
+    """
+    Ивенты постранично (для интеграции с внешними клиентами).
+    Параметры: limit, cursor, event_type, is_active, from, to, include=rewards.
+    Курсоры соседних страниц — в заголовках Link и X-Next-Cursor / X-Prev-Cursor.
+    """
+    try:
+        filters = parse_event_filters(request.args)
+        include = parse_include(request.args, {"rewards"})
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    def encode_page() -> tuple[bytes, dict[str, str | None]]:
+        page = event_model.get_events_page(**filters)
+        items = _with_rewards(page["items"]) if "rewards" in include else page["items"]
+        cursors = {"next": page["next_cursor"], "prev": page["prev_cursor"]}
+        return current_app.json.response_body(items), cursors
+
+    def build() -> Response:
+        # Страница с тем же ETag уже кодировалась — отдаём готовые байты без запроса к БД
+        body, cursors = cached_payload(etag, encode_page)
+        resp = jsonify(body)
+        _set_page_links(resp, "api.api_events", cursors)
+        return resp
+
+    tables = ("events", "rewards") if "rewards" in include else ("events",)
+    etag, last_modified = _etag_for(*tables)
+    try:
+        return _conditional(etag, last_modified, build)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+
+# Сколько строк склеиваем в один кусок потокового ответа
+EXPORT_CHUNK_ROWS = 500
+
+
+def _export_chunks(
+    rows: Iterator[dict[str, Any]],
+    fmt: str,
+    dumps: Callable[[Any], str],
+) -> Iterator[bytes]:
+    """Кодируем строки в JSON-массив или NDJSON порциями по EXPORT_CHUNK_ROWS."""
+
+    def encode(batch: list[str], first: bool) -> bytes:
+        if fmt == "ndjson":
+            return ("\n".join(batch) + "\n").encode()
+        return (("" if first else ",") + ",".join(batch)).encode()
+
+    if fmt == "json":
+        yield b"["
+
+    first = True
+    batch: list[str] = []
+    for row in rows:
+        batch.append(dumps(row))
+        if len(batch) >= EXPORT_CHUNK_ROWS:
+            yield encode(batch, first)
+            first = False
+            batch = []
+    if batch:
+        yield encode(batch, first)
+
+    if fmt == "json":
+        yield b"]"
+
+
+@api_bp.get("/events/export")
+def api_events_export():
+    """
+    Выгрузка всех ивентов потоком (память не растёт с размером таблицы).
+    format=json (массив, по умолчанию) или ndjson; фильтры как у /api/events.
+    """
+    fmt = request.args.get("format", "json")
+    if fmt not in ("json", "ndjson"):
+        return jsonify({"error": "Параметр format должен быть json или ndjson"}), 400
+    try:
+        filters = parse_event_filters(request.args)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    filters.pop("limit")
+    filters.pop("cursor")
+
+    # Генератор читает из БД уже после выхода из обработчика, без контекста
+    # приложения — поэтому json.dumps берём заранее
+    rows = event_model.iter_events_for_export(**filters)
+    chunks = _export_chunks(rows, fmt, current_app.json.dumps)
+    mimetype = "application/x-ndjson" if fmt == "ndjson" else "application/json"
+    resp = current_app.response_class(chunks, mimetype=mimetype)
+    resp.headers["Content-Disposition"] = f'attachment; filename="events.{fmt}"'
+    resp.headers["Cache-Control"] = "no-store"
+    return resp
 
 
 @api_bp.get("/events/active")
 def api_active_events():
-    """Активные ивенты на текущий момент."""
+    """
+    Активные ивенты на текущий момент (include=rewards — вместе с наградами).
+    max-age не больше API_ACTIVE_MAX_AGE и не дальше ближайшего старта/окончания ивента.
+    """
+    try:
+        include = parse_include(request.args, {"rewards"})
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    # Версию читаем до данных, чтобы ETag не оказался новее ответа
+    tables = ("events", "rewards") if "rewards" in include else ("events",)
+    version_tag, _ = versions_model.data_version(*tables)
+    now = datetime.utcnow()
+    _, valid_until = event_model.get_active_events_snapshot(now)
+
+    max_age = current_app.config["API_ACTIVE_MAX_AGE"]
+    if valid_until is not None:
+        until_boundary = (to_naive_utc(valid_until) - now).total_seconds()
+        max_age = max(0, min(max_age, int(until_boundary)))
+
+    def active() -> list[dict]:
+        # Тело — из БД (cached_body): снимок выше мог быть из кэша до уведомления
+        fresh = event_model.get_active_events(now)
+        return _with_rewards(fresh) if "rewards" in include else fresh
+
+    # Набор активных ивентов меняется и со временем, поэтому граница входит в ETag
+    etag = _make_etag(version_tag, valid_until.isoformat() if valid_until else "")
+    return _conditional(
+        etag,
+        None,
+        lambda: jsonify(cached_body(etag, active)),
+        cache_control=f"public, max-age={max_age}",
+    )
+
+
+@api_bp.get("/events/stream")
+def api_events_stream():
+    """
+    Поток Server-Sent Events: started/ended — ивент начался или закончился,
+    created/updated/deleted — изменения данных, resync — часть сообщений
+    потеряна, стоит перечитать /api/events/active. После переподключения
+    браузер сам присылает Last-Event-ID, и пропущенное досылается.
+
+    Каждый клиент держит поток воркера — для тысяч клиентов запускайте
+    асинхронный режим (asgi.py).
+    """
+    subscription = push.Subscription()
+    broadcaster = push.broadcaster
+    replay = broadcaster.subscribe(subscription, request.headers.get("Last-Event-ID"))
+    dumps = current_app.json.dumps
+
+    def generate() -> Iterator[bytes]:
+        try:
+            yield push.SSE_RETRY
+            for message in replay:
+                yield message.encode(dumps)
+            while True:
+                message = subscription.get(timeout=push.PUSH_HEARTBEAT)
+                if message is None:
+                    yield push.SSE_HEARTBEAT
+                elif message is push.OVERFLOW:
+                    # Клиент не успевает читать: просим перечитать состояние и переподключиться
+                    yield push.PushMessage("", "resync", {}).encode(dumps)
+                    return
+                else:
+                    yield message.encode(dumps)
+        finally:
+            broadcaster.unsubscribe(subscription)
+
+    resp = current_app.response_class(generate(), mimetype="text/event-stream")
+    resp.headers["Cache-Control"] = "no-cache"
+    # nginx не должен буферизовать поток
+    resp.headers["X-Accel-Buffering"] = "no"
+    return resp
+
+
+@api_bp.get("/events/search")
+def api_events_search():
+    """
+    Поиск ивентов по названию, типу и описанию: q (обязателен), limit, cursor
+    и те же фильтры, что у /api/events. Лучшие совпадения первыми, у каждого
+    ивента — rank. Курсор следующей страницы — в X-Next-Cursor и Link.
+    """
+    try:
+        filters = parse_event_filters(request.args)
+        text = request.args.get("q", "").strip()
+        if not text:
+            raise ValueError("Параметр q обязателен")
+        event_model.search_tsquery(text)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    def build() -> Response:
+        page = event_model.search_events(text, **filters)
+        resp = jsonify(page["items"])
+        _set_page_links(resp, "api.api_events_search", {"next": page["next_cursor"]})
+        return resp
+
+    etag, last_modified = _etag_for("events")
+    try:
+        return _conditional(etag, last_modified, build)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+
+@api_bp.get("/events/upcoming")
+def api_upcoming_events():
+    """
+    Ближайшие ивенты по индексу в памяти: boundary=start — которые начнутся
+    (по умолчанию), boundary=end — которые закончатся. Параметры: limit, from
+    (по умолчанию — сейчас).
+    """
+    try:
+        limit = parse_limit(request.args)
+        after = parse_datetime(request.args.get("from"), "from")
+        boundary = request.args.get("boundary", "start")
+        if boundary not in ("start", "end"):
+            raise ValueError("Параметр boundary должен быть start или end")
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    version_tag, _ = versions_model.data_version("events")
     now = datetime.utcnow()
-    events = event_model.get_active_events(now)
-    return jsonify(events)
+    events = event_model.get_upcoming_events(after or now, limit, boundary)
+
+    # Без from список сдвигается со временем: ближайшая граница входит в ETag,
+    # а кэшировать ответ можно не дольше, чем до неё
+    field = "starts_at" if boundary == "start" else "ends_at"
+    first = events[0][field] if events else None
+    cache_control = None
+    if after is None:
+        max_age = current_app.config["API_ACTIVE_MAX_AGE"]
+        if first is not None:
+            max_age = max(0, min(max_age, int((to_naive_utc(first) - now).total_seconds())))
+        cache_control = f"public, max-age={max_age}"
+
+    etag = _make_etag(version_tag, first.isoformat() if first else "")
+    # Тело — из БД (cached_body): индекс мог ещё не применить запись,
+    # с которой началась версия в ETag
+    return _conditional(
+        etag,
+        None,
+        lambda: jsonify(cached_body(etag, lambda: event_model.get_upcoming_events(after or now, limit, boundary))),
+        cache_control=cache_control,
+    )
+
+
+@api_bp.get("/events/window")
+def api_events_in_window():
+    """
+    Активные ивенты, пересекающиеся с окном [from, to] (оба параметра обязательны),
+    по времени старта. limit — не больше MAX_PAGE_SIZE (по умолчанию столько же).
+    """
+    try:
+        window_start = parse_datetime(request.args.get("from"), "from")
+        window_end = parse_datetime(request.args.get("to"), "to")
+        if window_start is None or window_end is None:
+            raise ValueError("Параметры from и to обязательны")
+        if to_naive_utc(window_end) < to_naive_utc(window_start):
+            raise ValueError("Параметр to раньше from")
+        limit = parse_limit(request.args, default=MAX_PAGE_SIZE)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    etag, last_modified = _etag_for("events")
+    return _conditional(
+        etag,
+        last_modified,
+        lambda: jsonify(cached_body(etag, lambda: event_model.get_events_in_window(window_start, window_end, limit))),
+    )
 
 
 @api_bp.get("/events/<int:event_id>")
 def api_event_detail(event_id: int):
     """Информация об одном ивенте."""
-    ev = event_model.get_event_by_id(event_id)
-    if ev is None:
-        return jsonify({"error": "Event not found"}), 404
-    return jsonify(ev)
+    etag, last_modified = _etag_for("events")
+
+    ev = None
+    if not _is_not_modified(etag, last_modified):
+        # Мимо кэша моделей: он мог ещё не получить уведомление о записи,
+        # с которой началась версия в ETag
+        with fresh_reads():
+            ev = event_model.get_event_by_id(event_id)
+        if ev is None:
+            return jsonify({"error": "Event not found"}), 404
+    return _conditional(etag, last_modified, lambda: jsonify(ev))
 
 
 @api_bp.get("/events/<int:event_id>/rewards")
 def api_event_rewards(event_id: int):
     """Награды для ивента."""
-    rewards = reward_model.get_rewards_for_event(event_id)
-    return jsonify(rewards)
+    etag, last_modified = _etag_for("rewards")
+    return _conditional(
+        etag,
+        last_modified,
+        lambda: jsonify(cached_body(etag, lambda: reward_model.get_rewards_for_event(event_id))),
+    )
+
+
+@api_bp.get("/rewards")
+def api_rewards_bulk():
+    """Награды для нескольких ивентов сразу: /api/rewards?event_ids=1,2,3."""
+    try:
+        event_ids = parse_id_list(request.args.get("event_ids"), "event_ids")
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    etag, last_modified = _etag_for("rewards")
+    return _conditional(
+        etag,
+        last_modified,
+        lambda: jsonify({str(k): v for k, v in reward_model.get_rewards_for_events(event_ids).items()}),
+    )
+
+
+@api_bp.get("/archive/events")
+def api_archive_events():
+    """
+    Архив: ивенты, закончившиеся больше EVENT_ARCHIVE_AFTER_DAYS дней назад.
+    Параметры, порядок и курсоры — как у /api/events (include=rewards тоже).
+    """
+    try:
+        filters = parse_event_filters(request.args)
+        include = parse_include(request.args, {"rewards"})
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    def build() -> Response:
+        page = archive_model.get_archived_events_page(**filters)
+        items = page["items"]
+        if "rewards" in include:
+            rewards = archive_model.get_archived_rewards_for_events([e["id"] for e in items])
+            items = [{**e, "rewards": rewards[e["id"]]} for e in items]
+        resp = jsonify(items)
+        _set_page_links(resp, "api.api_archive_events", {"next": page["next_cursor"], "prev": page["prev_cursor"]})
+        return resp
+
+    tables = ("events_archive", "rewards_archive") if "rewards" in include else ("events_archive",)
+    etag, last_modified = _etag_for(*tables)
+    try:
+        return _conditional(etag, last_modified, build)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+
+@api_bp.get("/archive/events/<int:event_id>")
+def api_archived_event_detail(event_id: int):
+    """Ивент из архива вместе с наградами."""
+    etag, last_modified = _etag_for("events_archive", "rewards_archive")
+
+    ev = None
+    if not _is_not_modified(etag, last_modified):
+        ev = archive_model.get_archived_event(event_id)
+        if ev is None:
+            return jsonify({"error": "Event not found"}), 404
+    return _conditional(etag, last_modified, lambda: jsonify(ev))
+
+
+_IMPORT_MIMETYPES = {
+    "application/json": "json",
+    "application/x-ndjson": "ndjson",
+    "text/csv": "csv",
+}
+
+
+@api_bp.post("/import")
+def api_import():
+    """
+    Массовый импорт ивентов и наград (JSON, NDJSON или CSV в теле запроса).
+    Формат — из параметра format или Content-Type. skip_invalid=true —
+    импортировать корректные записи, даже если есть ошибки.
+    """
+    fmt = request.args.get("format") or _IMPORT_MIMETYPES.get(request.mimetype)
+    try:
+        if fmt not in importer.IMPORT_FORMATS:
+            raise ValueError(f"Формат должен быть одним из: {', '.join(importer.IMPORT_FORMATS)}")
+        skip_invalid = parse_bool(request.args.get("skip_invalid"), "skip_invalid") or False
+        records = importer.parse_records(request.get_data(), fmt)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    report = importer.import_records(records, skip_invalid=skip_invalid)
+    # Ничего не записали из-за ошибок в данных — 422 с построчным отчётом
+    return jsonify(report), 200 if report["committed"] else 422
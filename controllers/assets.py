@@ -0,0 +1,139 @@
+import hashlib
+import mimetypes
+import os
+import threading
+from typing import Any
+
+from flask import Flask, Response, abort, current_app, request
+
+from .compression import COMPRESS_MIN_SIZE, ENCODINGS, choose_encoding, compress, is_compressible
+
+# Файлы с хэшем в имени не меняются — браузер может хранить их год
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+class Asset:
+    """Статический файл в памяти: хэш содержимого и заранее сжатые варианты."""
+
+    __slots__ = ("filename", "hashed_name", "mimetype", "etag", "mtime", "bodies")
+
+    def __init__(self, filename: str, path: str) -> None:
+        with open(path, "rb") as f:
+            data = f.read()
+        self.filename = filename
+        self.mtime = os.path.getmtime(path)
+        digest = hashlib.sha256(data).hexdigest()[:12]
+        self.etag = digest
+        root, ext = os.path.splitext(filename)
+        self.hashed_name = f"{root}.{digest}{ext}"
+        self.mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+
+        # Сжимаем один раз при загрузке, а не на каждый запрос
+        self.bodies: dict[str | None, bytes] = {None: data}
+        if is_compressible(self.mimetype) and len(data) >= COMPRESS_MIN_SIZE:
+            for encoding in ENCODINGS:
+                self.bodies[encoding] = compress(data, encoding)
+
+
+class AssetManifest:
+    """
+    Все файлы static/: исходное имя -> Asset и имя с хэшем -> Asset.
+    С reload=True (режим отладки) изменённый файл перечитывается при обращении.
+    """
+
+    def __init__(self, folder: str) -> None:
+        self.folder = folder
+        self._lock = threading.Lock()
+        self._by_name: dict[str, Asset] = {}
+        self._by_hashed_name: dict[str, Asset] = {}
+        self.scan()
+
+    def scan(self) -> None:
+        by_name, by_hashed_name = {}, {}
+        for root, _, files in os.walk(self.folder):
+            for name in files:
+                path = os.path.join(root, name)
+                filename = os.path.relpath(path, self.folder).replace(os.sep, "/")
+                asset = Asset(filename, path)
+                by_name[filename] = asset
+                by_hashed_name[asset.hashed_name] = asset
+        with self._lock:
+            self._by_name, self._by_hashed_name = by_name, by_hashed_name
+        print(f"[ASSETS] Статика загружена: {len(by_name)} файлов")
+
+    def _refresh(self, asset: Asset) -> Asset:
+        path = os.path.join(self.folder, asset.filename)
+        try:
+            changed = os.path.getmtime(path) != asset.mtime
+        except OSError:
+            return asset
+        if not changed:
+            return asset
+        fresh = Asset(asset.filename, path)
+        with self._lock:
+            self._by_name[fresh.filename] = fresh
+            self._by_hashed_name[fresh.hashed_name] = fresh
+        return fresh
+
+    def get(self, filename: str, reload: bool = False) -> Asset | None:
+        asset = self._by_name.get(filename)
+        if asset is not None and reload:
+            asset = self._refresh(asset)
+        return asset
+
+    def resolve(self, filename: str, reload: bool = False) -> tuple[Asset | None, bool]:
+        """Asset по исходному имени или имени с хэшем; второе значение — «имя с хэшем»."""
+        asset = self._by_hashed_name.get(filename)
+        if asset is not None:
+            return asset, True
+        return self.get(filename, reload), False
+
+    def hashed_url_name(self, filename: str, reload: bool = False) -> str:
+        asset = self.get(filename, reload)
+        return asset.hashed_name if asset is not None else filename
+
+
+def serve_static(filename: str) -> Response:
+    """
+    /static/<filename>: по имени с хэшем — навсегда кэшируемый файл, по
+    исходному имени — с проверкой ETag (для старых ссылок и внешних клиентов).
+    """
+    manifest: AssetManifest = current_app.extensions["assets"]
+    asset, hashed = manifest.resolve(filename, reload=current_app.debug)
+    if asset is None:
+        abort(404)
+
+    encoding = choose_encoding(request.headers.get("Accept-Encoding"))
+    if encoding not in asset.bodies:
+        encoding = None
+    # Сильный ETag на каждый вариант: байты сжатого и исходного файла разные
+    etag = f"{asset.etag}-{encoding}" if encoding else asset.etag
+
+    if request.if_none_match.contains(etag):
+        resp = current_app.response_class(status=304)
+    else:
+        resp = current_app.response_class(asset.bodies[encoding], mimetype=asset.mimetype)
+        if encoding:
+            resp.headers["Content-Encoding"] = encoding
+    resp.set_etag(etag)
+    if len(asset.bodies) > 1:
+        resp.vary.add("Accept-Encoding")
+    resp.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL if hashed else "no-cache"
+    return resp
+
+
+def _hashed_static_url(endpoint: str, values: dict[str, Any]) -> None:
+    # url_for('static', filename='css/styles.css') -> /static/css/styles.<хэш>.css
+    if endpoint == "static" and "filename" in values:
+        manifest: AssetManifest = current_app.extensions["assets"]
+        values["filename"] = manifest.hashed_url_name(values["filename"], reload=current_app.debug)
+
+
+def init_assets(app: Flask, folder: str) -> None:
+    """
+    Раздаём static/ из памяти вместо стандартного маршрута Flask.
+    Приложение должно быть создано с static_folder=None.
+    """
+    app.extensions["assets"] = AssetManifest(folder)
+    app.add_url_rule("/static/<path:filename>", endpoint="static", view_func=serve_static)
+    app.url_defaults(_hashed_static_url)
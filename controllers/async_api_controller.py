@@ -0,0 +1,368 @@
+import asyncio
+import time
+import traceback
+from datetime import datetime
+from typing import Any, Awaitable, Callable
+from urllib.parse import parse_qsl, urlencode
+
+from a2wsgi import WSGIMiddleware
+from flask import Flask
+from werkzeug.datastructures import Headers, MultiDict
+from werkzeug.exceptions import HTTPException
+from werkzeug.http import http_date, parse_date, parse_etags, quote_etag, unquote_etag
+from werkzeug.routing import Map, Rule
+
+from models import metrics
+from models import push
+from models.aio import database as aio_db
+from models.aio import event as aio_event
+from models.aio import reward as aio_reward
+from models.aio import versions as aio_versions
+from models.cache import to_naive_utc
+from models.database import fresh_reads
+
+from . import rate_limit
+from .api_controller import make_etag
+from .compression import COMPRESS_MIN_SIZE, choose_encoding, compressed_body
+from .params import parse_event_filters, parse_id_list, parse_include
+
+# Маршруты, которые обслуживаются асинхронно. Всё остальное (админка,
+# экспорт, импорт) уходит в обычное Flask-приложение.
+url_map = Map(
+    [
+        Rule("/api/events", endpoint="events", methods=["GET"]),
+        Rule("/api/events/active", endpoint="active_events", methods=["GET"]),
+        Rule("/api/events/stream", endpoint="events_stream", methods=["GET"]),
+        Rule("/api/events/<int:event_id>", endpoint="event_detail", methods=["GET"]),
+        Rule("/api/events/<int:event_id>/rewards", endpoint="event_rewards", methods=["GET"]),
+        Rule("/api/rewards", endpoint="rewards_bulk", methods=["GET"]),
+    ]
+)
+
+
+class AsyncRequest:
+    """Минимальный запрос поверх ASGI scope: путь, query-параметры, заголовки."""
+
+    def __init__(self, scope: dict[str, Any]) -> None:
+        self.method: str = scope["method"]
+        self.path: str = scope["path"]
+        self.query_string: str = scope.get("query_string", b"").decode("latin-1")
+        self.args = MultiDict(parse_qsl(self.query_string, keep_blank_values=True))
+        self.headers = Headers([(k.decode("latin-1"), v.decode("latin-1")) for k, v in scope.get("headers", ())])
+
+    @property
+    def full_path(self) -> str:
+        # Как werkzeug.Request.full_path — чтобы ETag совпадал с WSGI-режимом
+        return f"{self.path}?{self.query_string}"
+
+
+class AsyncResponse:
+    def __init__(self, body: bytes = b"", status: int = 200, mimetype: str | None = "application/json") -> None:
+        self.body = body
+        self.status = status
+        self.headers = Headers()
+        if mimetype is not None:
+            self.headers["Content-Type"] = mimetype
+
+
+Handler = Callable[..., Awaitable[AsyncResponse]]
+
+
+class AsyncApi:
+    """
+    ASGI-приложение: чтение JSON API на asyncpg, остальное — Flask через WSGI.
+
+    Обработчики повторяют controllers/api_controller.py (те же параметры,
+    ETag, Cache-Control и формат JSON), но не занимают поток на время
+    ожидания PostgreSQL — один процесс держит тысячи опрашивающих клиентов.
+    """
+
+    def __init__(self, flask_app: Flask) -> None:
+        self.flask_app = flask_app
+        self.fallback = WSGIMiddleware(flask_app)
+        self.adapter = url_map.bind("localhost")
+        self.dumps = flask_app.json.dumps
+        self.handlers: dict[str, Handler] = {
+            "events": self.api_events,
+            "active_events": self.api_active_events,
+            "event_detail": self.api_event_detail,
+            "event_rewards": self.api_event_rewards,
+            "rewards_bulk": self.api_rewards_bulk,
+        }
+
+    async def __call__(self, scope: dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+
+        rule = None
+        if scope["type"] == "http":
+            try:
+                rule, values = self.adapter.match(scope["path"], method=scope["method"], return_rule=True)
+            except HTTPException:
+                rule = None
+        if rule is None:
+            await self.fallback(scope, receive, send)
+            return
+
+        request = AsyncRequest(scope)
+        # Лимиты — те же, что у WSGI: эндпоинты называются как в api_controller
+        client = rate_limit.client_key(request.headers, (scope.get("client") or ("",))[0])
+        retry_after = await rate_limit.take_async(self.flask_app, f"api.api_{rule.endpoint}", True, client)
+        if retry_after > 0:
+            response = self._json(rate_limit.TOO_MANY_REQUESTS, 429)
+            response.headers["Retry-After"] = rate_limit.retry_after_header(retry_after)
+            response.headers["Cache-Control"] = "no-store"
+            await self._send(send, response, head=request.method == "HEAD")
+            return
+
+        if rule.endpoint == "events_stream":
+            await self.api_events_stream(request, receive, send)
+            return
+
+        started = time.perf_counter()
+        try:
+            response = await self.handlers[rule.endpoint](request, **values)
+        except Exception:
+            traceback.print_exc()
+            response = self._json({"error": "Internal Server Error"}, 500)
+
+        duration = time.perf_counter() - started
+        registry = metrics.registry
+        registry.inc("gameevents_http_requests_total", endpoint=rule.rule, method=request.method, status=response.status)
+        registry.observe("gameevents_http_request_duration_seconds", duration, endpoint=rule.rule, method=request.method)
+        if self.flask_app.config.get("SERVER_TIMING"):
+            response.headers["Server-Timing"] = f"app;dur={duration * 1000:.2f}"
+        registry.flush()
+
+        _compress(request, response)
+        await self._send(send, response, head=request.method == "HEAD")
+
+    async def _lifespan(self, receive: Callable, send: Callable) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await aio_db.get_pool()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await aio_db.close_pool()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    @staticmethod
+    async def _send(send: Callable, response: AsyncResponse, head: bool = False) -> None:
+        response.headers["Content-Length"] = str(len(response.body))
+        await send(
+            {
+                "type": "http.response.start",
+                "status": response.status,
+                "headers": [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in response.headers.items()],
+            }
+        )
+        await send({"type": "http.response.body", "body": b"" if head else response.body})
+
+    def _json(self, data: Any, status: int = 200) -> AsyncResponse:
+        # Тот же провайдер и формат, что у jsonify() в WSGI-режиме
+        return AsyncResponse(self.flask_app.json.response_body(data), status)
+
+    def _conditional(
+        self,
+        request: AsyncRequest,
+        etag: str,
+        last_modified: datetime | None,
+        data: Any = None,
+        cache_control: str | None = None,
+    ) -> AsyncResponse:
+        """Как api_controller._conditional: 304, если у клиента актуальная версия, иначе JSON с data."""
+        if _is_not_modified(request, etag, last_modified):
+            response = AsyncResponse(status=304, mimetype=None)
+        else:
+            response = self._json(data)
+
+        response.headers["ETag"] = quote_etag(etag, weak=True)
+        if last_modified is not None:
+            response.headers["Last-Modified"] = http_date(last_modified)
+        response.headers["Cache-Control"] = cache_control or self.flask_app.config["API_CACHE_CONTROL"]
+        return response
+
+    async def api_events_stream(self, request: AsyncRequest, receive: Callable, send: Callable) -> None:
+        """SSE-поток как у api_controller.api_events_stream, но клиент не занимает поток."""
+        subscription = push.AsyncSubscription(asyncio.get_running_loop())
+        broadcaster = push.broadcaster
+        replay = broadcaster.subscribe(subscription, request.headers.get("Last-Event-ID"))
+
+        async def wait_disconnect() -> None:
+            while (await receive())["type"] != "http.disconnect":
+                pass
+
+        # Клиент закрыл соединение — узнаём из receive(), не дожидаясь записи
+        disconnect = asyncio.ensure_future(wait_disconnect())
+        try:
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": 200,
+                    "headers": [
+                        (b"content-type", b"text/event-stream; charset=utf-8"),
+                        (b"cache-control", b"no-cache"),
+                        (b"x-accel-buffering", b"no"),
+                    ],
+                }
+            )
+            chunks = [push.SSE_RETRY] + [m.encode(self.dumps) for m in replay]
+            await send({"type": "http.response.body", "body": b"".join(chunks), "more_body": True})
+            while True:
+                next_message = asyncio.ensure_future(subscription.get(timeout=push.PUSH_HEARTBEAT))
+                await asyncio.wait({next_message, disconnect}, return_when=asyncio.FIRST_COMPLETED)
+                if disconnect.done():
+                    next_message.cancel()
+                    return
+
+                message = next_message.result()
+                if message is None:
+                    body = push.SSE_HEARTBEAT
+                elif message is push.OVERFLOW:
+                    body = push.PushMessage("", "resync", {}).encode(self.dumps)
+                    await send({"type": "http.response.body", "body": body, "more_body": False})
+                    return
+                else:
+                    body = message.encode(self.dumps)
+                await send({"type": "http.response.body", "body": body, "more_body": True})
+        finally:
+            broadcaster.unsubscribe(subscription)
+            disconnect.cancel()
+
+    async def api_events(self, request: AsyncRequest) -> AsyncResponse:
+        try:
+            filters = parse_event_filters(request.args)
+            include = parse_include(request.args, {"rewards"})
+        except ValueError as exc:
+            return self._json({"error": str(exc)}, 400)
+
+        tables = ("events", "rewards") if "rewards" in include else ("events",)
+        version, last_modified = await aio_versions.data_version(*tables)
+        etag = make_etag(version, request.full_path)
+        if _is_not_modified(request, etag, last_modified):
+            return self._conditional(request, etag, last_modified)
+
+        try:
+            page = await aio_event.get_events_page(**filters)
+        except ValueError as exc:
+            return self._json({"error": str(exc)}, 400)
+        items = await _with_rewards(page["items"]) if "rewards" in include else page["items"]
+        response = self._conditional(request, etag, last_modified, items)
+
+        links = []
+        for rel, key, header in (
+            ("next", "next_cursor", "X-Next-Cursor"),
+            ("prev", "prev_cursor", "X-Prev-Cursor"),
+        ):
+            cursor = page[key]
+            if cursor is None:
+                continue
+            response.headers[header] = cursor
+            args = {**request.args.to_dict(), "cursor": cursor}
+            links.append(f'<{request.path}?{urlencode(args)}>; rel="{rel}"')
+        if links:
+            response.headers["Link"] = ", ".join(links)
+        return response
+
+    async def api_active_events(self, request: AsyncRequest) -> AsyncResponse:
+        try:
+            include = parse_include(request.args, {"rewards"})
+        except ValueError as exc:
+            return self._json({"error": str(exc)}, 400)
+
+        # Версию читаем до данных, чтобы ETag не оказался новее ответа
+        tables = ("events", "rewards") if "rewards" in include else ("events",)
+        version, _ = await aio_versions.data_version(*tables)
+        now = datetime.utcnow()
+        _, valid_until = await aio_event.get_active_events_snapshot(now)
+
+        max_age = self.flask_app.config["API_ACTIVE_MAX_AGE"]
+        if valid_until is not None:
+            until_boundary = (to_naive_utc(valid_until) - now).total_seconds()
+            max_age = max(0, min(max_age, int(until_boundary)))
+
+        etag = make_etag(version, request.full_path, valid_until.isoformat() if valid_until else "")
+        cache_control = f"public, max-age={max_age}"
+        if _is_not_modified(request, etag, None):
+            return self._conditional(request, etag, None, cache_control=cache_control)
+
+        # Тело — из БД: снимок выше мог быть из кэша до уведомления о записи,
+        # с которой началась версия в ETag
+        with fresh_reads():
+            events = await aio_event.get_active_events(now)
+            if "rewards" in include:
+                events = await _with_rewards(events)
+        return self._conditional(request, etag, None, events, cache_control=cache_control)
+
+    async def api_event_detail(self, request: AsyncRequest, event_id: int) -> AsyncResponse:
+        version, last_modified = await aio_versions.data_version("events")
+        etag = make_etag(version, request.full_path)
+        if _is_not_modified(request, etag, last_modified):
+            return self._conditional(request, etag, last_modified)
+
+        with fresh_reads():
+            ev = await aio_event.get_event_by_id(event_id)
+        if ev is None:
+            return self._json({"error": "Event not found"}, 404)
+        return self._conditional(request, etag, last_modified, ev)
+
+    async def api_event_rewards(self, request: AsyncRequest, event_id: int) -> AsyncResponse:
+        version, last_modified = await aio_versions.data_version("rewards")
+        etag = make_etag(version, request.full_path)
+        if _is_not_modified(request, etag, last_modified):
+            return self._conditional(request, etag, last_modified)
+
+        with fresh_reads():
+            rewards = await aio_reward.get_rewards_for_event(event_id)
+        return self._conditional(request, etag, last_modified, rewards)
+
+    async def api_rewards_bulk(self, request: AsyncRequest) -> AsyncResponse:
+        try:
+            event_ids = parse_id_list(request.args.get("event_ids"), "event_ids")
+        except ValueError as exc:
+            return self._json({"error": str(exc)}, 400)
+
+        version, last_modified = await aio_versions.data_version("rewards")
+        etag = make_etag(version, request.full_path)
+        if _is_not_modified(request, etag, last_modified):
+            return self._conditional(request, etag, last_modified)
+
+        grouped = await aio_reward.get_rewards_for_events(event_ids)
+        return self._conditional(request, etag, last_modified, {str(k): v for k, v in grouped.items()})
+
+
+def _is_not_modified(request: AsyncRequest, etag: str, last_modified: datetime | None) -> bool:
+    # If-None-Match приоритетнее If-Modified-Since (RFC 9110)
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match:
+        return parse_etags(if_none_match).contains_weak(etag)
+    if_modified_since = parse_date(request.headers.get("If-Modified-Since"))
+    if last_modified is not None and if_modified_since is not None:
+        return last_modified.replace(microsecond=0) <= if_modified_since
+    return False
+
+
+def _compress(request: AsyncRequest, response: AsyncResponse) -> None:
+    """Как compression.compress_response: gzip/br по Accept-Encoding, сжатое тело — из кэша по ETag."""
+    if response.status != 200 or "Content-Encoding" in response.headers:
+        return
+    response.headers["Vary"] = "Accept-Encoding"
+    encoding = choose_encoding(request.headers.get("Accept-Encoding"))
+    if encoding is None or len(response.body) < COMPRESS_MIN_SIZE:
+        return
+    etag = response.headers.get("ETag")
+    response.body = compressed_body(response.body, encoding, unquote_etag(etag)[0] if etag else None)
+    response.headers["Content-Encoding"] = encoding
+
+
+async def _with_rewards(events: list[dict]) -> list[dict]:
+    rewards = await aio_reward.get_rewards_for_events([e["id"] for e in events])
+    # Новые словари: исходные могут лежать в кэше моделей
+    return [{**e, "rewards": rewards[e["id"]]} for e in events]
+
+
+def create_asgi_app(flask_app: Flask) -> AsyncApi:
+    return AsyncApi(flask_app)
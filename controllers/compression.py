@@ -0,0 +1,113 @@
+import gzip
+import hashlib
+import os
+from typing import Any, Hashable
+
+from flask import Flask, Response, request
+from werkzeug.http import parse_accept_header
+
+from models.cache import MISSING, get_cache
+from models.notify import subscribe
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - без brotli сжимаем только gzip
+    brotli = None
+
+# Ответы меньше порога (байт) не сжимаем: выигрыш меньше накладных расходов
+COMPRESS_MIN_SIZE = int(os.environ.get("COMPRESS_MIN_SIZE", "1024"))
+COMPRESS_GZIP_LEVEL = int(os.environ.get("COMPRESS_GZIP_LEVEL", "6"))
+# 4–5 — в разы быстрее 11 и почти так же компактно для JSON
+COMPRESS_BROTLI_QUALITY = int(os.environ.get("COMPRESS_BROTLI_QUALITY", "5"))
+
+COMPRESSIBLE_MIMETYPES = {
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+}
+
+# Поддерживаемые кодировки в порядке предпочтения
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+# Сжатые тела ответов по (ETag, кодировка, хэш тела): повторный опрос той же
+# версии не пережимается
+_compressed_cache = get_cache("compressed_bodies", ttl=300.0, maxsize=256)
+
+
+def is_compressible(mimetype: str | None) -> bool:
+    return bool(mimetype) and (mimetype.startswith("text/") or mimetype in COMPRESSIBLE_MIMETYPES)
+
+
+def choose_encoding(accept_encoding: str | None) -> str | None:
+    """br или gzip — что клиент принимает (brotli предпочтительнее), иначе None."""
+    if not accept_encoding:
+        return None
+    accepted = parse_accept_header(accept_encoding)
+    for encoding in ENCODINGS:
+        if accepted[encoding] > 0:
+            return encoding
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=COMPRESS_BROTLI_QUALITY)
+    # mtime=0 — одинаковые байты при одинаковом теле (кэши и прокси это любят)
+    return gzip.compress(body, COMPRESS_GZIP_LEVEL, mtime=0)
+
+
+def compressed_body(body: bytes, encoding: str, key: Hashable | None = None) -> bytes:
+    """
+    Сжатое тело; с key (ETag ответа) результат запоминается. Хэш тела тоже
+    входит в ключ: под одним ETag может прийти и другое тело (например,
+    собранное до уведомления о записи), и сжатое не должно от него отличаться.
+    """
+    if key is None:
+        return compress(body, encoding)
+    cache_key = (key, encoding, hashlib.blake2b(body, digest_size=16).digest())
+    compressed = _compressed_cache.get(cache_key)
+    if compressed is MISSING:
+        compressed = compress(body, encoding)
+        _compressed_cache.set(cache_key, compressed)
+    return compressed
+
+
+def _on_data_changed(payload: dict[str, Any]) -> None:
+    # Тела старых версий больше не запрашивают
+    _compressed_cache.invalidate()
+
+
+subscribe("events", _on_data_changed)
+subscribe("rewards", _on_data_changed)
+
+
+def compress_response(resp: Response) -> Response:
+    """Сжимаем ответ, если клиент это принимает и тело достаточно большое."""
+    if resp.status_code != 200 or resp.direct_passthrough or resp.is_streamed:
+        return resp
+    if "Content-Encoding" in resp.headers or not is_compressible(resp.mimetype):
+        return resp
+
+    # Ответ зависит от Accept-Encoding — кэши должны это учитывать
+    resp.vary.add("Accept-Encoding")
+    encoding = choose_encoding(request.headers.get("Accept-Encoding"))
+    if encoding is None:
+        return resp
+
+    body = resp.get_data()
+    if len(body) < COMPRESS_MIN_SIZE:
+        return resp
+
+    etag, weak = resp.get_etag()
+    resp.set_data(compressed_body(body, encoding, etag))
+    resp.headers["Content-Encoding"] = encoding
+    if etag is not None and not weak:
+        # Сильный ETag обещает те же байты — у сжатого тела они другие
+        resp.set_etag(f"{etag}-{encoding}")
+    return resp
+
+
+def init_compression(app: Flask) -> None:
+    app.after_request(compress_response)
@@ -12,14 +12,40 @@ from flask import (
 from models import event as event_model
 from models import reward as reward_model
 
+from .fragments import detail_fragment, invalidate_fragments, list_fragment
+from .params import parse_event_filters
+
 events_bp = Blueprint("events", __name__)
 
 
 @events_bp.route("/")
 def index():
-    """Список всех ивентов."""
-    events = event_model.get_all_events()
-    return render_template("events_list.html", events=events)
+    """Список ивентов (постранично, с фильтрами); с q — результаты поиска."""
+    search = request.args.get("q", "").strip()
+    # Фильтры сохраняем в ссылках на соседние страницы
+    filter_args = {k: v for k, v in request.args.items() if k != "cursor" and v}
+
+    def render() -> str:
+        if search:
+            page = event_model.search_events(search, **filters)
+        else:
+            page = event_model.get_events_page(**filters)
+        return render_template(
+            "fragments/events_list.html",
+            events=page["items"],
+            next_cursor=page["next_cursor"],
+            prev_cursor=page["prev_cursor"],
+            filter_args=filter_args,
+        )
+
+    try:
+        filters = parse_event_filters(request.args)
+        fragment = list_fragment(tuple(sorted(request.args.items(multi=True))), render)
+    except ValueError as exc:
+        flash(str(exc))
+        return redirect(url_for("events.index"))
+
+    return render_template("events_list.html", fragment=fragment)
 
 
 @events_bp.route("/events/new", methods=["GET", "POST"])
@@ -57,6 +83,7 @@ def create_event():
             is_active=is_active,
         )
 
+        invalidate_fragments(new_id)
         flash("Ивент успешно создан.")
         return redirect(url_for("events.view_event", event_id=new_id))
 
@@ -66,13 +93,19 @@ def create_event():
 @events_bp.route("/events/<int:event_id>")
 def view_event(event_id: int):
     """Просмотр ивента + список наград."""
-    ev = event_model.get_event_by_id(event_id)
-    if ev is None:
+
+    def render() -> str | None:
+        ev = event_model.get_event_by_id(event_id)
+        if ev is None:
+            return None
+        rewards = reward_model.get_rewards_for_event(event_id)
+        return render_template("fragments/event_detail.html", event=ev, rewards=rewards)
+
+    fragment = detail_fragment(event_id, render)
+    if fragment is None:
         flash("Ивент не найден.")
         return redirect(url_for("events.index"))
-
-    rewards = reward_model.get_rewards_for_event(event_id)
-    return render_template("event_detail.html", event=ev, rewards=rewards)
+    return render_template("event_detail.html", fragment=fragment)
 
 
 @events_bp.route("/events/<int:event_id>/edit", methods=["GET", "POST"])
@@ -116,6 +149,7 @@ def edit_event(event_id: int):
             is_active=is_active,
         )
 
+        invalidate_fragments(event_id)
         flash("Ивент обновлён.")
         return redirect(url_for("events.view_event", event_id=event_id))
 
@@ -135,6 +169,7 @@ def edit_event(event_id: int):
 def delete_event(event_id: int):
     """Удаление ивента."""
     event_model.delete_event(event_id)
+    invalidate_fragments(event_id)
     flash("Ивент удалён.")
     return redirect(url_for("events.index"))
 
@@ -142,7 +177,9 @@ def delete_event(event_id: int):
 @events_bp.route("/events/<int:event_id>/rewards/add", methods=["POST"])
 def add_reward(event_id: int):
     """Добавление награды к ивенту."""
-    ev = event_model.get_event_by_id(event_id)
+    # Запрос выполняется в одной транзакции: блокируем ивент,
+    # чтобы его не удалили между проверкой и вставкой награды
+    ev = event_model.get_event_by_id(event_id, lock=True)
     if ev is None:
         flash("Ивент не найден.")
         return redirect(url_for("events.index"))
@@ -159,5 +196,6 @@ def add_reward(event_id: int):
         return redirect(url_for("events.view_event", event_id=event_id))
 
     reward_model.add_reward(event_id, reward_type, amount, description)
+    invalidate_fragments(event_id)
     flash("Награда добавлена.")
     return redirect(url_for("events.view_event", event_id=event_id))
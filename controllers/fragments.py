@@ -0,0 +1,68 @@
+from typing import Any, Callable, Hashable
+
+from markupsafe import Markup
+
+from models import versions as versions_model
+from models.cache import MISSING, FunctionCache, get_cache
+from models.database import after_commit, fresh_reads
+from models.notify import subscribe
+
+# HTML админки без обёртки base.html (в ней flash-сообщения конкретного
+# пользователя). Запись хранит версию данных, из которых отрисована:
+# после изменения в любом воркере версия другая и фрагмент рисуется заново.
+# Рисуем мимо кэшей моделей: они могли ещё не получить уведомление.
+_list_fragments = get_cache("admin_list_fragments", ttl=300.0, maxsize=64)
+_detail_fragments = get_cache("admin_detail_fragments", ttl=300.0, maxsize=1024)
+
+
+def _cached(cache: FunctionCache, key: Hashable, version: str, render: Callable[[], str | None]) -> Markup | None:
+    entry = cache.get(key)
+    if entry is not MISSING and entry[0] == version:
+        return entry[1]
+    with fresh_reads():
+        html = render()
+    if html is None:
+        return None
+    fragment = Markup(html)
+    cache.set(key, (version, fragment))
+    return fragment
+
+
+def list_fragment(args: Hashable, render: Callable[[], str]) -> Markup:
+    """Список ивентов для набора параметров запроса (фильтры, курсор, поиск)."""
+    version, _ = versions_model.data_version("events")
+    return _cached(_list_fragments, args, version, render)
+
+
+def detail_fragment(event_id: int, render: Callable[[], str | None]) -> Markup | None:
+    """Страница ивента с наградами. render() вернул None (ивента нет) — не кэшируем."""
+    version, _ = versions_model.data_version("events", "rewards")
+    return _cached(_detail_fragments, event_id, version, render)
+
+
+def invalidate_fragments(event_id: int | None = None) -> None:
+    """
+    Сбрасываем фрагменты после commit: список целиком, страницу ивента
+    event_id (None — все страницы).
+    """
+
+    def invalidate() -> None:
+        _list_fragments.invalidate()
+        if event_id is None:
+            _detail_fragments.invalidate()
+        else:
+            _detail_fragments.invalidate(event_id)
+
+    after_commit(invalidate)
+
+
+def _on_events_changed(payload: dict[str, Any]) -> None:
+    invalidate_fragments(payload.get("id"))
+
+
+def _on_rewards_changed(payload: dict[str, Any]) -> None:
+    invalidate_fragments(payload.get("event_id"))
+
+
+subscribe("events", _on_events_changed)
+subscribe("rewards", _on_rewards_changed)
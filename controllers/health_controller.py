@@ -0,0 +1,81 @@
+import time
+from typing import Any
+
+import psycopg2
+from flask import Blueprint, Flask, jsonify
+
+from models import boot as boot_model
+from models import database
+from models import metrics
+
+health_bp = Blueprint("health", __name__)
+
+_started_at = time.monotonic()
+_collector_installed = False
+
+
+def _boot_status() -> dict[str, Any] | None:
+    boot = boot_model.current_boot()
+    return boot.status() if boot is not None else None
+
+
+@health_bp.get("/healthz")
+def liveness():
+    """
+    Живость процесса: 200, пока воркер отвечает. Без обращения к БД — если
+    упала база, перезапуск воркеров не поможет (для этого есть /readyz).
+    """
+    resp = jsonify({"status": "alive", "uptime": round(time.monotonic() - _started_at, 3), "boot": _boot_status()})
+    resp.headers["Cache-Control"] = "no-store"
+    return resp
+
+
+@health_bp.get("/readyz")
+def readiness():
+    """
+    Готовность принимать трафик: старт закончен, primary отвечает и схема
+    актуальна. Иначе 503 с причиной.
+    """
+    boot = boot_model.current_boot()
+    body: dict[str, Any] = {"status": "ready", "boot": _boot_status()}
+    status = 200
+    if boot is not None and not boot.ready.is_set():
+        body["status"] = "starting"
+        status = 503
+    else:
+        try:
+            pending = database.pending_migrations()
+        except psycopg2.Error as exc:
+            body.update(status="unavailable", error=str(exc).strip())
+            status = 503
+        else:
+            if pending:
+                body.update(status="migrating", pending_migrations=pending)
+                status = 503
+    resp = jsonify(body)
+    resp.status_code = status
+    resp.headers["Cache-Control"] = "no-store"
+    return resp
+
+
+def _collect_boot_stats() -> list[metrics.Sample]:
+    boot = boot_model.current_boot()
+    if boot is None:
+        return []
+    samples: list[metrics.Sample] = [("gameevents_ready", {}, int(boot.ready.is_set()))]
+    for phase, seconds in list(boot.phases.items()):
+        samples.append(("gameevents_boot_seconds", {"phase": phase}, seconds))
+    return samples
+
+
+def init_boot(app: Flask, warmups: list[boot_model.Warmup]) -> boot_model.Boot:
+    """
+    Старт без блокировки: подключение к БД, миграции и прогрев идут в фоне,
+    /healthz и /readyz показывают состояние воркера.
+    """
+    global _collector_installed
+    app.register_blueprint(health_bp)
+    if not _collector_installed:
+        metrics.register_collector(_collect_boot_stats)
+        _collector_installed = True
+    return boot_model.start_boot(warmups)
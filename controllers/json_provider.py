@@ -0,0 +1,143 @@
+import dataclasses
+import decimal
+import json
+import os
+import uuid
+from datetime import date, datetime, time
+from typing import Any, Callable, Hashable
+
+from flask import Flask, Response, current_app
+from flask.json.provider import JSONProvider
+
+from models.cache import MISSING, get_cache, get_flight
+from models.database import fresh_reads
+from models.notify import subscribe
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - без orjson работаем на stdlib json
+    orjson = None
+
+# JSON_ENCODER=stdlib — принудительно стандартный json (например, для сравнения)
+USE_ORJSON = orjson is not None and os.environ.get("JSON_ENCODER", "orjson") != "stdlib"
+
+# Готовые тела ответов горячих эндпоинтов по ETag (настройки — CACHE_JSON_PAYLOADS_*)
+_payload_cache = get_cache("json_payloads", ttl=300.0, maxsize=256)
+# Новая версия данных: все клиенты разом промахиваются мимо кэша — строим один раз
+_payload_flight = get_flight("json_payloads")
+
+
+class RawJSON(bytes):
+    """Уже закодированное тело JSON-ответа: jsonify() отдаёт его как есть."""
+
+
+def _default(o: Any) -> Any:
+    # То же, что у Flask DefaultJSONProvider, но даты — в ISO-8601, а не RFC 1123
+    if isinstance(o, (datetime, date, time)):
+        return o.isoformat()
+    if isinstance(o, (decimal.Decimal, uuid.UUID)):
+        return str(o)
+    if dataclasses.is_dataclass(o) and not isinstance(o, type):
+        return dataclasses.asdict(o)
+    if hasattr(o, "__html__"):
+        return str(o.__html__())
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+class FastJSONProvider(JSONProvider):
+    """
+    JSON для приложения: orjson, если установлен, иначе стандартный json.
+
+    Оба пути дают одинаковый результат: UTF-8 без \\u-экранирования, ключи
+    по алфавиту (как у Flask по умолчанию), даты в ISO-8601.
+    """
+
+    sort_keys = True
+    # None — отступы только в режиме отладки, как у Flask
+    compact: bool | None = None
+    mimetype = "application/json"
+
+    def _is_compact(self) -> bool:
+        return self.compact or (self.compact is None and not self._app.debug)
+
+    def encode(self, obj: Any) -> bytes:
+        """Объект -> байты JSON (без перевода строки в конце)."""
+        return self._encode(obj, self._is_compact())
+
+    def _encode(self, obj: Any, compact: bool) -> bytes:
+        if USE_ORJSON:
+            option = orjson.OPT_NON_STR_KEYS
+            if self.sort_keys:
+                option |= orjson.OPT_SORT_KEYS
+            if not compact:
+                option |= orjson.OPT_INDENT_2
+            return orjson.dumps(obj, default=_default, option=option)
+        if compact:
+            return self._stdlib_dumps(obj, separators=(",", ":")).encode()
+        return self._stdlib_dumps(obj, indent=2).encode()
+
+    def _stdlib_dumps(self, obj: Any, **kwargs: Any) -> str:
+        kwargs.setdefault("default", _default)
+        kwargs.setdefault("ensure_ascii", False)
+        kwargs.setdefault("sort_keys", self.sort_keys)
+        return json.dumps(obj, **kwargs)
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        """Одна строка JSON без пробелов; с доп. аргументами (indent и т.п.) — через stdlib json."""
+        if kwargs:
+            return self._stdlib_dumps(obj, **kwargs)
+        return self._encode(obj, compact=True).decode()
+
+    def loads(self, s: str | bytes, **kwargs: Any) -> Any:
+        if USE_ORJSON and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response_body(self, obj: Any) -> RawJSON:
+        """Тело ответа, как у jsonify(): JSON и перевод строки."""
+        return RawJSON(self.encode(obj) + b"\n")
+
+    def response(self, *args: Any, **kwargs: Any) -> Response:
+        obj = self._prepare_response_obj(args, kwargs)
+        body = obj if isinstance(obj, RawJSON) else self.response_body(obj)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def cached_payload(key: Hashable, build: Callable[[], Any]) -> Any:
+    """
+    Результат build() из кэша готовых ответов (обычно содержит тело RawJSON).
+    key должен однозначно определять данные — обычно это ETag ответа
+    (версия таблиц + URL). build() читает мимо кэшей моделей: они могли ещё
+    не получить уведомление о записи, с которой началась эта версия.
+    """
+    key = (key, current_app.json._is_compact())
+    value = _payload_cache.get(key)
+    if value is MISSING:
+        value = _payload_flight.do(key, lambda: _build_payload(key, build))
+    return value
+
+
+def _build_payload(key: Hashable, build: Callable[[], Any]) -> Any:
+    with fresh_reads():
+        value = build()
+    _payload_cache.set(key, value)
+    return value
+
+
+def cached_body(key: Hashable, build: Callable[[], Any]) -> RawJSON:
+    """Тело ответа с данными build(), закодированное один раз на key."""
+    return cached_payload(key, lambda: current_app.json.response_body(build()))
+
+
+def _on_data_changed(payload: dict[str, Any]) -> None:
+    # Ответы старых версий больше не нужны; заодно страховка от тел,
+    # закэшированных до уведомления
+    _payload_cache.invalidate()
+
+
+subscribe("events", _on_data_changed)
+subscribe("rewards", _on_data_changed)
+
+
+def init_json(app: Flask) -> None:
+    app.json = FastJSONProvider(app)
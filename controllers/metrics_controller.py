@@ -0,0 +1,132 @@
+import os
+import time
+from typing import Any
+
+from flask import Blueprint, Flask, Response, current_app, g, has_request_context, request
+
+from models import cache as cache_model
+from models import database
+from models import metrics
+from models import push
+
+metrics_bp = Blueprint("metrics", __name__)
+
+# Порог медленного запроса к БД, мс (0 — логировать все запросы)
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", "200"))
+
+_slow_query_ms = SLOW_QUERY_MS
+_listeners_installed = False
+
+
+def _endpoint() -> str:
+    # Шаблон маршрута, а не путь: /api/events/<int:event_id>, а не /api/events/42
+    return request.url_rule.rule if request.url_rule is not None else "<unmatched>"
+
+
+def _on_query(query: str, duration: float, rowcount: int) -> None:
+    fp, normalized = metrics.fingerprint(query)
+    metrics.registry.observe("gameevents_db_query_duration_seconds", duration, fingerprint=fp)
+    if rowcount > 0:
+        metrics.registry.inc("gameevents_db_query_rows_total", rowcount, fingerprint=fp)
+
+    endpoint = "-"
+    if has_request_context():
+        endpoint = _endpoint()
+        stats = g.get("request_metrics")
+        if stats is not None:
+            stats["queries"] += 1
+            stats["db_time"] += duration
+
+    if duration * 1000 >= _slow_query_ms:
+        metrics.registry.inc("gameevents_db_slow_queries_total", fingerprint=fp)
+        print(f"[SLOW SQL] {duration * 1000:.1f} мс, строк {rowcount}, {endpoint}, {fp}: {normalized}")
+
+
+def _on_acquire(waited: float) -> None:
+    metrics.registry.observe("gameevents_db_connection_acquire_seconds", waited)
+    if has_request_context():
+        stats = g.get("request_metrics")
+        if stats is not None:
+            stats["acquire_time"] += waited
+
+
+def _collect_process_stats() -> list[metrics.Sample]:
+    """Состояние пулов и реплик, счётчики кэшей и подписчики потока — снимаются при каждом снимке метрик."""
+    samples: list[metrics.Sample] = []
+    pool = database.pool_stats()
+    for state in ("in_use", "idle", "waiting"):
+        samples.append(("gameevents_db_pool_connections", {"state": state}, pool[state]))
+    for replica in database.replica_stats():
+        labels = {"replica": replica["replica"]}
+        samples.append(("gameevents_db_replica_up", labels, int(replica["healthy"])))
+        if replica["lag"] is not None:
+            samples.append(("gameevents_db_replica_lag_seconds", labels, replica["lag"]))
+        samples.append(("gameevents_db_replica_connections", {**labels, "state": "in_use"}, replica["in_use"]))
+    for name, stats in cache_model.cache_stats().items():
+        samples.append(("gameevents_cache_requests_total", {"cache": name, "result": "hit"}, stats["hits"]))
+        samples.append(("gameevents_cache_requests_total", {"cache": name, "result": "miss"}, stats["misses"]))
+    for name, stats in cache_model.flight_stats().items():
+        samples.append(("gameevents_coalesced_calls_total", {"flight": name, "result": "leader"}, stats["leaders"]))
+        samples.append(("gameevents_coalesced_calls_total", {"flight": name, "result": "shared"}, stats["shared"]))
+    samples.append(("gameevents_push_subscribers", {}, push.broadcaster.subscriber_count))
+    return samples
+
+
+def _begin_request() -> None:
+    g.request_metrics = {"started": time.perf_counter(), "queries": 0, "db_time": 0.0, "acquire_time": 0.0}
+
+
+def _finish_request(response: Response) -> Response:
+    stats: dict[str, Any] | None = g.pop("request_metrics", None)
+    if stats is None:
+        return response
+
+    duration = time.perf_counter() - stats["started"]
+    endpoint = _endpoint()
+    registry = metrics.registry
+    registry.inc("gameevents_http_requests_total", endpoint=endpoint, method=request.method, status=response.status_code)
+    registry.observe("gameevents_http_request_duration_seconds", duration, endpoint=endpoint, method=request.method)
+    registry.observe("gameevents_http_request_db_queries", stats["queries"], metrics.COUNT_BUCKETS, endpoint=endpoint)
+
+    if current_app.config["SERVER_TIMING"]:
+        response.headers["Server-Timing"] = ", ".join(
+            (
+                f'db;dur={stats["db_time"] * 1000:.2f};desc="{stats["queries"]} queries"',
+                f'pool;dur={stats["acquire_time"] * 1000:.2f}',
+                f"app;dur={duration * 1000:.2f}",
+            )
+        )
+
+    registry.flush()
+    return response
+
+
+def init_metrics(app: Flask) -> None:
+    """
+    Метрики запросов: число и время SQL-запросов, ожидание пула, время ответа.
+    Регистрируем до init_db_session: тогда во время ответа входит и commit.
+    """
+    global _slow_query_ms, _listeners_installed
+    app.config.setdefault("SERVER_TIMING", os.environ.get("SERVER_TIMING", "1") != "0")
+    app.config.setdefault("SLOW_QUERY_MS", SLOW_QUERY_MS)
+    _slow_query_ms = float(app.config["SLOW_QUERY_MS"])
+
+    if not _listeners_installed:
+        database.add_query_listener(_on_query)
+        database.add_acquire_listener(_on_acquire)
+        metrics.register_collector(_collect_process_stats)
+        _listeners_installed = True
+
+    app.before_request(_begin_request)
+    app.after_request(_finish_request)
+    app.register_blueprint(metrics_bp)
+
+
+@metrics_bp.get("/metrics")
+def prometheus_metrics():
+    """Метрики всех воркеров в формате Prometheus (см. METRICS_MULTIPROC_DIR)."""
+    body = metrics.render_prometheus(metrics.collect_snapshots())
+    resp = current_app.response_class(body, mimetype="text/plain")
+    resp.headers["Content-Type"] = "text/plain; version=0.0.4; charset=utf-8"
+    resp.headers["Cache-Control"] = "no-store"
+    return resp
@@ -0,0 +1,84 @@
+from datetime import datetime
+from typing import Any, Mapping
+
+from models.event import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+
+_TRUE_VALUES = {"1", "true", "yes", "on"}
+_FALSE_VALUES = {"0", "false", "no", "off"}
+
+
+def parse_bool(value: str | None, name: str) -> bool | None:
+    """Строка из query-параметра -> bool (или None, если параметр не передан)."""
+    if value is None or value == "":
+        return None
+    value = value.lower()
+    if value in _TRUE_VALUES:
+        return True
+    if value in _FALSE_VALUES:
+        return False
+    raise ValueError(f"Параметр {name} должен быть true или false")
+
+
+def parse_datetime(value: str | None, name: str) -> datetime | None:
+    """ISO-8601 строка -> datetime (или None)."""
+    if value is None or value == "":
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError as exc:
+        raise ValueError(f"Параметр {name} должен быть датой в формате ISO-8601") from exc
+
+
+def parse_limit(args: Mapping[str, str], default: int = DEFAULT_PAGE_SIZE) -> int:
+    """Параметр limit: от 1 до MAX_PAGE_SIZE."""
+    limit_str = args.get("limit", "")
+    if not limit_str:
+        return default
+    try:
+        limit = int(limit_str)
+    except ValueError as exc:
+        raise ValueError("Параметр limit должен быть целым числом") from exc
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"Параметр limit должен быть от 1 до {MAX_PAGE_SIZE}")
+    return limit
+
+
+def parse_event_filters(args: Mapping[str, str]) -> dict[str, Any]:
+    """
+    Параметры списка ивентов: limit, cursor, event_type, is_active, from, to.
+    Возвращаем kwargs для event_model.get_events_page(); при ошибке — ValueError.
+    """
+    return {
+        "limit": parse_limit(args),
+        "cursor": args.get("cursor") or None,
+        "event_type": args.get("event_type") or None,
+        "is_active": parse_bool(args.get("is_active"), "is_active"),
+        "window_start": parse_datetime(args.get("from"), "from"),
+        "window_end": parse_datetime(args.get("to"), "to"),
+    }
+
+
+def parse_include(args: Mapping[str, str], allowed: set[str]) -> set[str]:
+    """Параметр include=a,b — какие связанные данные встроить в ответ."""
+    raw = args.get("include", "")
+    include = {part.strip() for part in raw.split(",") if part.strip()}
+    unknown = include - allowed
+    if unknown:
+        raise ValueError(f"Неизвестные значения include: {', '.join(sorted(unknown))}")
+    return include
+
+
+def parse_id_list(value: str | None, name: str, max_items: int = MAX_PAGE_SIZE) -> list[int]:
+    """Список id через запятую: "1,2,3" -> [1, 2, 3] (без повторов, порядок сохраняется)."""
+    if not value:
+        raise ValueError(f"Параметр {name} обязателен")
+    try:
+        ids = [int(part) for part in value.split(",") if part.strip()]
+    except ValueError as exc:
+        raise ValueError(f"Параметр {name} должен быть списком целых чисел через запятую") from exc
+    ids = list(dict.fromkeys(ids))
+    if not ids:
+        raise ValueError(f"Параметр {name} обязателен")
+    if len(ids) > max_items:
+        raise ValueError(f"В параметре {name} не больше {max_items} значений")
+    return ids
@@ -0,0 +1,101 @@
+import asyncio
+import math
+import os
+from typing import Any
+
+from flask import Flask, Response, current_app, jsonify, request
+
+from models import metrics
+from models.rate_limit import Limit, create_store, parse_rules
+
+# Лимиты запросов с одного клиента: "эндпоинт=N/секунды" через запятую,
+# например "api.api_active_events=10/1,api.api_event_rewards=10/1".
+# "*" — общий лимит на остальные эндпоинты /api. Пусто — без лимитов
+RATE_LIMITS = os.environ.get("RATE_LIMITS", "")
+# Заголовок с ключом клиента (X-Api-Key; X-Forwarded-For — только за
+# доверенным прокси). Без него — адрес клиента
+RATE_LIMIT_KEY_HEADER = os.environ.get("RATE_LIMIT_KEY_HEADER") or None
+
+_parsed: tuple[str, dict[str, Limit]] = ("", {})
+_collector_installed = False
+
+
+def _rules(app: Flask) -> dict[str, Limit]:
+    # Правила разбираем заново, только если поменялась строка в конфиге
+    global _parsed
+    spec = app.config["RATE_LIMITS"]
+    if _parsed[0] != spec:
+        _parsed = (spec, parse_rules(spec))
+    return _parsed[1]
+
+
+def client_key(headers: Any, remote_addr: str | None) -> str:
+    if RATE_LIMIT_KEY_HEADER:
+        value = headers.get(RATE_LIMIT_KEY_HEADER, "").split(",")[0].strip()
+        if value:
+            return value
+    return remote_addr or "-"
+
+
+def take(app: Flask, endpoint: str | None, api: bool, client: str) -> float:
+    """
+    Списываем токен клиента для эндпоинта (api — запрос к /api, для правила
+    "*"). 0 — запрос разрешён, иначе через сколько секунд повторить.
+    """
+    rules = _rules(app)
+    if not rules:
+        return 0.0
+    rule = endpoint
+    if rule not in rules:
+        if not api or "*" not in rules:
+            return 0.0
+        rule = "*"
+    return app.extensions["rate_limit"].take(f"{rule}|{client}", rules[rule])
+
+
+async def take_async(app: Flask, endpoint: str | None, api: bool, client: str) -> float:
+    """take() для асинхронного API: файловое хранилище ждёт блокировку — в потоке, не в event loop."""
+    if not _rules(app) or not app.extensions["rate_limit"].blocking:
+        return take(app, endpoint, api, client)
+    return await asyncio.to_thread(take, app, endpoint, api, client)
+
+
+TOO_MANY_REQUESTS = {"error": "Слишком много запросов, повторите позже"}
+
+
+def retry_after_header(retry_after: float) -> str:
+    return str(max(1, math.ceil(retry_after)))
+
+
+def _check_rate_limit() -> Response | None:
+    client = client_key(request.headers, request.remote_addr)
+    retry_after = take(current_app._get_current_object(), request.endpoint, request.blueprint == "api", client)
+    if retry_after <= 0:
+        return None
+    resp = jsonify(TOO_MANY_REQUESTS)
+    resp.status_code = 429
+    resp.headers["Retry-After"] = retry_after_header(retry_after)
+    resp.headers["Cache-Control"] = "no-store"
+    return resp
+
+
+def init_rate_limit(app: Flask) -> None:
+    """
+    Лимит запросов по корзине токенов на (эндпоинт, клиент): сверх лимита —
+    429 с Retry-After. Корзины — в models/rate_limit.py (RATE_LIMIT_STORE).
+    Регистрируем до init_db_session: отклонённый запрос не берёт соединение.
+    """
+    global _collector_installed
+    app.config.setdefault("RATE_LIMITS", RATE_LIMITS)
+    # Проверяем правила при старте, а не на первом запросе
+    parse_rules(app.config["RATE_LIMITS"])
+    app.extensions["rate_limit"] = create_store()
+    app.before_request(_check_rate_limit)
+    if not _collector_installed:
+        metrics.register_collector(lambda: _collect_stats(app))
+        _collector_installed = True
+
+
+def _collect_stats(app: Flask) -> list[metrics.Sample]:
+    fallbacks = getattr(app.extensions["rate_limit"], "fallbacks", 0)
+    return [("gameevents_rate_limit_fallbacks_total", {}, fallbacks)]
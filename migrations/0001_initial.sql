@@ -0,0 +1,20 @@
+-- Базовые таблицы. IF NOT EXISTS — чтобы миграция ложилась и на базы,
+-- созданные ещё старым init_db().
+
+CREATE TABLE IF NOT EXISTS events (
+    id SERIAL PRIMARY KEY,
+    title VARCHAR(100) NOT NULL,
+    description TEXT,
+    event_type VARCHAR(50) NOT NULL,
+    starts_at TIMESTAMPTZ NOT NULL,
+    ends_at TIMESTAMPTZ NOT NULL,
+    is_active BOOLEAN NOT NULL DEFAULT TRUE
+);
+
+CREATE TABLE IF NOT EXISTS rewards (
+    id SERIAL PRIMARY KEY,
+    event_id INTEGER NOT NULL REFERENCES events(id) ON DELETE CASCADE,
+    reward_type VARCHAR(50) NOT NULL,
+    amount INTEGER,
+    description TEXT
+);
@@ -0,0 +1,10 @@
+-- Индексы под keyset-пагинацию списка ивентов и её фильтры.
+
+CREATE INDEX IF NOT EXISTS idx_events_starts_at_id
+    ON events (starts_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_events_type_starts_at_id
+    ON events (event_type, starts_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_events_active_starts_at_id
+    ON events (is_active, starts_at DESC, id DESC);
@@ -0,0 +1,17 @@
+-- Индексы для горячих запросов.
+
+-- get_rewards_for_event: WHERE event_id = ... ORDER BY id
+CREATE INDEX IF NOT EXISTS idx_rewards_event_id
+    ON rewards (event_id, id);
+
+-- Активные ивенты по временным границам (только is_active = TRUE)
+CREATE INDEX IF NOT EXISTS idx_events_active_window
+    ON events (starts_at, ends_at)
+    WHERE is_active;
+
+-- get_active_events: «какие ивенты покрывают момент времени».
+-- Условие ends_at >= starts_at нужно, чтобы некорректные строки
+-- (конец раньше начала) не ломали построение диапазона.
+CREATE INDEX IF NOT EXISTS idx_events_active_range
+    ON events USING gist (tstzrange(starts_at, ends_at, '[]'))
+    WHERE is_active AND ends_at >= starts_at;
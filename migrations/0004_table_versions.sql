@@ -0,0 +1,32 @@
+-- Счётчики изменений таблиц: дешёвый валидатор для ETag / Last-Modified.
+-- Триггер уровня оператора, поэтому массовые изменения стоят одно UPDATE.
+
+CREATE TABLE IF NOT EXISTS table_versions (
+    table_name TEXT PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+INSERT INTO table_versions (table_name)
+VALUES ('events'), ('rewards')
+ON CONFLICT (table_name) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION bump_table_version() RETURNS trigger AS $$
+BEGIN
+    UPDATE table_versions
+    SET version = version + 1,
+        updated_at = clock_timestamp()
+    WHERE table_name = TG_TABLE_NAME;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS events_bump_version ON events;
+CREATE TRIGGER events_bump_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON events
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version();
+
+DROP TRIGGER IF EXISTS rewards_bump_version ON rewards;
+CREATE TRIGGER rewards_bump_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON rewards
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version();
@@ -0,0 +1,95 @@
+-- Сводка наград прямо в строке ивента: число наград и сумма amount по типам.
+-- Списку ивентов не нужен агрегат по rewards на каждую строку.
+-- Поддерживается триггерами уровня оператора с таблицами переходов:
+-- массовая вставка (импорт через COPY) пересчитывает каждый ивент один раз.
+
+ALTER TABLE events
+    ADD COLUMN IF NOT EXISTS reward_count INTEGER NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS reward_totals JSONB NOT NULL DEFAULT '{}'::jsonb;
+
+-- Пересчёт сводки для ивентов ids (NULL — для всех). Возвращает число
+-- исправленных строк: обновляются только те, где сводка разошлась.
+-- Динамический SQL: условие по ids подставляется, только если оно есть,
+-- чтобы точечный пересчёт шёл по индексам, а не перебором всей таблицы.
+-- Полусоединение с unnest(ids), а не = ANY(ids): после массовой вставки в ids
+-- миллионы значений, и ANY просматривал бы массив для каждой строки. Так
+-- большие наборы идут хэш-соединением, малые — по индексу.
+CREATE OR REPLACE FUNCTION refresh_reward_summary(ids INTEGER[] DEFAULT NULL) RETURNS INTEGER AS $$
+DECLARE
+    rewards_filter TEXT := CASE WHEN ids IS NULL THEN '' ELSE 'WHERE event_id IN (SELECT unnest($1))' END;
+    events_filter TEXT := CASE WHEN ids IS NULL THEN '' ELSE 'WHERE e.id IN (SELECT unnest($1))' END;
+    changed INTEGER;
+BEGIN
+    EXECUTE format($sql$
+        WITH per_type AS (
+            SELECT event_id, reward_type, count(*) AS cnt, coalesce(sum(amount), 0) AS total
+            FROM rewards
+            %s
+            GROUP BY event_id, reward_type
+        ), summary AS (
+            SELECT event_id, sum(cnt)::INTEGER AS reward_count, jsonb_object_agg(reward_type, total) AS reward_totals
+            FROM per_type
+            GROUP BY event_id
+        ), target AS (
+            SELECT e.id,
+                   coalesce(s.reward_count, 0) AS reward_count,
+                   coalesce(s.reward_totals, '{}'::jsonb) AS reward_totals
+            FROM events e
+            LEFT JOIN summary s ON s.event_id = e.id
+            %s
+        )
+        UPDATE events e
+        SET reward_count = t.reward_count,
+            reward_totals = t.reward_totals
+        FROM target t
+        WHERE e.id = t.id
+          AND (e.reward_count, e.reward_totals) IS DISTINCT FROM (t.reward_count, t.reward_totals)
+    $sql$, rewards_filter, events_filter) USING ids;
+
+    GET DIAGNOSTICS changed = ROW_COUNT;
+    RETURN changed;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION rewards_refresh_summary() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        UPDATE events SET reward_count = 0, reward_totals = '{}'::jsonb WHERE reward_count <> 0;
+    ELSIF TG_OP = 'INSERT' THEN
+        PERFORM refresh_reward_summary(ARRAY(SELECT DISTINCT event_id FROM new_rows));
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM refresh_reward_summary(ARRAY(SELECT DISTINCT event_id FROM old_rows));
+    ELSE
+        -- UPDATE: награда могла переехать к другому ивенту
+        PERFORM refresh_reward_summary(ARRAY(SELECT event_id FROM new_rows UNION SELECT event_id FROM old_rows));
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Таблицы переходов разрешены только у триггеров на одно событие
+DROP TRIGGER IF EXISTS rewards_summary_insert ON rewards;
+CREATE TRIGGER rewards_summary_insert
+    AFTER INSERT ON rewards
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION rewards_refresh_summary();
+
+DROP TRIGGER IF EXISTS rewards_summary_update ON rewards;
+CREATE TRIGGER rewards_summary_update
+    AFTER UPDATE ON rewards
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION rewards_refresh_summary();
+
+DROP TRIGGER IF EXISTS rewards_summary_delete ON rewards;
+CREATE TRIGGER rewards_summary_delete
+    AFTER DELETE ON rewards
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION rewards_refresh_summary();
+
+DROP TRIGGER IF EXISTS rewards_summary_truncate ON rewards;
+CREATE TRIGGER rewards_summary_truncate
+    AFTER TRUNCATE ON rewards
+    FOR EACH STATEMENT EXECUTE FUNCTION rewards_refresh_summary();
+
+-- Заполняем сводку для уже существующих наград
+SELECT refresh_reward_summary();
@@ -0,0 +1,27 @@
+-- Полнотекстовый поиск по ивентам.
+-- Конфигурация russian: русские слова — русский стеммер, латиница — английский.
+-- Вес: название (A) важнее типа (B), тип — описания (C).
+
+ALTER TABLE events
+    ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('russian', coalesce(title, '')), 'A')
+        || setweight(to_tsvector('russian', coalesce(event_type, '')), 'B')
+        || setweight(to_tsvector('russian', coalesce(description, '')), 'C')
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_events_search
+    ON events USING gin (search_vector);
+
+-- Триграммы для опечаток в названии (pg_trgm из contrib). Если расширения
+-- на сервере нет, поиск работает без них — только по словам и префиксам.
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm') THEN
+        CREATE EXTENSION IF NOT EXISTS pg_trgm;
+        EXECUTE 'CREATE INDEX IF NOT EXISTS idx_events_title_trgm ON events USING gin (lower(title) gin_trgm_ops)';
+    ELSE
+        RAISE NOTICE 'pg_trgm недоступно: поиск без нечёткого совпадения названий';
+    END IF;
+END;
+$$;
@@ -0,0 +1,55 @@
+-- Архив закончившихся ивентов: старые ивенты с наградами переезжают сюда
+-- (models/lifecycle.py), чтобы events и rewards оставались небольшими.
+-- id сохраняются — ссылки на ивент продолжают работать через API архива.
+
+CREATE TABLE IF NOT EXISTS events_archive (
+    id INTEGER PRIMARY KEY,
+    title VARCHAR(100) NOT NULL,
+    description TEXT,
+    event_type VARCHAR(50) NOT NULL,
+    starts_at TIMESTAMPTZ NOT NULL,
+    ends_at TIMESTAMPTZ NOT NULL,
+    is_active BOOLEAN NOT NULL,
+    reward_count INTEGER NOT NULL DEFAULT 0,
+    reward_totals JSONB NOT NULL DEFAULT '{}'::jsonb,
+    archived_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE TABLE IF NOT EXISTS rewards_archive (
+    id INTEGER PRIMARY KEY,
+    event_id INTEGER NOT NULL REFERENCES events_archive(id) ON DELETE CASCADE,
+    reward_type VARCHAR(50) NOT NULL,
+    amount INTEGER,
+    description TEXT
+);
+
+-- Список архива: keyset-пагинация по (starts_at, id), как у events
+CREATE INDEX IF NOT EXISTS idx_events_archive_starts_at
+    ON events_archive (starts_at, id);
+
+CREATE INDEX IF NOT EXISTS idx_rewards_archive_event_id
+    ON rewards_archive (event_id, id);
+
+-- Ближайшее окончание активного ивента и пачки «закончились, но активны».
+-- Частичный индекс: в нём только активные ивенты, он не растёт с историей
+CREATE INDEX IF NOT EXISTS idx_events_active_ends_at
+    ON events (ends_at)
+    WHERE is_active;
+
+-- Пачки на перенос в архив: самые давно закончившиеся первыми
+CREATE INDEX IF NOT EXISTS idx_events_ends_at
+    ON events (ends_at);
+
+INSERT INTO table_versions (table_name)
+VALUES ('events_archive'), ('rewards_archive')
+ON CONFLICT (table_name) DO NOTHING;
+
+DROP TRIGGER IF EXISTS events_archive_bump_version ON events_archive;
+CREATE TRIGGER events_archive_bump_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON events_archive
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version();
+
+DROP TRIGGER IF EXISTS rewards_archive_bump_version ON rewards_archive;
+CREATE TRIGGER rewards_archive_bump_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON rewards_archive
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version();
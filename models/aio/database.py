@@ -0,0 +1,90 @@
+import asyncio
+import json
+import os
+import re
+import time
+from functools import lru_cache
+from typing import Any
+
+import asyncpg
+
+from ..database import DATABASE_URL, _report_query
+
+# Пул asyncpg для асинхронного режима API (asgi.py); один на event loop
+ASYNC_DB_POOL_MIN = int(os.environ.get("ASYNC_DB_POOL_MIN", "1"))
+ASYNC_DB_POOL_MAX = int(os.environ.get("ASYNC_DB_POOL_MAX", "20"))
+
+_pool: asyncpg.Pool | None = None
+_pool_loop: asyncio.AbstractEventLoop | None = None
+_pool_lock: asyncio.Lock | None = None
+
+_PLACEHOLDER_RE = re.compile(r"%s|%%")
+
+
+@lru_cache(maxsize=256)
+def to_asyncpg(query: str) -> str:
+    """Плейсхолдеры psycopg2 (%s) -> нумерованные asyncpg ($1, $2, ...)."""
+    counter = 0
+
+    def replace(match: re.Match) -> str:
+        nonlocal counter
+        if match.group() == "%%":
+            return "%"
+        counter += 1
+        return f"${counter}"
+
+    return _PLACEHOLDER_RE.sub(replace, query)
+
+
+async def _init_connection(conn: asyncpg.Connection) -> None:
+    # JSON/JSONB — в словари, как в psycopg2
+    for type_name in ("json", "jsonb"):
+        await conn.set_type_codec(type_name, encoder=json.dumps, decoder=json.loads, schema="pg_catalog")
+
+
+async def get_pool() -> asyncpg.Pool:
+    """Пул текущего event loop; создаётся при первом запросе."""
+    global _pool, _pool_loop, _pool_lock
+    loop = asyncio.get_running_loop()
+    if _pool is not None and _pool_loop is loop:
+        return _pool
+
+    if _pool_lock is None or _pool_loop is not loop:
+        _pool_lock = asyncio.Lock()
+        _pool_loop = loop
+        _pool = None
+    async with _pool_lock:
+        if _pool is None:
+            _pool = await asyncpg.create_pool(
+                DATABASE_URL,
+                min_size=ASYNC_DB_POOL_MIN,
+                max_size=ASYNC_DB_POOL_MAX,
+                init=_init_connection,
+            )
+            print(f"[DB] Асинхронный пул создан (до {ASYNC_DB_POOL_MAX} соединений)")
+        return _pool
+
+
+async def close_pool() -> None:
+    global _pool, _pool_loop, _pool_lock
+    pool, _pool, _pool_loop, _pool_lock = _pool, None, None, None
+    if pool is not None:
+        await pool.close()
+
+
+async def fetch_all(query: str, params: tuple | None = None) -> list[dict[str, Any]]:
+    """Асинхронный аналог database.fetch_all: те же SQL и параметры."""
+    pool = await get_pool()
+    started = time.perf_counter()
+    rows = await pool.fetch(to_asyncpg(query), *(params or ()))
+    _report_query(query, started, len(rows))
+    return [dict(row) for row in rows]
+
+
+async def fetch_one(query: str, params: tuple | None = None) -> dict[str, Any] | None:
+    """Асинхронный аналог database.fetch_one."""
+    pool = await get_pool()
+    started = time.perf_counter()
+    row = await pool.fetchrow(to_asyncpg(query), *(params or ()))
+    _report_query(query, started, 0 if row is None else 1)
+    return dict(row) if row is not None else None
@@ -0,0 +1,78 @@
+import asyncio
+from datetime import datetime
+from typing import Any
+
+from ..cache import MISSING, get_cache
+from ..database import use_read_caches
+from ..event import (
+    ACTIVE_EVENTS_QUERY,
+    DEFAULT_PAGE_SIZE,
+    EVENT_BY_ID_QUERY,
+    NEXT_START_QUERY,
+    boundary_after,
+    build_events_page,
+    events_page_query,
+)
+from ..timeline import TIMELINE_ENABLED, timeline
+from .database import fetch_all, fetch_one
+
+# Те же экземпляры кэшей, что и у models.event: сброс по записи и по NOTIFY
+# действует на оба режима
+_active_events_cache = get_cache("get_active_events")
+_event_by_id_cache = get_cache("get_event_by_id")
+
+
+async def get_events_page(
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: str | None = None,
+    event_type: str | None = None,
+    is_active: bool | None = None,
+    window_start: datetime | None = None,
+    window_end: datetime | None = None,
+) -> dict[str, Any]:
+    """Асинхронный аналог event.get_events_page."""
+    query, params, direction = events_page_query(limit, cursor, event_type, is_active, window_start, window_end)
+    rows = await fetch_all(query, params)
+    return build_events_page(rows, limit, cursor, direction)
+
+
+async def get_event_by_id(event_id: int) -> dict[str, Any] | None:
+    """Асинхронный аналог event.get_event_by_id (без блокировки)."""
+    use_cache = use_read_caches()
+    if use_cache:
+        cached = _event_by_id_cache.get(event_id)
+        if cached is not MISSING:
+            return cached
+
+    row = await fetch_one(EVENT_BY_ID_QUERY + ";", (event_id,))
+    if use_cache:
+        _event_by_id_cache.set(event_id, row)
+    return row
+
+
+async def get_active_events_snapshot(
+    now: datetime | None = None,
+) -> tuple[list[dict[str, Any]], datetime | None]:
+    """Асинхронный аналог event.get_active_events_snapshot."""
+    now = now or datetime.utcnow()
+    use_cache = use_read_caches()
+    if use_cache:
+        cached = _active_events_cache.get("active", at=now)
+        if cached is not MISSING:
+            return cached
+
+    if use_cache and TIMELINE_ENABLED:
+        # Индекс может дочитывать изменения из БД синхронно — не блокируем event loop
+        rows, valid_until = await asyncio.to_thread(timeline.snapshot, now)
+    else:
+        rows = await fetch_all(ACTIVE_EVENTS_QUERY, (now, now))
+        row = await fetch_one(NEXT_START_QUERY, (now,))
+        valid_until = boundary_after(row["next_start"] if row else None, rows)
+    if use_cache:
+        _active_events_cache.set("active", (rows, valid_until), valid_from=now, valid_until=valid_until)
+    return rows, valid_until
+
+
+async def get_active_events(now: datetime | None = None) -> list[dict[str, Any]]:
+    events, _ = await get_active_events_snapshot(now)
+    return events
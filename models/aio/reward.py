@@ -0,0 +1,23 @@
+from typing import Any
+
+from ..cache import AsyncSingleFlight, get_flight
+from ..database import use_read_caches
+from ..reward import REWARDS_FOR_EVENT_QUERY, REWARDS_FOR_EVENTS_QUERY, group_rewards
+from .database import fetch_all
+
+_rewards_flight = get_flight("aio_get_rewards_for_event", AsyncSingleFlight)
+
+
+async def get_rewards_for_event(event_id: int) -> list[dict[str, Any]]:
+    """Асинхронный аналог reward.get_rewards_for_event (результат общий — не изменять)."""
+    if not use_read_caches():
+        return await fetch_all(REWARDS_FOR_EVENT_QUERY, (event_id,))
+    return await _rewards_flight.do(event_id, lambda: fetch_all(REWARDS_FOR_EVENT_QUERY, (event_id,)))
+
+
+async def get_rewards_for_events(event_ids: list[int]) -> dict[int, list[dict[str, Any]]]:
+    """Асинхронный аналог reward.get_rewards_for_events — один запрос на весь набор."""
+    event_ids = list(dict.fromkeys(event_ids))
+    if not event_ids:
+        return {}
+    return group_rewards(event_ids, await fetch_all(REWARDS_FOR_EVENTS_QUERY, (event_ids,)))
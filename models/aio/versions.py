@@ -0,0 +1,13 @@
+from datetime import datetime
+
+from ..cache import AsyncSingleFlight, get_flight
+from ..versions import TABLE_VERSIONS_QUERY, version_tag, versions_from_rows
+from .database import fetch_all
+
+_versions_flight = get_flight("aio_table_versions", AsyncSingleFlight)
+
+
+async def data_version(*tables: str) -> tuple[str, datetime | None]:
+    """Асинхронный аналог versions.data_version; одинаковые одновременные чтения — одним запросом."""
+    rows = await _versions_flight.do(tables, lambda: fetch_all(TABLE_VERSIONS_QUERY, (list(tables),)))
+    return version_tag(tables, versions_from_rows(rows))
@@ -0,0 +1,58 @@
+from datetime import datetime
+from typing import Any
+
+from .database import fetch_all, fetch_one
+from .event import DEFAULT_PAGE_SIZE, build_events_page, events_page_query
+from .reward import group_rewards
+
+# Ивенты, перенесённые в архив (models/lifecycle.py). Только чтение:
+# в архиве ивенты не меняются, поэтому и кэшей моделей здесь нет —
+# клиентам хватает ETag по table_versions.
+
+ARCHIVED_EVENT_QUERY = """
+    SELECT id, title, description, event_type, starts_at, ends_at, is_active,
+           reward_count, reward_totals, archived_at
+    FROM events_archive
+    WHERE id = %s;
+"""
+
+ARCHIVED_REWARDS_QUERY = """
+    SELECT id, event_id, reward_type, amount, description
+    FROM rewards_archive
+    WHERE event_id = ANY(%s)
+    ORDER BY event_id, id;
+"""
+
+
+def get_archived_events_page(
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: str | None = None,
+    event_type: str | None = None,
+    is_active: bool | None = None,
+    window_start: datetime | None = None,
+    window_end: datetime | None = None,
+) -> dict[str, Any]:
+    """Страница архива — те же фильтры, порядок и курсоры, что у event.get_events_page."""
+    query, params, direction = events_page_query(
+        limit, cursor, event_type, is_active, window_start, window_end, table="events_archive"
+    )
+    rows = fetch_all(query, params)
+    return build_events_page(rows, limit, cursor, direction)
+
+
+def get_archived_event(event_id: int) -> dict[str, Any] | None:
+    """Ивент из архива вместе с наградами (None, если в архиве его нет)."""
+    row = fetch_one(ARCHIVED_EVENT_QUERY, (event_id,))
+    if row is None:
+        return None
+    row["rewards"] = get_archived_rewards_for_events([event_id])[event_id]
+    return row
+
+
+def get_archived_rewards_for_events(event_ids: list[int]) -> dict[int, list[dict[str, Any]]]:
+    """Награды архивных ивентов одним запросом: {event_id: [награды]}."""
+    event_ids = list(dict.fromkeys(event_ids))
+    if not event_ids:
+        return {}
+    rows = fetch_all(ARCHIVED_REWARDS_QUERY, (event_ids,))
+    return group_rewards(event_ids, rows)
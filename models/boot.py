@@ -0,0 +1,162 @@
+import os
+import threading
+import time
+from typing import Any, Callable
+
+import psycopg2
+
+from .database import connect_with_backoff, migrate_schema, pending_migrations
+
+# Миграции при старте воркера: leader — накатывает тот, кто первым взял
+# advisory-блокировку, остальные не ждут его; off — только `flask migrate`
+DB_MIGRATE = os.environ.get("DB_MIGRATE", "leader")
+# Задержка между попытками подключения при старте: от BOOT_RETRY_DELAY,
+# удваивается до BOOT_MAX_RETRY_DELAY секунд
+BOOT_RETRY_DELAY = float(os.environ.get("BOOT_RETRY_DELAY", "0.5"))
+BOOT_MAX_RETRY_DELAY = float(os.environ.get("BOOT_MAX_RETRY_DELAY", "30"))
+
+Warmup = tuple[str, Callable[[], Any]]
+
+
+class Boot(threading.Thread):
+    """
+    Фоновый старт воркера: ждём БД с экспоненциальной задержкой, накатываем
+    миграции (или ждём, пока их накатит другой процесс), затем прогрев —
+    пул соединений, индекс в памяти, слушатель изменений. Воркер принимает
+    запросы сразу, готовность показывает /readyz.
+
+    phases — сколько секунд заняли этапы (db, migrations, warmup, total).
+    """
+
+    def __init__(self, warmups: list[Warmup], migrate: str = DB_MIGRATE) -> None:
+        super().__init__(name="boot", daemon=True)
+        if migrate not in ("leader", "off"):
+            raise ValueError(f"Неизвестный режим DB_MIGRATE: {migrate!r}")
+        self.warmups = warmups
+        self.migrate = migrate
+        self.started_at = time.perf_counter()
+        self.phases: dict[str, float] = {}
+        self.attempts = 0
+        self.error: str | None = None
+        self.ready = threading.Event()
+        self._stop_event = threading.Event()
+
+    def clone(self) -> "Boot":
+        return Boot(self.warmups, self.migrate)
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """Ждём окончания старта (для тестов и CLI). False — не дождались."""
+        return self.ready.wait(timeout)
+
+    def stop(self, timeout: float | None = None) -> None:
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(timeout)
+
+    def record(self, phase: str, seconds: float) -> None:
+        self.phases[phase] = seconds
+
+    def run(self) -> None:
+        delay = BOOT_RETRY_DELAY
+        while not self._stop_event.is_set():
+            self.attempts += 1
+            try:
+                self._boot()
+            except psycopg2.Error as exc:
+                # БД пропала посреди старта — начинаем заново
+                self.error = str(exc).strip()
+                print(f"[BOOT] Старт прерван: {self.error}")
+                if self._stop_event.wait(delay):
+                    return
+                delay = min(delay * 2, BOOT_MAX_RETRY_DELAY)
+                continue
+
+            self.error = None
+            self.phases["total"] = time.perf_counter() - self.started_at
+            self.ready.set()
+            details = ", ".join(f"{name} {seconds:.2f} с" for name, seconds in self.phases.items() if name != "total")
+            print(f"[BOOT] Воркер {os.getpid()} готов за {self.phases['total']:.2f} с ({details})")
+            return
+
+    def _boot(self) -> None:
+        started = time.perf_counter()
+        conn = connect_with_backoff(
+            retries=None,
+            delay=BOOT_RETRY_DELAY,
+            max_delay=BOOT_MAX_RETRY_DELAY,
+            stop=self._stop_event,
+        )
+        try:
+            self.record("db", time.perf_counter() - started)
+
+            started = time.perf_counter()
+            if self.migrate == "leader":
+                migrate_schema(wait=False, conn=conn)
+            self._wait_for_schema(conn)
+            self.record("migrations", time.perf_counter() - started)
+        finally:
+            conn.close()
+
+        started = time.perf_counter()
+        for name, warmup in self.warmups:
+            step = time.perf_counter()
+            warmup()
+            self.record(f"warmup_{name}", time.perf_counter() - step)
+        self.record("warmup", time.perf_counter() - started)
+
+    def _wait_for_schema(self, conn: psycopg2.extensions.connection) -> None:
+        # Миграции накатывает другой процесс (или `flask migrate`) — ждём его
+        delay = BOOT_RETRY_DELAY
+        while True:
+            pending = pending_migrations(conn)
+            conn.rollback()
+            if not pending:
+                return
+            self.error = f"Не применены миграции: {', '.join(map(str, pending))}"
+            print(f"[BOOT] {self.error}")
+            if self._stop_event.wait(delay):
+                raise psycopg2.OperationalError("Старт прерван")
+            delay = min(delay * 2, BOOT_MAX_RETRY_DELAY)
+            if self.migrate == "leader":
+                migrate_schema(wait=False, conn=conn)
+
+    def status(self) -> dict[str, Any]:
+        return {
+            "ready": self.ready.is_set(),
+            "attempts": self.attempts,
+            "error": self.error,
+            "phases": {name: round(seconds, 4) for name, seconds in self.phases.items()},
+        }
+
+
+_boot: Boot | None = None
+_boot_lock = threading.Lock()
+
+
+def start_boot(warmups: list[Warmup], migrate: str = DB_MIGRATE) -> Boot:
+    """Запускаем фоновый старт (один на процесс: повторный вызов вернёт тот же)."""
+    global _boot
+    with _boot_lock:
+        if _boot is None:
+            _boot = Boot(warmups, migrate)
+            _boot.start()
+        return _boot
+
+
+def current_boot() -> Boot | None:
+    return _boot
+
+
+def _restart_after_fork() -> None:
+    # gunicorn --preload: поток старта остался в мастере, у воркера свой
+    # старт и свой замер времени
+    global _boot, _boot_lock
+    _boot_lock = threading.Lock()
+    parent_boot, _boot = _boot, None
+    if parent_boot is not None:
+        _boot = parent_boot.clone()
+        _boot.start()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_after_fork)
@@ -0,0 +1,330 @@
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Hashable
+
+MISSING = object()
+
+
+def to_naive_utc(dt: datetime) -> datetime:
+    """Приводим datetime к «наивному» UTC, как datetime.utcnow()."""
+    if dt.tzinfo is not None:
+        return dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+def to_aware_utc(dt: datetime) -> datetime:
+    """Приводим datetime к UTC с tzinfo, как у строк из БД; «наивное» считаем UTC."""
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+
+class _Entry:
+    __slots__ = ("value", "expires_at", "valid_from", "valid_until")
+
+    def __init__(
+        self,
+        value: Any,
+        expires_at: float | None,
+        valid_from: datetime | None,
+        valid_until: datetime | None,
+    ) -> None:
+        self.value = value
+        self.expires_at = expires_at
+        self.valid_from = valid_from
+        self.valid_until = valid_until
+
+
+class FunctionCache:
+    """
+    Кэш результатов одной функции чтения в памяти процесса.
+
+    Запись живёт не дольше ttl секунд, а если у неё задано окно
+    [valid_from, valid_until) — только для моментов времени внутри окна
+    (так кэш активных ивентов истекает ровно на ближайшей границе).
+    Вытеснение — LRU по maxsize. Возвращаемые значения общие для всех
+    вызывающих, изменять их нельзя.
+    """
+
+    def __init__(self, name: str, ttl: float | None = 60.0, maxsize: int = 1024, enabled: bool = True) -> None:
+        self.name = name
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.enabled = enabled
+
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[Hashable, _Entry] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable, at: datetime | None = None) -> Any:
+        """Значение из кэша или MISSING. at — момент времени, для которого нужен ответ."""
+        if not self.enabled:
+            return MISSING
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._is_fresh(entry, at):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.value
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return MISSING
+
+    @staticmethod
+    def _is_fresh(entry: _Entry, at: datetime | None) -> bool:
+        if entry.expires_at is not None and time.monotonic() >= entry.expires_at:
+            return False
+        if at is not None:
+            at = to_naive_utc(at)
+            if entry.valid_from is not None and at < entry.valid_from:
+                return False
+            if entry.valid_until is not None and at >= entry.valid_until:
+                return False
+        return True
+
+    def set(
+        self,
+        key: Hashable,
+        value: Any,
+        valid_from: datetime | None = None,
+        valid_until: datetime | None = None,
+    ) -> None:
+        if not self.enabled:
+            return
+
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        entry = _Entry(
+            value,
+            expires_at,
+            to_naive_utc(valid_from) if valid_from is not None else None,
+            to_naive_utc(valid_until) if valid_until is not None else None,
+        )
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable = MISSING) -> None:
+        """Сбрасываем одну запись или (без аргумента) весь кэш функции."""
+        with self._lock:
+            if key is MISSING:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+            self.invalidations += 1
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "ttl": self.ttl,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / total if total else 0.0,
+                "invalidations": self.invalidations,
+            }
+
+
+class _Call:
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    """
+    Объединение одинаковых одновременных вызовов: первый вызов с ключом
+    выполняет функцию, остальные ждут его и получают тот же результат
+    (или то же исключение). Результат общий, изменять его нельзя.
+
+    forget() — данные изменились: уже идущие вызовы могли прочитать их до
+    изменения, поэтому новые к ним больше не присоединяются.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, _Call] = {}
+        self.leaders = 0
+        self.shared = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            call.value = fn()
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+            call.done.set()
+        return call.value
+
+    def forget(self) -> None:
+        with self._lock:
+            self._calls.clear()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {"in_flight": len(self._calls), "leaders": self.leaders, "shared": self.shared}
+
+
+class AsyncSingleFlight(SingleFlight):
+    """SingleFlight для корутин (асинхронный API): ждущие не занимают поток."""
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = asyncio.get_running_loop().create_future()
+                self.leaders += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            try:
+                value, error = await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # Ведущего отменили (его клиент отключился) — читаем сами
+                return await fn()
+            if error is not None:
+                raise error
+            return value
+
+        try:
+            value = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as exc:
+            # Ошибка — в результате, а не в future: иначе без ждущих asyncio
+            # ругается на «exception was never retrieved»
+            future.set_result((None, exc))
+            raise
+        else:
+            future.set_result((value, None))
+            return value
+        finally:
+            with self._lock:
+                if self._calls.get(key) is future:
+                    del self._calls[key]
+
+
+_registry: dict[str, FunctionCache] = {}
+_flights: dict[str, SingleFlight] = {}
+_registry_lock = threading.Lock()
+
+
+def get_cache(name: str, ttl: float | None = 60.0, maxsize: int = 1024) -> FunctionCache:
+    """
+    Кэш для функции name (создаётся при первом обращении).
+    Настройки по умолчанию можно переопределить переменными окружения
+    CACHE_<NAME>_TTL, CACHE_<NAME>_MAXSIZE и CACHE_<NAME>_ENABLED.
+    """
+    with _registry_lock:
+        cache = _registry.get(name)
+        if cache is None:
+            prefix = f"CACHE_{name.upper()}_"
+            ttl_env = os.environ.get(prefix + "TTL")
+            if ttl_env is not None:
+                ttl = float(ttl_env) if ttl_env else None
+            maxsize = int(os.environ.get(prefix + "MAXSIZE", maxsize))
+            enabled = os.environ.get(prefix + "ENABLED", "1") not in ("0", "false", "no")
+            cache = FunctionCache(name, ttl=ttl, maxsize=maxsize, enabled=enabled)
+            _registry[name] = cache
+        return cache
+
+
+def configure(name: str, **options: Any) -> FunctionCache:
+    """Меняем настройки кэша функции на лету (ttl, maxsize, enabled)."""
+    cache = get_cache(name)
+    for option, value in options.items():
+        if option not in ("ttl", "maxsize", "enabled"):
+            raise ValueError(f"Неизвестная настройка кэша: {option}")
+        setattr(cache, option, value)
+    cache.invalidate()
+    return cache
+
+
+def cache_stats() -> dict[str, dict[str, Any]]:
+    """Статистика попаданий/промахов по всем кэшам процесса."""
+    with _registry_lock:
+        caches = list(_registry.values())
+    return {cache.name: cache.stats() for cache in caches}
+
+
+def get_flight(name: str, cls: type[SingleFlight] = SingleFlight) -> Any:
+    """Группа объединения вызовов name (создаётся при первом обращении)."""
+    with _registry_lock:
+        flight = _flights.get(name)
+        if flight is None:
+            flight = _flights[name] = cls(name)
+        return flight
+
+
+def forget_flights() -> None:
+    """Данные изменились — новые вызовы не присоединяются к уже идущим."""
+    with _registry_lock:
+        flights = list(_flights.values())
+    for flight in flights:
+        flight.forget()
+
+
+def flight_stats() -> dict[str, dict[str, Any]]:
+    """Сколько вызовов выполнено (leaders) и сколько получили чужой результат (shared)."""
+    with _registry_lock:
+        flights = list(_flights.values())
+    return {flight.name: flight.stats() for flight in flights}
+
+
+_invalidate_all_hooks: list[Callable[[], None]] = []
+
+
+def on_invalidate_all(hook: Callable[[], None]) -> None:
+    """Кэш вне реестра (например, индекс models/timeline.py) сбрасывается вместе со всеми."""
+    _invalidate_all_hooks.append(hook)
+
+
+def invalidate_all() -> None:
+    """Полный сброс всех кэшей процесса."""
+    with _registry_lock:
+        caches = list(_registry.values())
+    for cache in caches:
+        cache.invalidate()
+    forget_flights()
+    for hook in list(_invalidate_all_hooks):
+        hook()
@@ -1,112 +1,765 @@
 import os
+import threading
 import time
-from typing import Any
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Hashable, Iterator
 
 import psycopg2
+from flask import Flask, Response, g, request
 from psycopg2.extras import RealDictCursor
 
+from .cache import SingleFlight
+from .migrations import Migration, pending_versions, run_migrations
+from .pool import ConnectionPool
+from .replicas import CURRENT_LSN_QUERY, Replica, ReplicaSet
+
 DATABASE_URL = os.environ.get(
     "DATABASE_URL",
     "postgresql://gameuser:gamepass@db:5432/gameevents",
 )
 
+# Настройки пула соединений (на каждый процесс-воркер свой пул)
+DB_POOL_MIN = int(os.environ.get("DB_POOL_MIN", "1"))
+DB_POOL_MAX = int(os.environ.get("DB_POOL_MAX", "10"))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "5"))
+DB_POOL_MAX_LIFETIME = float(os.environ.get("DB_POOL_MAX_LIFETIME", "1800"))
+DB_POOL_HEALTH_CHECK_AFTER = float(os.environ.get("DB_POOL_HEALTH_CHECK_AFTER", "30"))
+
+# Реплики для чтения: URL через запятую. Пусто — всё читаем с primary
+DATABASE_REPLICA_URLS = [url.strip() for url in os.environ.get("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+# Реплика, отстающая больше чем на DB_REPLICA_MAX_LAG секунд, запросов не получает
+DB_REPLICA_MAX_LAG = float(os.environ.get("DB_REPLICA_MAX_LAG", "5"))
+DB_REPLICA_CHECK_INTERVAL = float(os.environ.get("DB_REPLICA_CHECK_INTERVAL", "2"))
+
+# Cookie с позицией WAL после записи: следующие запросы клиента читают только
+# с реплик, которые её догнали (иначе с primary) — «читаю свои записи»
+READ_YOUR_WRITES_COOKIE = "db_lsn"
+DB_READ_YOUR_WRITES_TTL = int(os.environ.get("DB_READ_YOUR_WRITES_TTL", "60"))
+
+_pool: ConnectionPool | None = None
+_pool_lock = threading.Lock()
+_replicas: ReplicaSet | None = None
+
+# Последняя известная позиция WAL primary после записи — своей или другого
+# воркера (по уведомлению). Реплики, не догнавшие её, этот процесс не читает:
+# иначе кэши заполнятся данными до записи.
+_write_lsn = 0
+_write_lsn_lock = threading.Lock()
+_min_lsn: ContextVar[int] = ContextVar("min_lsn", default=0)
+# Внутри fresh_reads() кэши моделей не используются
+_fresh_reads: ContextVar[bool] = ContextVar("fresh_reads", default=False)
+
 
 def get_connection() -> psycopg2.extensions.connection:
-    """Создаём новое соединение с базой данных."""
+    """Создаём новое соединение с базой данных (вне пула)."""
     return psycopg2.connect(DATABASE_URL)
 
 
-def init_db(retries: int = 5, delay: int = 2) -> None:
+def get_pool() -> ConnectionPool:
     """
-    Инициализация БД: пытаемся подключиться несколько раз
-    и создаём таблицы, если их ещё нет.
+    Пул соединений текущего процесса. Создаётся лениво при первом запросе.
+    Если процесс был форкнут (gunicorn --preload), пул родителя не используем.
     """
-    for attempt in range(1, retries + 1):
-        try:
-            print(f"[DB] Попытка подключения #{attempt}")
-            conn = get_connection()
-            cur = conn.cursor()
-
-            # Таблица ивентов
-            cur.execute(
-                """
-                CREATE TABLE IF NOT EXISTS events (
-                    id SERIAL PRIMARY KEY,
-                    title VARCHAR(100) NOT NULL,
-                    description TEXT,
-                    event_type VARCHAR(50) NOT NULL,
-                    starts_at TIMESTAMPTZ NOT NULL,
-                    ends_at TIMESTAMPTZ NOT NULL,
-                    is_active BOOLEAN NOT NULL DEFAULT TRUE
-                );
-                """
+    global _pool
+    pool = _pool
+    if pool is not None and pool.is_owned_by_current_process():
+        return pool
+
+    with _pool_lock:
+        if _pool is None or not _pool.is_owned_by_current_process():
+            _pool = ConnectionPool(
+                DATABASE_URL,
+                minconn=DB_POOL_MIN,
+                maxconn=DB_POOL_MAX,
+                timeout=DB_POOL_TIMEOUT,
+                max_lifetime=DB_POOL_MAX_LIFETIME,
+                health_check_after=DB_POOL_HEALTH_CHECK_AFTER,
             )
+        return _pool
+
 
-            cur.execute(
-                """
-                CREATE TABLE IF NOT EXISTS rewards (
-                    id SERIAL PRIMARY KEY,
-                    event_id INTEGER NOT NULL REFERENCES events(id) ON DELETE CASCADE,
-                    reward_type VARCHAR(50) NOT NULL,
-                    amount INTEGER,
-                    description TEXT
-                );
-                """
+def get_replicas() -> ReplicaSet | None:
+    """Реплики текущего процесса (None, если DATABASE_REPLICA_URLS не задан)."""
+    global _replicas
+    if not DATABASE_REPLICA_URLS:
+        return None
+    replicas = _replicas
+    if replicas is not None and replicas.is_owned_by_current_process():
+        return replicas
+
+    with _pool_lock:
+        if _replicas is None or not _replicas.is_owned_by_current_process():
+            _replicas = ReplicaSet(
+                DATABASE_REPLICA_URLS,
+                max_lag=DB_REPLICA_MAX_LAG,
+                check_interval=DB_REPLICA_CHECK_INTERVAL,
+                maxconn=DB_POOL_MAX,
+                timeout=DB_POOL_TIMEOUT,
+                max_lifetime=DB_POOL_MAX_LIFETIME,
+                health_check_after=DB_POOL_HEALTH_CHECK_AFTER,
             )
+            _replicas.start()
+        return _replicas
 
-            conn.commit()
+
+def close_pool() -> None:
+    """Закрываем пул текущего процесса (например, при остановке воркера)."""
+    global _pool, _replicas
+    with _pool_lock:
+        if _pool is not None and _pool.is_owned_by_current_process():
+            _pool.closeall()
+        if _replicas is not None and _replicas.is_owned_by_current_process():
+            _replicas.closeall()
+        _pool = None
+        _replicas = None
+
+
+def _reset_pool_after_fork() -> None:
+    # Сокеты родителя не закрываем — ими продолжает пользоваться родитель.
+    global _pool, _pool_lock, _replicas, _write_lsn_lock
+    _pool = None
+    _replicas = None
+    _pool_lock = threading.Lock()
+    _write_lsn_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_pool_after_fork)
+
+
+def _checkout(pool: ConnectionPool) -> psycopg2.extensions.connection:
+    """Берём соединение из пула и сообщаем подписчикам, сколько его ждали."""
+    started = time.perf_counter()
+    conn = pool.getconn()
+    if _acquire_listeners:
+        waited = time.perf_counter() - started
+        for listener in list(_acquire_listeners):
+            listener(waited)
+    return conn
+
+
+def pool_stats() -> dict[str, Any]:
+    """
+    Метрики пула текущего процесса. Пул не создаём: метрики снимаются и
+    с /healthz, пока воркер ещё ждёт базу, — до первого подключения нули.
+    """
+    pool = _pool
+    if pool is None or not pool.is_owned_by_current_process():
+        return {
+            "size": 0,
+            "in_use": 0,
+            "idle": 0,
+            "waiting": 0,
+            "max_size": DB_POOL_MAX,
+            "checkouts": 0,
+            "timeouts": 0,
+            "recycled": 0,
+            "checkout_time_avg_ms": 0.0,
+            "checkout_time_max_ms": 0.0,
+        }
+    return pool.stats()
+
+
+def replica_stats() -> list[dict[str, Any]]:
+    """Состояние реплик текущего процесса (пустой список без реплик или пока они не созданы)."""
+    replicas = _replicas
+    if replicas is None or not replicas.is_owned_by_current_process():
+        return []
+    return replicas.stats()
+
+
+def parse_lsn(value: str | None) -> int:
+    """Позиция WAL из cookie; мусор — 0 (без ограничений)."""
+    try:
+        return max(0, int(value)) if value else 0
+    except ValueError:
+        return 0
+
+
+def note_write_lsn(lsn: int) -> None:
+    """Запоминаем позицию WAL primary после записи (своей или чужой)."""
+    global _write_lsn
+    with _write_lsn_lock:
+        if lsn > _write_lsn:
+            _write_lsn = lsn
+
+
+def _note_commit(conn: psycopg2.extensions.connection) -> int | None:
+    """После commit записи: позиция WAL primary, если есть реплики."""
+    if not DATABASE_REPLICA_URLS:
+        return None
+    cur = conn.cursor()
+    cur.execute(CURRENT_LSN_QUERY)
+    lsn = int(cur.fetchone()[0])
+    cur.close()
+    note_write_lsn(lsn)
+    return lsn
+
+
+# Реплика упала или отменила запрос из-за конфликта с восстановлением —
+# повторяем чтение на primary
+_REPLICA_ERRORS = (psycopg2.OperationalError, psycopg2.extensions.TransactionRollbackError)
+
+
+def _choose_replica() -> Replica | None:
+    replicas = get_replicas()
+    if replicas is None:
+        return None
+    return replicas.choose(max(_write_lsn, _min_lsn.get()))
+
+
+@contextmanager
+def connection() -> Iterator[psycopg2.extensions.connection]:
+    """Берём соединение из пула и гарантированно возвращаем его обратно."""
+    pool = get_pool()
+    conn = _checkout(pool)
+    try:
+        yield conn
+    except Exception:
+        if not conn.closed:
+            conn.rollback()
+        raise
+    finally:
+        pool.putconn(conn)
+
+
+class UnitOfWork:
+    """
+    Одна транзакция на несколько вызовов моделей.
+
+    Соединение берётся из пула лениво — при первом запросе к БД,
+    а commit/rollback выполняется один раз в finish().
+    Вложенные transaction() внутри превращаются в SAVEPOINT.
+    dirty — были ли в транзакции изменения, ещё не зафиксированные в БД.
+
+    replica_reads=True (запрос Flask) — чтения идут на одну реплику, пока
+    единица работы не обратилась к primary: после записи или блокировки
+    строк она читает с primary, чтобы видеть свои изменения.
+    commit_lsn — позиция WAL primary после commit с изменениями (при репликах).
+    """
+
+    def __init__(self, replica_reads: bool = False) -> None:
+        self._pool: ConnectionPool | None = None
+        self._conn: psycopg2.extensions.connection | None = None
+        self._replica: Replica | None = None
+        self._replica_conn: psycopg2.extensions.connection | None = None
+        self._savepoint_seq = 0
+        self._on_commit: list[Callable[[], None]] = []
+        self.dirty = False
+        self.replica_reads = replica_reads
+        self.commit_lsn: int | None = None
+
+    @property
+    def connection(self) -> psycopg2.extensions.connection:
+        if self._conn is None:
+            self._pool = get_pool()
+            self._conn = _checkout(self._pool)
+        return self._conn
+
+    def replica_connection(self) -> tuple[Replica, psycopg2.extensions.connection] | None:
+        """
+        Соединение с репликой для чтения или None — читаем с primary.
+        Реплика выбирается один раз: все чтения запроса видят одно и то же
+        или более новое состояние.
+        """
+        if not self.replica_reads or self._conn is not None:
+            return None
+        if self._replica_conn is None:
+            replica = _choose_replica()
+            if replica is None:
+                return None
+            try:
+                self._replica_conn = _checkout(replica.pool)
+            except psycopg2.Error as exc:
+                replica.mark_down(exc)
+                return None
+            self._replica = replica
+        return self._replica, self._replica_conn
+
+    def drop_replica(self, exc: BaseException) -> None:
+        """Реплика упала посреди запроса: дальше единица работы читает с primary."""
+        replica, conn = self._replica, self._replica_conn
+        self._replica = self._replica_conn = None
+        self.replica_reads = False
+        if replica is not None and conn is not None:
+            replica.mark_down(exc)
+            replica.pool.putconn(conn, discard=True)
+
+    def _release_replica(self) -> None:
+        replica, conn = self._replica, self._replica_conn
+        self._replica = self._replica_conn = None
+        if replica is not None and conn is not None:
+            replica.pool.putconn(conn)
+
+    @contextmanager
+    def savepoint(self) -> Iterator[None]:
+        """Вложенная транзакция: при ошибке откатываемся только до точки сохранения."""
+        self._savepoint_seq += 1
+        name = f"sp_{self._savepoint_seq}"
+        cur = self.connection.cursor()
+        cur.execute(f"SAVEPOINT {name};")
+        try:
+            yield
+        except Exception:
+            cur.execute(f"ROLLBACK TO SAVEPOINT {name};")
+            raise
+        else:
+            cur.execute(f"RELEASE SAVEPOINT {name};")
+        finally:
             cur.close()
-            conn.close()
-            print("[DB] Инициализация завершена успешно")
-            break
 
+    def on_commit(self, callback: Callable[[], None]) -> None:
+        """Регистрируем callback, который выполнится после успешного commit."""
+        self._on_commit.append(callback)
+
+    def _run_on_commit(self) -> None:
+        callbacks, self._on_commit = self._on_commit, []
+        self.dirty = False
+        for callback in callbacks:
+            callback()
+
+    def commit(self) -> None:
+        if self._conn is not None:
+            self._conn.commit()
+            if self.dirty:
+                self.commit_lsn = _note_commit(self._conn)
+        self._run_on_commit()
+
+    def finish(self, commit: bool) -> None:
+        """Завершаем работу: commit или rollback, соединения возвращаем в пул."""
+        self._release_replica()
+        if self._conn is None:
+            self._on_commit.clear()
+            return
+        conn, pool = self._conn, self._pool
+        self._conn = None
+        try:
+            if commit:
+                conn.commit()
+                if self.dirty:
+                    self.commit_lsn = _note_commit(conn)
+            else:
+                conn.rollback()
+        finally:
+            pool.putconn(conn)
+
+        if commit:
+            self._run_on_commit()
+        else:
+            self._on_commit.clear()
+            self.dirty = False
+
+
+_current_uow: ContextVar[UnitOfWork | None] = ContextVar("current_uow", default=None)
+
+
+def current_unit_of_work() -> UnitOfWork | None:
+    """Текущая единица работы (если мы внутри запроса или transaction())."""
+    return _current_uow.get()
+
+
+def after_commit(callback: Callable[[], None]) -> None:
+    """
+    Выполняем callback после фиксации текущей транзакции,
+    а если транзакции нет (режим autocommit) — сразу.
+    """
+    uow = _current_uow.get()
+    if uow is not None:
+        uow.on_commit(callback)
+    else:
+        callback()
+
+
+def in_dirty_transaction() -> bool:
+    """Есть ли в текущей транзакции незафиксированные изменения."""
+    uow = _current_uow.get()
+    return uow is not None and uow.dirty
+
+
+@contextmanager
+def fresh_reads() -> Iterator[None]:
+    """
+    Чтения внутри блока идут в БД мимо кэшей моделей и чужих вызовов
+    read_coalesced(). Кэши сбрасываются по уведомлениям других воркеров
+    и могут отставать от только что прочитанной версии данных
+    (models/versions.py) — то, что кэшируется по этой версии, строим так.
+    """
+    token = _fresh_reads.set(True)
+    try:
+        yield
+    finally:
+        _fresh_reads.reset(token)
+
+
+def use_read_caches() -> bool:
+    """Можно ли отвечать из кэшей моделей: нет своих незафиксированных изменений и не fresh_reads()."""
+    return not _fresh_reads.get() and not in_dirty_transaction()
+
+
+def read_coalesced(flight: SingleFlight, key: Hashable, load: Callable[[], Any]) -> Any:
+    """
+    Одинаковые одновременные чтения — одним запросом к БД (flight.do).
+    Транзакция с незафиксированными изменениями (и fresh_reads()) читает сама: чужим
+    запросам её данные не видны. Позиция WAL из cookie «читаю свои записи»
+    входит в ключ — после своей записи клиент не получит ответ с реплики,
+    которая её ещё не догнала.
+    """
+    if not use_read_caches():
+        return load()
+    return flight.do((key, _min_lsn.get()), load)
+
+
+@contextmanager
+def transaction() -> Iterator[UnitOfWork]:
+    """
+    Выполняем несколько вызовов моделей в одной транзакции.
+    Если транзакция уже открыта (например, запросом Flask) — создаём SAVEPOINT.
+    """
+    uow = _current_uow.get()
+    if uow is not None:
+        with uow.savepoint():
+            yield uow
+        return
+
+    uow = UnitOfWork()
+    token = _current_uow.set(uow)
+    try:
+        yield uow
+    except Exception:
+        uow.finish(commit=False)
+        raise
+    else:
+        uow.finish(commit=True)
+    finally:
+        _current_uow.reset(token)
+
+
+def init_db_session(app: Flask) -> None:
+    """
+    Привязываем единицу работы к HTTP-запросу: одно соединение и одна
+    транзакция на весь запрос, commit перед отправкой ответа.
+    """
+
+    @app.before_request
+    def _begin_unit_of_work() -> None:
+        g.db_uow = UnitOfWork(replica_reads=True)
+        _current_uow.set(g.db_uow)
+        _min_lsn.set(parse_lsn(request.cookies.get(READ_YOUR_WRITES_COOKIE)))
+
+    @app.after_request
+    def _commit_unit_of_work(response: Response) -> Response:
+        # commit здесь, а не в teardown: если он упадёт, клиент получит 500
+        uow = g.get("db_uow")
+        if uow is not None and response.status_code < 500:
+            uow.commit()
+            if uow.commit_lsn is not None:
+                # Например, редирект после создания ивента: следующая страница
+                # не должна читать с реплики, которая ещё не видит запись
+                response.set_cookie(
+                    READ_YOUR_WRITES_COOKIE,
+                    str(uow.commit_lsn),
+                    max_age=DB_READ_YOUR_WRITES_TTL,
+                    httponly=True,
+                    samesite="Lax",
+                )
+        return response
+
+    @app.teardown_request
+    def _end_unit_of_work(exc: BaseException | None) -> None:
+        uow = g.pop("db_uow", None)
+        _current_uow.set(None)
+        _min_lsn.set(0)
+        if uow is not None:
+            # Всё, что не закоммичено в after_request, откатываем
+            uow.finish(commit=False)
+
+
+@contextmanager
+def _use_connection(write: bool = False) -> Iterator[tuple[psycopg2.extensions.connection, bool]]:
+    """
+    Соединение для одного запроса к БД: из текущей единицы работы
+    (commit сделает она) или своё из пула с немедленным commit.
+    """
+    uow = _current_uow.get()
+    if uow is not None:
+        if write:
+            uow.dirty = True
+        yield uow.connection, False
+        return
+    with connection() as conn:
+        yield conn, True
+
+
+def connect_with_backoff(
+    retries: int | None = 5,
+    delay: float = 0.5,
+    max_delay: float = 30.0,
+    stop: threading.Event | None = None,
+) -> psycopg2.extensions.connection:
+    """
+    Подключаемся к primary, при ошибке повторяем с экспоненциальной
+    задержкой (delay, 2*delay, ... до max_delay). retries=None — пока не
+    получится или пока не выставлен stop.
+    """
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            print(f"[DB] Попытка подключения #{attempt}")
+            return get_connection()
         except psycopg2.OperationalError as exc:
             print(f"[DB] Ошибка подключения: {exc}")
-            if attempt == retries:
+            if retries is not None and attempt >= retries:
                 print("[DB] Не удалось подключиться к БД после нескольких попыток")
                 raise
+        if stop is not None:
+            if stop.wait(delay):
+                raise psycopg2.OperationalError("Подключение к БД прервано")
+        else:
             time.sleep(delay)
+        delay = min(delay * 2, max_delay)
+
+
+def migrate_schema(wait: bool = True, conn: psycopg2.extensions.connection | None = None) -> list[Migration] | None:
+    """
+    Накатываем миграции схемы (см. models/migrations.py). wait=False — только
+    если их сейчас не накатывает другой процесс, иначе None.
+    """
+    own = conn is None
+    if conn is None:
+        conn = get_connection()
+    try:
+        applied = run_migrations(conn, wait=wait)
+    finally:
+        if own:
+            conn.close()
+    if applied:
+        print(f"[DB] Применено миграций: {len(applied)}")
+    return applied
+
+
+def pending_migrations(conn: psycopg2.extensions.connection | None = None) -> list[int]:
+    """Номера миграций, которых ещё нет в базе (пусто — схема актуальна)."""
+    if conn is not None:
+        return pending_versions(conn)
+    with connection() as pooled:
+        try:
+            return pending_versions(pooled)
+        finally:
+            pooled.rollback()
+
+
+def init_db(retries: int = 5, delay: float = 0.5) -> None:
+    """
+    Инициализация БД с ожиданием: подключаемся (с повторами) и накатываем
+    миграции. Приложение делает это в фоне (models/boot.py), а здесь — для
+    `flask migrate` и скриптов.
+    """
+    conn = connect_with_backoff(retries=retries, delay=delay)
+    try:
+        migrate_schema(wait=True, conn=conn)
+    finally:
+        conn.close()
+    print("[DB] Инициализация завершена успешно")
+
+
+QueryListener = Callable[[str, float, int], None]
+
+_query_listeners: list[QueryListener] = []
+
+
+def add_query_listener(listener: QueryListener) -> None:
+    """
+    Подписка на выполненные запросы: listener(query, duration_s, rowcount).
+    Вызывается в том же потоке, что и запрос (для подсчёта запросов, метрик).
+    """
+    _query_listeners.append(listener)
+
 
+def remove_query_listener(listener: QueryListener) -> None:
+    _query_listeners.remove(listener)
 
-def fetch_all(query: str, params: tuple | None = None) -> list[dict[str, Any]]:
-    """Утилита: выполняем SELECT и возвращаем список словарей."""
-    conn = get_connection()
+
+AcquireListener = Callable[[float], None]
+
+_acquire_listeners: list[AcquireListener] = []
+
+
+def add_acquire_listener(listener: AcquireListener) -> None:
+    """Подписка на выдачу соединений из пула: listener(wait_s)."""
+    _acquire_listeners.append(listener)
+
+
+def remove_acquire_listener(listener: AcquireListener) -> None:
+    _acquire_listeners.remove(listener)
+
+
+def _report_query(query: str, started: float, rowcount: int) -> None:
+    if not _query_listeners:
+        return
+    duration = time.perf_counter() - started
+    for listener in list(_query_listeners):
+        listener(query, duration, rowcount)
+
+
+def _run_select(
+    conn: psycopg2.extensions.connection,
+    query: str,
+    params: tuple | None,
+    fetch: Callable[[Any], Any],
+) -> Any:
     cur = conn.cursor(cursor_factory=RealDictCursor)
-    cur.execute(query, params or ())
-    rows = cur.fetchall()
-    cur.close()
-    conn.close()
+    try:
+        cur.execute(query, params or ())
+        return fetch(cur)
+    finally:
+        cur.close()
+
+
+def _select_on_replica(query: str, params: tuple | None, fetch: Callable[[Any], Any]) -> tuple[bool, Any]:
+    """
+    Чтение на реплике. (False, None) — подходящей реплики нет или она
+    упала посреди запроса: тогда читаем с primary.
+    """
+    uow = _current_uow.get()
+    if uow is not None:
+        target = uow.replica_connection()
+        if target is None:
+            return False, None
+        try:
+            return True, _run_select(target[1], query, params, fetch)
+        except _REPLICA_ERRORS as exc:
+            uow.drop_replica(exc)
+            return False, None
+
+    replica = _choose_replica()
+    if replica is None:
+        return False, None
+    try:
+        conn = _checkout(replica.pool)
+    except psycopg2.Error as exc:
+        replica.mark_down(exc)
+        return False, None
+    try:
+        result = _run_select(conn, query, params, fetch)
+    except _REPLICA_ERRORS as exc:
+        replica.mark_down(exc)
+        replica.pool.putconn(conn, discard=True)
+        return False, None
+    except Exception:
+        replica.pool.putconn(conn)
+        raise
+    # Транзакция только читала — pool откатит её при возврате соединения
+    replica.pool.putconn(conn)
+    return True, result
+
+
+def _select(query: str, params: tuple | None, primary: bool, fetch: Callable[[Any], Any]) -> Any:
+    """SELECT на реплике (если можно) или на primary; результат — то, что вернул fetch(cursor)."""
+    if not primary and DATABASE_REPLICA_URLS:
+        done, result = _select_on_replica(query, params, fetch)
+        if done:
+            return result
+    with _use_connection() as (conn, autocommit):
+        result = _run_select(conn, query, params, fetch)
+        if autocommit:
+            conn.commit()
+    return result
+
+
+def fetch_all(query: str, params: tuple | None = None, primary: bool = False) -> list[dict[str, Any]]:
+    """
+    Утилита: выполняем SELECT и возвращаем список словарей.
+    primary=True — читаем с primary, даже если есть реплики.
+    """
+    started = time.perf_counter()
+    rows = _select(query, params, primary, lambda cur: cur.fetchall())
+    _report_query(query, started, len(rows))
     return list(rows)
 
 
-def fetch_one(query: str, params: tuple | None = None) -> dict[str, Any] | None:
-    """Утилита: выполняем SELECT и возвращаем один словарь или None."""
-    conn = get_connection()
-    cur = conn.cursor(cursor_factory=RealDictCursor)
-    cur.execute(query, params or ())
-    row = cur.fetchone()
-    cur.close()
-    conn.close()
+def fetch_one(query: str, params: tuple | None = None, primary: bool = False) -> dict[str, Any] | None:
+    """
+    Утилита: выполняем SELECT и возвращаем один словарь или None.
+    primary=True — для блокировок (FOR UPDATE) и функций, которые пишут.
+    """
+    started = time.perf_counter()
+    row = _select(query, params, primary, lambda cur: cur.fetchone())
+    _report_query(query, started, 0 if row is None else 1)
     return dict(row) if row is not None else None
 
 
+def iter_rows(
+    query: str,
+    params: tuple | None = None,
+    itersize: int = 2000,
+) -> Iterator[dict[str, Any]]:
+    """
+    Утилита: построчно отдаём результат SELECT через серверный (именованный)
+    курсор — в памяти одновременно не больше itersize строк.
+
+    Берём отдельное соединение из пула, а не соединение запроса: генератор
+    обычно дочитывается уже после того, как обработчик Flask вернул ответ.
+    Соединение возвращается в пул, когда генератор исчерпан или закрыт.
+    Читаем с реплики, если есть подходящая.
+    """
+    replica = _choose_replica() if DATABASE_REPLICA_URLS else None
+    pool = replica.pool if replica is not None else get_pool()
+    try:
+        conn = _checkout(pool)
+    except psycopg2.OperationalError as exc:
+        if replica is None:
+            raise
+        replica.mark_down(exc)
+        pool = get_pool()
+        conn = _checkout(pool)
+    started = time.perf_counter()
+    count = 0
+    try:
+        cur = conn.cursor(name=f"stream_{uuid.uuid4().hex}", cursor_factory=RealDictCursor)
+        cur.itersize = itersize
+        try:
+            cur.execute(query, params or ())
+            for row in cur:
+                count += 1
+                yield row
+        finally:
+            if not conn.closed:
+                cur.close()
+    finally:
+        # Транзакция только читала — откатываем, соединение в пул
+        if not conn.closed:
+            conn.rollback()
+        pool.putconn(conn)
+        _report_query(query, started, count)
+
+
 def execute(query: str, params: tuple | None = None) -> None:
     """Утилита: выполняем INSERT/UPDATE/DELETE без возврата результата."""
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute(query, params or ())
-    conn.commit()
-    cur.close()
-    conn.close()
+    with _use_connection(write=True) as (conn, autocommit):
+        started = time.perf_counter()
+        cur = conn.cursor()
+        cur.execute(query, params or ())
+        rowcount = cur.rowcount
+        cur.close()
+        if autocommit:
+            conn.commit()
+            _note_commit(conn)
+    _report_query(query, started, rowcount)
 
 
 def execute_returning_id(query: str, params: tuple | None = None) -> int:
     """INSERT ... RETURNING id — создаём запись и возвращаем её id."""
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute(query, params or ())
-    new_id = cur.fetchone()[0]
-    conn.commit()
-    cur.close()
-    conn.close()
+    with _use_connection(write=True) as (conn, autocommit):
+        started = time.perf_counter()
+        cur = conn.cursor()
+        cur.execute(query, params or ())
+        new_id = cur.fetchone()[0]
+        cur.close()
+        if autocommit:
+            conn.commit()
+            _note_commit(conn)
+    _report_query(query, started, 1)
     return int(new_id)
@@ -1,7 +1,96 @@
-from datetime import datetime
-from typing import Any
+import base64
+import json
+import os
+import re
+from datetime import datetime, timedelta
+from typing import Any, Iterator
 
-from .database import fetch_all, fetch_one, execute, execute_returning_id
+from .cache import MISSING, forget_flights, get_cache, to_aware_utc, to_naive_utc
+from .database import (
+    after_commit,
+    current_unit_of_work,
+    execute,
+    execute_returning_id,
+    fetch_all,
+    fetch_one,
+    iter_rows,
+    use_read_caches,
+)
+from . import push
+from .notify import notify_change, subscribe
+from .timeline import TIMELINE_ENABLED, timeline
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# Кэши функций чтения (настройки — см. models/cache.py:get_cache)
+_active_events_cache = get_cache("get_active_events", ttl=60.0, maxsize=1)
+_event_by_id_cache = get_cache("get_event_by_id", ttl=30.0, maxsize=4096)
+_all_events_cache = get_cache("get_all_events", ttl=10.0, maxsize=1)
+
+
+def invalidate_event_caches(event_id: int | None = None) -> None:
+    """Сбрасываем кэши чтения ивентов (все или только для одного id)."""
+    timeline.mark_changed(event_id)
+    # Идущие сейчас чтения могли начаться до изменения
+    forget_flights()
+    _active_events_cache.invalidate()
+    _all_events_cache.invalidate()
+    if event_id is None:
+        _event_by_id_cache.invalidate()
+    else:
+        _event_by_id_cache.invalidate(event_id)
+
+
+def _after_write(event_id: int, op: str, row: dict[str, Any] | None = None) -> None:
+    # Сбрасываем сразу и ещё раз после commit: между ними другой поток
+    # мог успеть закэшировать старые данные из БД.
+    invalidate_event_caches(event_id)
+    if current_unit_of_work() is not None:
+        after_commit(lambda: invalidate_event_caches(event_id))
+    # Подписчикам потока — только после commit (без UoW — сразу)
+    after_commit(lambda: publish_event_change(event_id, op, row))
+    # Остальные воркеры сбросят свои кэши по уведомлению (после commit)
+    notify_change("events", op, event_id)
+
+
+def _on_events_changed(payload: dict[str, Any]) -> None:
+    invalidate_event_caches(payload.get("id"))
+    publish_event_change(payload.get("id"), payload.get("op"))
+
+
+def _on_rewards_changed(payload: dict[str, Any]) -> None:
+    # Сводка наград (reward_count, reward_totals) хранится в строке ивента
+    invalidate_event_caches(payload.get("event_id"))
+
+
+_PUSH_TYPES = {"insert": "created", "update": "updated", "delete": "deleted"}
+
+
+def publish_event_change(event_id: int | None, op: str | None, row: dict[str, Any] | None = None) -> None:
+    """
+    Рассылаем изменение подписчикам потока (models/push.py) и будим планировщик
+    границ. Строку без row читаем один раз на процесс — и только если есть подписчики.
+    """
+    broadcaster = push.broadcaster
+    broadcaster.wake()
+    if broadcaster.subscriber_count == 0:
+        return
+
+    message_type = _PUSH_TYPES.get(op)
+    if event_id is None or message_type is None:
+        # Массовые изменения (импорт) — клиентам проще перечитать всё
+        broadcaster.publish("resync", {})
+        return
+    if message_type != "deleted" and row is None:
+        row = get_event_by_id(event_id)
+        if row is None:
+            message_type = "deleted"
+    broadcaster.publish(message_type, row if message_type != "deleted" else {"id": event_id})
+
+
+subscribe("events", _on_events_changed)
+subscribe("rewards", _on_rewards_changed)
 
 
 def create_event(
@@ -18,44 +107,475 @@ def create_event(
         VALUES (%s, %s, %s, %s, %s, %s)
         RETURNING id;
     """
-    return execute_returning_id(
+    new_id = execute_returning_id(
         query,
         (title, description, event_type, starts_at, ends_at, is_active),
     )
+    row = _row(new_id, title, description, event_type, starts_at, ends_at, is_active)
+    _after_write(new_id, "insert", row)
+    return new_id
+
+
+def _row(
+    event_id: int,
+    title: str,
+    description: str,
+    event_type: str,
+    starts_at: datetime,
+    ends_at: datetime,
+    is_active: bool,
+) -> dict[str, Any]:
+    """
+    Строка нового ивента в том же виде, что возвращает get_event_by_id (без
+    повторного SELECT): даты с часовым поясом, как у строк из БД.
+    """
+    return {
+        "id": event_id,
+        "title": title,
+        "description": description,
+        "event_type": event_type,
+        "starts_at": to_aware_utc(starts_at),
+        "ends_at": to_aware_utc(ends_at),
+        "is_active": is_active,
+        "reward_count": 0,
+        "reward_totals": {},
+    }
 
 
 def get_all_events() -> list[dict[str, Any]]:
     """Возвращаем все ивенты (для списка)."""
+    use_cache = use_read_caches()
+    if use_cache:
+        cached = _all_events_cache.get("all")
+        if cached is not MISSING:
+            return cached
+
     query = """
-        SELECT id, title, event_type, starts_at, ends_at, is_active
+        SELECT id, title, event_type, starts_at, ends_at, is_active, reward_count, reward_totals
         FROM events
         ORDER BY starts_at DESC;
     """
-    return fetch_all(query)
+    rows = fetch_all(query)
+    if use_cache:
+        _all_events_cache.set("all", rows)
+    return rows
 
 
-def get_event_by_id(event_id: int) -> dict[str, Any] | None:
-    """Возвращаем один ивент по id."""
-    query = """
+def _encode_cursor(row: dict[str, Any], direction: str) -> str:
+    """Непрозрачный курсор: позиция (starts_at, id) + направление листания."""
+    payload = {"s": row["starts_at"].isoformat(), "i": row["id"], "d": direction}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, int, str]:
+    """Разбираем курсор; при мусоре на входе — ValueError."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        direction = payload["d"]
+        if direction not in ("next", "prev"):
+            raise ValueError(direction)
+        return datetime.fromisoformat(payload["s"]), int(payload["i"]), direction
+    except (ValueError, KeyError, TypeError) as exc:
+        raise ValueError("Некорректный курсор") from exc
+
+
+def _filter_conditions(
+    event_type: str | None,
+    is_active: bool | None,
+    window_start: datetime | None,
+    window_end: datetime | None,
+) -> tuple[list[str], list[Any]]:
+    """Условия WHERE для фильтров списка; окно — пересечение с [window_start, window_end]."""
+    conditions: list[str] = []
+    params: list[Any] = []
+    if event_type is not None:
+        conditions.append("event_type = %s")
+        params.append(event_type)
+    if is_active is not None:
+        conditions.append("is_active = %s")
+        params.append(is_active)
+    if window_start is not None:
+        conditions.append("ends_at >= %s")
+        params.append(window_start)
+    if window_end is not None:
+        conditions.append("starts_at <= %s")
+        params.append(window_end)
+    return conditions, params
+
+
+def get_events_page(
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: str | None = None,
+    event_type: str | None = None,
+    is_active: bool | None = None,
+    window_start: datetime | None = None,
+    window_end: datetime | None = None,
+) -> dict[str, Any]:
+    """
+    Страница ивентов в порядке (starts_at, id) по убыванию — keyset-пагинация.
+
+    Фильтры: тип, флаг активности и временное окно [window_start, window_end]
+    (ивент попадает, если пересекается с окном).
+    Возвращаем {"items": [...], "next_cursor": str | None, "prev_cursor": str | None}.
+    """
+    query, params, direction = events_page_query(limit, cursor, event_type, is_active, window_start, window_end)
+    rows = fetch_all(query, params)
+    return build_events_page(rows, limit, cursor, direction)
+
+
+def events_page_query(
+    limit: int,
+    cursor: str | None,
+    event_type: str | None,
+    is_active: bool | None,
+    window_start: datetime | None,
+    window_end: datetime | None,
+    table: str = "events",
+) -> tuple[str, tuple, str]:
+    """
+    SQL страницы ивентов: (запрос, параметры, направление). Общий для sync- и
+    async-чтения и для архива (table="events_archive").
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    conditions, params = _filter_conditions(event_type, is_active, window_start, window_end)
+
+    direction = "next"
+    if cursor is not None:
+        starts_at, event_id, direction = _decode_cursor(cursor)
+        op = "<" if direction == "next" else ">"
+        # Отдельное условие на starts_at: по сравнению кортежей PostgreSQL
+        # не отсекает разделы (models/partitions.py)
+        conditions.append(f"starts_at {op}= %s AND (starts_at, id) {op} (%s, %s)")
+        params.extend([starts_at, starts_at, event_id])
+
+    order = "DESC" if direction == "next" else "ASC"
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    query = f"""
+        SELECT id, title, event_type, starts_at, ends_at, is_active, reward_count, reward_totals
+        FROM {table}
+        {where}
+        ORDER BY starts_at {order}, id {order}
+        LIMIT %s;
+    """
+    # Берём на одну строку больше, чтобы понять, есть ли следующая страница
+    return query, tuple(params) + (limit + 1,), direction
+
+
+def build_events_page(rows: list[dict[str, Any]], limit: int, cursor: str | None, direction: str) -> dict[str, Any]:
+    """Из limit + 1 строк собираем страницу и курсоры соседних страниц."""
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    if direction == "prev":
+        rows.reverse()
+        has_next, has_prev = cursor is not None, has_more
+    else:
+        has_next, has_prev = has_more, cursor is not None
+
+    return {
+        "items": rows,
+        "next_cursor": _encode_cursor(rows[-1], "next") if rows and has_next else None,
+        "prev_cursor": _encode_cursor(rows[0], "prev") if rows and has_prev else None,
+    }
+
+
+def iter_events_for_export(
+    event_type: str | None = None,
+    is_active: bool | None = None,
+    window_start: datetime | None = None,
+    window_end: datetime | None = None,
+) -> Iterator[dict[str, Any]]:
+    """Все ивенты (с описанием) по id — построчно, для выгрузки любого объёма."""
+    conditions, params = _filter_conditions(event_type, is_active, window_start, window_end)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    query = f"""
         SELECT id, title, description, event_type, starts_at, ends_at, is_active
         FROM events
-        WHERE id = %s;
+        {where}
+        ORDER BY id;
     """
-    return fetch_one(query, (event_id,))
+    return iter_rows(query, tuple(params))
+
+
+# Поиск: сколько слов запроса учитываем и максимальная длина строки
+SEARCH_MAX_WORDS = 8
+SEARCH_MAX_LENGTH = 200
+# Сколько совпадений ранжируем: слово из сотен тысяч ивентов иначе заставит
+# считать ts_rank для каждого из них
+SEARCH_MAX_CANDIDATES = int(os.environ.get("SEARCH_MAX_CANDIDATES", "1000"))
+
+_SEARCH_WORD_RE = re.compile(r"\w+")
+_trigram_available: bool | None = None
+
+
+def _has_trigram() -> bool:
+    """Есть ли в базе pg_trgm (миграция 0006 ставит его, если расширение доступно)."""
+    global _trigram_available
+    if _trigram_available is None:
+        row = fetch_one("SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm') AS available;")
+        _trigram_available = bool(row and row["available"])
+    return _trigram_available
+
+
+def search_tsquery(text: str) -> str:
+    """
+    Строка поиска -> текст для to_tsquery: все слова через И, последнее —
+    как префикс («драк» найдёт «драконы»), пока пользователь его дописывает.
+    Берём только буквы и цифры, поэтому операторы tsquery из ввода
+    пользователя не попадают в запрос.
+    """
+    if len(text) > SEARCH_MAX_LENGTH:
+        raise ValueError(f"Строка поиска длиннее {SEARCH_MAX_LENGTH} символов")
+    words = _SEARCH_WORD_RE.findall(text.lower())[:SEARCH_MAX_WORDS]
+    if not words:
+        raise ValueError("Строка поиска пуста")
+    words[-1] += ":*"
+    return " & ".join(words)
+
+
+def _encode_search_cursor(row: dict[str, Any]) -> str:
+    """Курсор поиска: позиция (rank, id) в выдаче."""
+    raw = json.dumps({"r": row["rank"], "i": row["id"]}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_search_cursor(cursor: str) -> tuple[float, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        return float(payload["r"]), int(payload["i"])
+    except (ValueError, KeyError, TypeError) as exc:
+        raise ValueError("Некорректный курсор") from exc
+
+
+def search_events(
+    text: str,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: str | None = None,
+    event_type: str | None = None,
+    is_active: bool | None = None,
+    window_start: datetime | None = None,
+    window_end: datetime | None = None,
+) -> dict[str, Any]:
+    """
+    Поиск по названию, типу и описанию (GIN-индекс по search_vector), лучшие
+    совпадения первыми (среди первых SEARCH_MAX_CANDIDATES найденных). С
+    pg_trgm находятся и названия с опечатками.
+    Фильтры — как у get_events_page. Возвращаем {"items", "next_cursor",
+    "prev_cursor"}; у каждой строки есть rank. Назад листать нельзя —
+    prev_cursor всегда None.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    tsquery = search_tsquery(text)
+    conditions, filter_params = _filter_conditions(event_type, is_active, window_start, window_end)
+
+    # to_tsquery с константой вычисляется один раз при планировании —
+    # поэтому повторяем его, а не выносим в FROM
+    rank = "ts_rank(search_vector, to_tsquery('russian', %s))"
+    match = "search_vector @@ to_tsquery('russian', %s)"
+    rank_params: list[Any] = [tsquery]
+    match_params: list[Any] = [tsquery]
+    if _has_trigram():
+        needle = " ".join(_SEARCH_WORD_RE.findall(text.lower()))
+        rank = f"greatest({rank}, word_similarity(%s, lower(title)))"
+        match = f"({match} OR %s <%% lower(title))"
+        rank_params.append(needle)
+        match_params.append(needle)
+
+    after = ""
+    cursor_params: list[Any] = []
+    if cursor is not None:
+        after = "WHERE (rank, id) < (%s, %s)"
+        cursor_params = list(_decode_search_cursor(cursor))
+
+    # Ранжируем не больше SEARCH_MAX_CANDIDATES совпадений: для редких слов
+    # это все совпадения, для частых — ответ за миллисекунды вместо секунд.
+    # Кандидаты — самые новые по id, чтобы у всех страниц был один набор.
+    # rank приводим к float8: real в курсоре (через текст) сравнивался бы
+    # неточно, и равные rank то повторялись, то пропадали
+    query = f"""
+        SELECT *
+        FROM (
+            SELECT id, title, event_type, starts_at, ends_at, is_active, reward_count, reward_totals,
+                   ({rank})::float8 AS rank
+            FROM events
+            WHERE {' AND '.join([match] + conditions)}
+            ORDER BY id DESC
+            LIMIT %s
+        ) AS found
+        {after}
+        ORDER BY rank DESC, id DESC
+        LIMIT %s;
+    """
+    params = tuple(rank_params + match_params + filter_params) + (SEARCH_MAX_CANDIDATES,)
+    params += tuple(cursor_params) + (limit + 1,)
+    rows = fetch_all(query, params)
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        "items": rows,
+        "next_cursor": _encode_search_cursor(rows[-1]) if rows and has_more else None,
+        "prev_cursor": None,
+    }
+
+
+EVENT_BY_ID_QUERY = """
+    SELECT id, title, description, event_type, starts_at, ends_at, is_active, reward_count, reward_totals
+    FROM events
+    WHERE id = %s
+"""
+
+
+def get_event_by_id(event_id: int, lock: bool = False) -> dict[str, Any] | None:
+    """
+    Возвращаем один ивент по id.
+    lock=True — блокируем строку от удаления до конца текущей транзакции.
+    """
+    use_cache = not lock and use_read_caches()
+    if use_cache:
+        cached = _event_by_id_cache.get(event_id)
+        if cached is not MISSING:
+            return cached
+
+    query = EVENT_BY_ID_QUERY
+    if lock:
+        query += " FOR KEY SHARE"
+    # Блокировка возможна только на primary
+    row = fetch_one(query + ";", (event_id,), primary=lock)
+    if use_cache:
+        _event_by_id_cache.set(event_id, row)
+    return row
+
+
+# Условие записано в форме диапазона, чтобы работал GiST-индекс
+# idx_events_active_range (миграция 0003): starts_at <= now <= ends_at.
+# starts_at <= now отдельно — по нему отсекаются разделы будущих месяцев
+# (models/partitions.py). Параметры: (now, now)
+ACTIVE_EVENTS_QUERY = """
+    SELECT id, title, event_type, starts_at, ends_at
+    FROM events
+    WHERE is_active
+      AND ends_at >= starts_at
+      AND starts_at <= %s
+      AND tstzrange(starts_at, ends_at, '[]') @> %s::timestamptz
+    ORDER BY ends_at;
+"""
+
+NEXT_START_QUERY = """
+    SELECT min(starts_at) AS next_start
+    FROM events
+    WHERE is_active
+      AND starts_at > %s
+      AND ends_at >= starts_at;
+"""
 
 
 def get_active_events(now: datetime | None = None) -> list[dict[str, Any]]:
     """Ивенты, активные в данный момент (по времени и флагу is_active)."""
+    events, _ = get_active_events_snapshot(now)
+    return events
+
+
+def get_active_events_snapshot(
+    now: datetime | None = None,
+) -> tuple[list[dict[str, Any]], datetime | None]:
+    """
+    Активные ивенты + момент, до которого этот набор не изменится
+    (ближайший старт или окончание ивента; None — изменений не ожидается).
+
+    Считается по индексу в памяти (models/timeline.py), без запроса к БД;
+    результат ещё и кэшируется до этой границы.
+    """
     now = now or datetime.utcnow()
-    query = """
-        SELECT id, title, event_type, starts_at, ends_at
-        FROM events
-        WHERE is_active = TRUE
-          AND starts_at <= %s
-          AND ends_at >= %s
-        ORDER BY ends_at;
+    use_cache = use_read_caches()
+    if use_cache:
+        cached = _active_events_cache.get("active", at=now)
+        if cached is not MISSING:
+            return cached
+
+    if use_cache and TIMELINE_ENABLED:
+        # Индекс в памяти; незафиксированные изменения видны только в БД
+        rows, valid_until = timeline.snapshot(now)
+    else:
+        rows = fetch_all(ACTIVE_EVENTS_QUERY, (now, now))
+        valid_until = _next_boundary(now, rows)
+    if use_cache:
+        _active_events_cache.set(
+            "active",
+            (rows, valid_until),
+            valid_from=now,
+            valid_until=valid_until,
+        )
+    return rows, valid_until
+
+
+def _next_boundary(now: datetime, active_rows: list[dict[str, Any]]) -> datetime | None:
+    """
+    Ближайший момент после now, когда набор активных ивентов изменится:
+    старт следующего ивента или окончание одного из текущих.
+    """
+    row = fetch_one(NEXT_START_QUERY, (now,))
+    return boundary_after(row["next_start"] if row else None, active_rows)
+
+
+def boundary_after(next_start: datetime | None, active_rows: list[dict[str, Any]]) -> datetime | None:
+    """Граница по ближайшему старту (NEXT_START_QUERY) и окончаниям активных ивентов."""
+    candidates = [next_start] if next_start is not None else []
+    # ends_at включительно: ивент перестаёт быть активным сразу после ends_at
+    candidates += [r["ends_at"] + timedelta(microseconds=1) for r in active_rows]
+    return min(candidates) if candidates else None
+
+
+# Те же строки, что в индексе models/timeline.py, — для чтений мимо него.
+# {field} — starts_at или ends_at. Параметры: (after, limit)
+UPCOMING_EVENTS_QUERY = """
+    SELECT id, title, event_type, starts_at, ends_at
+    FROM events
+    WHERE is_active
+      AND ends_at >= starts_at
+      AND {field} > %s
+    ORDER BY {field}, id
+    LIMIT %s;
+"""
+
+# Пересечение с окном [start, end]. Параметры: (end, start, limit)
+EVENTS_IN_WINDOW_QUERY = """
+    SELECT id, title, event_type, starts_at, ends_at
+    FROM events
+    WHERE is_active
+      AND ends_at >= starts_at
+      AND starts_at <= %s
+      AND ends_at >= %s
+    ORDER BY starts_at, id
+    LIMIT %s;
+"""
+
+
+def get_upcoming_events(after: datetime, limit: int, boundary: str = "start") -> list[dict[str, Any]]:
+    """
+    Ближайшие limit ивентов, которые начнутся (boundary="start") или закончатся
+    ("end") после after. Из индекса в памяти; внутри fresh_reads() — из БД.
+    """
+    if use_read_caches():
+        return timeline.upcoming(after, limit, boundary)
+    field = "starts_at" if boundary == "start" else "ends_at"
+    return fetch_all(UPCOMING_EVENTS_QUERY.format(field=field), (after, limit))
+
+
+def get_events_in_window(start: datetime, end: datetime, limit: int | None = None) -> list[dict[str, Any]]:
+    """
+    Ивенты, пересекающиеся с окном [start, end], по (starts_at, id). Из индекса
+    в памяти; внутри fresh_reads() — из БД.
     """
-    return fetch_all(query, (now, now))
+    if use_read_caches():
+        return timeline.in_window(start, end, limit)
+    if to_naive_utc(end) < to_naive_utc(start):
+        return []
+    return fetch_all(EVENTS_IN_WINDOW_QUERY, (end, start, limit))
 
 
 def update_event(
@@ -82,9 +602,12 @@ def update_event(
         query,
         (title, description, event_type, starts_at, ends_at, is_active, event_id),
     )
+    # Сводку наград в UPDATE не знаем — подписчикам строка перечитается после commit
+    _after_write(event_id, "update")
 
 
 def delete_event(event_id: int) -> None:
     """Удаляем ивент (награды удалятся каскадно)."""
     query = "DELETE FROM events WHERE id = %s;"
     execute(query, (event_id,))
+    _after_write(event_id, "delete")
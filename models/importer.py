@@ -0,0 +1,347 @@
+import csv
+import io
+import json
+import time
+from datetime import datetime
+from typing import Any, Iterable
+
+from . import partitions
+from .database import transaction
+from .event import invalidate_event_caches, publish_event_change
+from .notify import notify_change
+
+IMPORT_FORMATS = ("json", "ndjson", "csv")
+
+# Колонки CSV (они же поля записей JSON/NDJSON)
+CSV_FIELDS = (
+    "kind",
+    "ref",
+    "event_ref",
+    "event_id",
+    "title",
+    "description",
+    "event_type",
+    "starts_at",
+    "ends_at",
+    "is_active",
+    "reward_type",
+    "amount",
+)
+
+_TRUE_VALUES = {"1", "true", "yes", "on"}
+_FALSE_VALUES = {"0", "false", "no", "off"}
+
+
+def parse_records(data: str | bytes, fmt: str) -> list[dict[str, Any]]:
+    """
+    Разбираем входной файл в список записей.
+
+    Запись — словарь с полем kind: "event" (ref, title, description, event_type,
+    starts_at, ends_at, is_active) или "reward" (event_ref — ref ивента из этого же
+    импорта — либо event_id уже существующего ивента; reward_type, amount, description).
+    В JSON/NDJSON у ивента можно сразу указать список rewards.
+    """
+    if isinstance(data, bytes):
+        data = data.decode("utf-8-sig")
+
+    if fmt == "json":
+        try:
+            records = json.loads(data)
+        except ValueError as exc:
+            raise ValueError(f"Некорректный JSON: {exc}") from exc
+        if not isinstance(records, list):
+            raise ValueError("JSON должен быть массивом записей")
+    elif fmt == "ndjson":
+        records = []
+        for lineno, line in enumerate(data.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError as exc:
+                raise ValueError(f"Некорректный JSON в строке {lineno}: {exc}") from exc
+    elif fmt == "csv":
+        reader = csv.DictReader(io.StringIO(data))
+        unknown = set(reader.fieldnames or ()) - set(CSV_FIELDS)
+        if unknown:
+            raise ValueError(f"Неизвестные колонки CSV: {', '.join(sorted(unknown))}")
+        # Пустые ячейки CSV = отсутствующие поля
+        records = [{k: v for k, v in row.items() if v not in ("", None)} for row in reader]
+    else:
+        raise ValueError(f"Формат должен быть одним из: {', '.join(IMPORT_FORMATS)}")
+
+    return list(_flatten(records))
+
+
+def _flatten(records: Iterable[Any]) -> Iterable[Any]:
+    """Вложенные rewards у ивента превращаем в отдельные записи-награды."""
+    for record in records:
+        if isinstance(record, dict) and record.get("kind") == "event" and "rewards" in record:
+            record = dict(record)
+            rewards = record.pop("rewards") or []
+            yield record
+            for reward in rewards:
+                if isinstance(reward, dict):
+                    reward = {"kind": "reward", **reward, "event_ref": record.get("ref")}
+                yield reward
+        else:
+            yield record
+
+
+def _text(record: dict[str, Any], field: str, max_len: int | None = None, required: bool = False) -> str | None:
+    value = record.get(field)
+    if value is None or value == "":
+        if required:
+            raise ValueError(f"поле {field} обязательно")
+        return None
+    value = str(value).strip()
+    if required and not value:
+        raise ValueError(f"поле {field} обязательно")
+    if max_len is not None and len(value) > max_len:
+        raise ValueError(f"поле {field} длиннее {max_len} символов")
+    return value
+
+
+def _datetime(record: dict[str, Any], field: str) -> datetime:
+    value = _text(record, field, required=True)
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError as exc:
+        raise ValueError(f"поле {field} должно быть датой ISO-8601") from exc
+
+
+def _bool(record: dict[str, Any], field: str, default: bool) -> bool:
+    value = record.get(field)
+    if value is None or value == "":
+        return default
+    if isinstance(value, bool):
+        return value
+    value = str(value).strip().lower()
+    if value in _TRUE_VALUES:
+        return True
+    if value in _FALSE_VALUES:
+        return False
+    raise ValueError(f"поле {field} должно быть true или false")
+
+
+def _int(record: dict[str, Any], field: str) -> int | None:
+    value = record.get(field)
+    if value is None or value == "":
+        return None
+    if isinstance(value, bool):
+        raise ValueError(f"поле {field} должно быть целым числом")
+    try:
+        return int(value)
+    except (TypeError, ValueError) as exc:
+        raise ValueError(f"поле {field} должно быть целым числом") from exc
+
+
+def validate_records(records: list[Any]) -> tuple[list[dict], list[dict], list[dict]]:
+    """
+    Проверяем записи. Возвращаем (ивенты, награды, ошибки);
+    row в ошибках и записях — номер записи во входных данных, с 1.
+    """
+    events: list[dict] = []
+    rewards: list[dict] = []
+    errors: list[dict] = []
+    refs: set[str] = set()
+
+    for row, record in enumerate(records, start=1):
+        try:
+            if not isinstance(record, dict):
+                raise ValueError("запись должна быть объектом")
+            kind = record.get("kind")
+            if kind == "event":
+                ref = _text(record, "ref")
+                if ref is not None and ref in refs:
+                    raise ValueError(f"повторяющийся ref {ref!r}")
+                starts_at = _datetime(record, "starts_at")
+                ends_at = _datetime(record, "ends_at")
+                if (starts_at.tzinfo is None) != (ends_at.tzinfo is None):
+                    raise ValueError("starts_at и ends_at должны быть оба с часовым поясом или оба без")
+                if ends_at < starts_at:
+                    raise ValueError("ends_at раньше starts_at")
+                events.append(
+                    {
+                        "row": row,
+                        "ref": ref,
+                        "title": _text(record, "title", 100, required=True),
+                        "description": _text(record, "description") or "",
+                        "event_type": _text(record, "event_type", 50, required=True),
+                        "starts_at": starts_at,
+                        "ends_at": ends_at,
+                        "is_active": _bool(record, "is_active", True),
+                    }
+                )
+                if ref is not None:
+                    refs.add(ref)
+            elif kind == "reward":
+                event_ref = _text(record, "event_ref")
+                event_id = _int(record, "event_id")
+                if (event_ref is None) == (event_id is None):
+                    raise ValueError("нужно указать ровно одно из полей event_ref или event_id")
+                rewards.append(
+                    {
+                        "row": row,
+                        "event_ref": event_ref,
+                        "event_id": event_id,
+                        "reward_type": _text(record, "reward_type", 50, required=True),
+                        "amount": _int(record, "amount"),
+                        "description": _text(record, "description") or "",
+                    }
+                )
+            else:
+                raise ValueError("поле kind должно быть event или reward")
+        except ValueError as exc:
+            errors.append({"row": row, "error": str(exc)})
+
+    # Награды, ссылающиеся на отсутствующие (или отбракованные) ивенты импорта
+    valid_rewards = []
+    for reward in rewards:
+        if reward["event_ref"] is not None and reward["event_ref"] not in refs:
+            errors.append({"row": reward["row"], "error": f"ивент с ref {reward['event_ref']!r} не найден в импорте"})
+        else:
+            valid_rewards.append(reward)
+
+    errors.sort(key=lambda e: e["row"])
+    return events, valid_rewards, errors
+
+
+def _copy_field(value: Any) -> str:
+    # В COPY CSV NULL — пустое поле без кавычек, всё остальное берём в кавычки
+    if value is None:
+        return ""
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+def _copy(cur: Any, table: str, columns: tuple[str, ...], rows: Iterable[tuple]) -> None:
+    """COPY ... FROM STDIN в формате CSV — самый быстрый способ вставки в PostgreSQL."""
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write(",".join(_copy_field(v) for v in row))
+        buffer.write("\n")
+    buffer.seek(0)
+    cur.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+
+def import_records(records: list[Any], skip_invalid: bool = False) -> dict[str, Any]:
+    """
+    Массовый импорт ивентов и наград в одной транзакции через COPY.
+
+    id ивентов выделяем заранее из последовательности — так ref из входных
+    данных однозначно сопоставляется с id, и награды можно привязать сразу.
+    При ошибках валидации ничего не записываем, если не задан skip_invalid
+    (тогда импортируются только корректные записи).
+    """
+    started = time.perf_counter()
+    events, rewards, errors = validate_records(records)
+
+    report: dict[str, Any] = {
+        "received": len(records),
+        "events_created": 0,
+        "rewards_created": 0,
+        "event_ids": {},
+        "errors": errors,
+        "committed": False,
+    }
+
+    if errors and not skip_invalid:
+        return _finish(report, started)
+
+    with transaction() as uow:
+        cur = uow.connection.cursor()
+
+        # Награды к существующим ивентам: проверяем и блокируем эти ивенты
+        existing_ids = sorted({r["event_id"] for r in rewards if r["event_id"] is not None})
+        found: dict[int, datetime] = {}
+        if existing_ids:
+            cur.execute("SELECT id, starts_at FROM events WHERE id = ANY(%s) FOR KEY SHARE;", (existing_ids,))
+            found = dict(cur.fetchall())
+            missing = [r for r in rewards if r["event_id"] is not None and r["event_id"] not in found]
+            if missing:
+                errors.extend({"row": r["row"], "error": f"ивент {r['event_id']} не существует"} for r in missing)
+                errors.sort(key=lambda e: e["row"])
+                if not skip_invalid:
+                    cur.close()
+                    return _finish(report, started)
+                missing_rows = {r["row"] for r in missing}
+                rewards = [r for r in rewards if r["row"] not in missing_rows]
+
+        ids: list[int] = []
+        if events:
+            cur.execute(
+                "SELECT nextval(pg_get_serial_sequence('events', 'id')) FROM generate_series(1, %s);",
+                (len(events),),
+            )
+            ids = [row[0] for row in cur.fetchall()]
+            _copy(
+                cur,
+                "events",
+                ("id", "title", "description", "event_type", "starts_at", "ends_at", "is_active"),
+                (
+                    (
+                        new_id,
+                        ev["title"],
+                        ev["description"],
+                        ev["event_type"],
+                        ev["starts_at"].isoformat(),
+                        ev["ends_at"].isoformat(),
+                        "t" if ev["is_active"] else "f",
+                    )
+                    for new_id, ev in zip(ids, events)
+                ),
+            )
+
+        ref_to_id = {ev["ref"]: new_id for new_id, ev in zip(ids, events) if ev["ref"] is not None}
+        if rewards:
+            columns = ("event_id", "reward_type", "amount", "description")
+            rows = (
+                (
+                    r["event_id"] if r["event_id"] is not None else ref_to_id[r["event_ref"]],
+                    r["reward_type"],
+                    r["amount"],
+                    r["description"],
+                )
+                for r in rewards
+            )
+            if partitions.is_partitioned():
+                # Награда лежит в разделе месяца старта своего ивента
+                starts = {ev["ref"]: ev["starts_at"] for ev in events if ev["ref"] is not None}
+                columns += ("event_starts_at",)
+                rows = (
+                    row + ((found[r["event_id"]] if r["event_id"] is not None else starts[r["event_ref"]]).isoformat(),)
+                    for row, r in zip(rows, rewards)
+                )
+            _copy(cur, "rewards", columns, rows)
+        cur.close()
+        uow.dirty = True
+
+        # Кэши и остальные воркеры: изменилось сразу много строк. Награды
+        # меняют и строки ивентов — сводку пересчитывает триггер (миграция 0005)
+        if events or rewards:
+            invalidate_event_caches()
+            uow.on_commit(invalidate_event_caches)
+        if events:
+            uow.on_commit(lambda: publish_event_change(None, "import"))
+            notify_change("events", "import", None)
+        if rewards:
+            notify_change("rewards", "import", None)
+
+    report.update(
+        {
+            "events_created": len(events),
+            "rewards_created": len(rewards),
+            "event_ids": ref_to_id,
+            "committed": True,
+        }
+    )
+    return _finish(report, started)
+
+
+def _finish(report: dict[str, Any], started: float) -> dict[str, Any]:
+    """Дописываем в отчёт время и скорость импорта (строк в секунду)."""
+    elapsed = time.perf_counter() - started
+    imported = report["events_created"] + report["rewards_created"]
+    report["elapsed_s"] = round(elapsed, 6)
+    report["rows_per_sec"] = round(imported / elapsed, 1) if elapsed > 0 else float(imported)
+    return report
@@ -0,0 +1,297 @@
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Any
+
+import psycopg2
+
+from . import partitions
+from .cache import to_naive_utc
+from .database import fetch_one, transaction
+from .event import invalidate_event_caches, publish_event_change
+from .notify import notify_change, subscribe
+
+# Сколько строк меняем за одну транзакцию: блокировки строк и WAL
+# не растут с числом закончившихся ивентов
+LIFECYCLE_BATCH_SIZE = int(os.environ.get("LIFECYCLE_BATCH_SIZE", "1000"))
+# Через сколько дней после окончания ивент с наградами уходит в архив
+# (0 — не архивировать)
+EVENT_ARCHIVE_AFTER_DAYS = float(os.environ.get("EVENT_ARCHIVE_AFTER_DAYS", "90"))
+# Дольше не спим, даже если ближайшей границы нет: ивент, созданный в этом
+# же процессе, уведомления не присылает
+LIFECYCLE_MAX_SLEEP = float(os.environ.get("LIFECYCLE_MAX_SLEEP", "300"))
+LIFECYCLE_RETRY_DELAY = float(os.environ.get("LIFECYCLE_RETRY_DELAY", "1"))
+
+_MICROSECOND = timedelta(microseconds=1)
+
+# SKIP LOCKED: строки, которые сейчас правит админка или другой процесс
+# с тем же планировщиком, берём в следующий раз
+DEACTIVATE_QUERY = """
+    UPDATE events
+    SET is_active = FALSE
+    WHERE id IN (
+        SELECT id
+        FROM events
+        WHERE is_active AND ends_at < %s
+        ORDER BY ends_at
+        LIMIT %s
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING id;
+"""
+
+# Перенос одним оператором: награды читаются из того же снимка, что и
+# удаляемые ивенты, а каскадное удаление из rewards и проверка ссылок
+# rewards_archive выполняются в конце оператора
+ARCHIVE_QUERY = """
+    WITH batch AS (
+        SELECT id
+        FROM events
+        WHERE ends_at < %s
+        ORDER BY ends_at
+        LIMIT %s
+        FOR UPDATE SKIP LOCKED
+    ), moved AS (
+        DELETE FROM events e
+        USING batch b
+        WHERE e.id = b.id
+        RETURNING e.id, e.title, e.description, e.event_type, e.starts_at, e.ends_at, e.is_active,
+                  e.reward_count, e.reward_totals
+    ), moved_rewards AS (
+        INSERT INTO rewards_archive (id, event_id, reward_type, amount, description)
+        SELECT r.id, r.event_id, r.reward_type, r.amount, r.description
+        FROM rewards r
+        JOIN batch b ON r.event_id = b.id
+    )
+    INSERT INTO events_archive (id, title, description, event_type, starts_at, ends_at, is_active,
+                                reward_count, reward_totals)
+    SELECT id, title, description, event_type, starts_at, ends_at, is_active, reward_count, reward_totals
+    FROM moved
+    RETURNING id;
+"""
+
+# Оба значения — по индексам из миграции 0007, без обхода таблицы
+NEXT_BOUNDARY_QUERY = """
+    SELECT (SELECT min(ends_at) FROM events WHERE is_active AND ends_at >= %s) AS next_end,
+           (SELECT min(ends_at) FROM events) AS oldest_end;
+"""
+
+
+def _run_batches(query: str, before: datetime, batch_size: int, op: str) -> int:
+    """Выполняем query пачками (каждая — своя транзакция), пока строки не кончатся."""
+    total = 0
+    while True:
+        with transaction() as uow:
+            cur = uow.connection.cursor()
+            cur.execute(query, (before, batch_size))
+            count = cur.rowcount
+            cur.close()
+            if count:
+                uow.dirty = True
+                # Изменилось сразу много ивентов — как после импорта
+                invalidate_event_caches()
+                uow.on_commit(invalidate_event_caches)
+                uow.on_commit(lambda: publish_event_change(None, op))
+                notify_change("events", op, None)
+        total += count
+        if count < batch_size:
+            return total
+
+
+def deactivate_expired(now: datetime | None = None, batch_size: int = LIFECYCLE_BATCH_SIZE) -> int:
+    """Снимаем is_active с закончившихся ивентов. Возвращаем их число."""
+    return _run_batches(DEACTIVATE_QUERY, now or datetime.utcnow(), batch_size, "deactivate")
+
+
+def archive_ended(before: datetime, batch_size: int = LIFECYCLE_BATCH_SIZE) -> int:
+    """
+    Переносим ивенты, закончившиеся раньше before, вместе с наградами
+    в events_archive / rewards_archive. Возвращаем число ивентов.
+    """
+    return _run_batches(ARCHIVE_QUERY, before, batch_size, "archive")
+
+
+def archive_cutoff(now: datetime, archive_after_days: float = EVENT_ARCHIVE_AFTER_DAYS) -> datetime | None:
+    """Ивенты, закончившиеся раньше этого момента, уходят в архив (None — архив выключен)."""
+    if archive_after_days <= 0:
+        return None
+    return now - timedelta(days=archive_after_days)
+
+
+def run_lifecycle(
+    now: datetime | None = None,
+    batch_size: int = LIFECYCLE_BATCH_SIZE,
+    archive_after_days: float = EVENT_ARCHIVE_AFTER_DAYS,
+) -> dict[str, int]:
+    """
+    Один проход: деактивация закончившихся и перенос старых в архив. Если
+    таблицы разбиты по месяцам — ещё и разделы: недостающие будущие
+    создаём, опустевшие после архивации удаляем.
+    """
+    now = now or datetime.utcnow()
+    result = {
+        "partitions_created": len(partitions.ensure_partitions(now)),
+        "deactivated": deactivate_expired(now, batch_size),
+        "archived": 0,
+        "partitions_dropped": 0,
+    }
+    cutoff = archive_cutoff(now, archive_after_days)
+    if cutoff is not None:
+        result["archived"] = archive_ended(cutoff, batch_size)
+        result["partitions_dropped"] = len(partitions.drop_empty_partitions(cutoff))
+    return result
+
+
+def next_lifecycle_boundary(
+    now: datetime,
+    archive_after_days: float = EVENT_ARCHIVE_AFTER_DAYS,
+) -> datetime | None:
+    """
+    Когда снова будет работа: сразу после ближайшего окончания активного
+    ивента или когда самый старый ивент доживёт до архива. None — не ждём ничего.
+    """
+    row = fetch_one(NEXT_BOUNDARY_QUERY, (now,), primary=True)
+    candidates = []
+    if row and row["next_end"] is not None:
+        # ends_at включительно: ивент закончился сразу после ends_at
+        candidates.append(to_naive_utc(row["next_end"]) + _MICROSECOND)
+    if row and row["oldest_end"] is not None and archive_after_days > 0:
+        candidates.append(to_naive_utc(row["oldest_end"]) + timedelta(days=archive_after_days) + _MICROSECOND)
+    return min(candidates) if candidates else None
+
+
+class LifecycleWorker(threading.Thread):
+    """
+    Планировщик жизненного цикла ивентов: спит до ближайшей границы
+    (окончание активного ивента или срок архивации самого старого), затем
+    снимает is_active и переносит старые ивенты в архив пачками. Изменения
+    ивентов в других процессах (уведомления) будят его раньше.
+
+    Несколько процессов с планировщиком друг другу не мешают: пачки
+    берутся с SKIP LOCKED.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = LIFECYCLE_BATCH_SIZE,
+        archive_after_days: float = EVENT_ARCHIVE_AFTER_DAYS,
+        max_sleep: float = LIFECYCLE_MAX_SLEEP,
+        retry_delay: float = LIFECYCLE_RETRY_DELAY,
+    ) -> None:
+        super().__init__(name="event-lifecycle", daemon=True)
+        self.batch_size = batch_size
+        self.archive_after_days = archive_after_days
+        self.max_sleep = max_sleep
+        self.retry_delay = retry_delay
+
+        self.runs = 0
+        self.deactivated = 0
+        self.archived = 0
+        self.next_run: datetime | None = None
+        self.idle = threading.Event()
+        self._wake = threading.Event()
+        self._stop_event = threading.Event()
+
+    def wake(self) -> None:
+        """Ивенты изменились — пора пересчитать ближайшую границу."""
+        self._wake.set()
+
+    def stop(self, timeout: float | None = None) -> None:
+        self._stop_event.set()
+        self._wake.set()
+        if self.is_alive():
+            self.join(timeout)
+
+    def run(self) -> None:
+        delay = self.retry_delay
+        while not self._stop_event.is_set():
+            self._wake.clear()
+            now = datetime.utcnow()
+            try:
+                result = run_lifecycle(now, self.batch_size, self.archive_after_days)
+                boundary = next_lifecycle_boundary(now, self.archive_after_days)
+            except psycopg2.Error as exc:
+                print(f"[LIFECYCLE] Проход не удался: {str(exc).strip()}")
+                if self._stop_event.wait(delay):
+                    return
+                delay = min(delay * 2, self.max_sleep)
+                continue
+            delay = self.retry_delay
+
+            self.runs += 1
+            self.deactivated += result["deactivated"]
+            self.archived += result["archived"]
+            if result["deactivated"] or result["archived"]:
+                print(f"[LIFECYCLE] Деактивировано: {result['deactivated']}, в архив: {result['archived']}")
+
+            timeout = self.max_sleep
+            if boundary is not None:
+                # Граница уже прошла — строки были заблокированы, повторим чуть позже
+                until = (boundary - datetime.utcnow()).total_seconds()
+                timeout = min(timeout, until if until > 0 else self.retry_delay)
+            self.next_run = datetime.utcnow() + timedelta(seconds=timeout)
+            self.idle.set()
+            self._wake.wait(timeout)
+            self.idle.clear()
+
+    def status(self) -> dict[str, Any]:
+        return {
+            "runs": self.runs,
+            "deactivated": self.deactivated,
+            "archived": self.archived,
+            "next_run": self.next_run,
+        }
+
+
+_worker: LifecycleWorker | None = None
+_worker_lock = threading.Lock()
+
+
+def start_lifecycle(**options: Any) -> LifecycleWorker:
+    """Запускаем планировщик в текущем процессе (один на процесс)."""
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = LifecycleWorker(**options)
+            _worker.start()
+        return _worker
+
+
+def stop_lifecycle(timeout: float | None = None) -> None:
+    global _worker
+    with _worker_lock:
+        worker, _worker = _worker, None
+    if worker is not None:
+        worker.stop(timeout)
+
+
+def current_lifecycle() -> LifecycleWorker | None:
+    return _worker
+
+
+def _on_events_changed(payload: dict[str, Any]) -> None:
+    worker = _worker
+    # Свои пачки планировщик не пересчитывает по уведомлению
+    if worker is not None and payload.get("op") not in ("deactivate", "archive"):
+        worker.wake()
+
+
+subscribe("events", _on_events_changed)
+
+
+def _restart_after_fork() -> None:
+    # Поток не переживает fork: планировщик мастера перезапускаем в воркере
+    global _worker, _worker_lock
+    _worker_lock = threading.Lock()
+    parent_worker, _worker = _worker, None
+    if parent_worker is not None:
+        start_lifecycle(
+            batch_size=parent_worker.batch_size,
+            archive_after_days=parent_worker.archive_after_days,
+            max_sleep=parent_worker.max_sleep,
+            retry_delay=parent_worker.retry_delay,
+        )
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_after_fork)
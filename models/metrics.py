@@ -0,0 +1,249 @@
+import atexit
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable
+
+# Директория для агрегации метрик между воркерами gunicorn: каждый процесс
+# периодически сбрасывает туда свой снимок, /metrics суммирует все файлы.
+# Без неё метрики только текущего процесса.
+METRICS_DIR = os.environ.get("METRICS_MULTIPROC_DIR") or None
+METRICS_FLUSH_INTERVAL = float(os.environ.get("METRICS_FLUSH_INTERVAL", "1"))
+
+# Границы бакетов гистограмм времени (секунды) и числа запросов к БД
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+_HELP = {
+    "gameevents_http_requests_total": ("counter", "HTTP-запросы по эндпоинтам и кодам ответа"),
+    "gameevents_http_request_duration_seconds": ("histogram", "Время обработки HTTP-запроса"),
+    "gameevents_http_request_db_queries": ("histogram", "Число SQL-запросов на HTTP-запрос"),
+    "gameevents_db_query_duration_seconds": ("histogram", "Время выполнения SQL-запроса"),
+    "gameevents_db_query_rows_total": ("counter", "Строк возвращено/изменено SQL-запросами"),
+    "gameevents_db_slow_queries_total": ("counter", "SQL-запросы дольше порога SLOW_QUERY_MS"),
+    "gameevents_db_connection_acquire_seconds": ("histogram", "Ожидание соединения из пула"),
+    "gameevents_db_pool_connections": ("gauge", "Соединения пула по состоянию (по процессам)"),
+    "gameevents_db_replica_up": ("gauge", "Реплика доступна (1) или нет (0) по последней проверке"),
+    "gameevents_db_replica_lag_seconds": ("gauge", "Отставание реплики от primary, с"),
+    "gameevents_db_replica_connections": ("gauge", "Занятые соединения пула реплики"),
+    "gameevents_cache_requests_total": ("counter", "Обращения к кэшам моделей (hit/miss)"),
+    "gameevents_coalesced_calls_total": ("counter", "Одновременные одинаковые чтения: leader — выполнил, shared — ждал"),
+    "gameevents_rate_limit_fallbacks_total": ("counter", "Списания по корзинам процесса: файл RATE_LIMIT_STORE занят или недоступен"),
+    "gameevents_push_subscribers": ("gauge", "Подключённые клиенты потока /api/events/stream"),
+    "gameevents_ready": ("gauge", "Воркер закончил старт (1) или ещё нет (0)"),
+    "gameevents_boot_seconds": ("gauge", "Время старта воркера по этапам, с"),
+}
+
+Labels = tuple[tuple[str, str], ...]
+Sample = tuple[str, dict[str, Any], float]
+
+_LITERAL_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_SPACE_RE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=1024)
+def fingerprint(query: str) -> tuple[str, str]:
+    """
+    Нормализуем SQL (литералы -> ?, пробелы схлопнуты) и считаем короткий хэш.
+    Возвращаем (хэш, нормализованный текст) — хэш идёт в метки метрик.
+    """
+    normalized = _LITERAL_RE.sub("?", query)
+    normalized = _NUMBER_RE.sub("?", normalized)
+    normalized = _SPACE_RE.sub(" ", normalized).strip().rstrip(";")
+    return hashlib.sha1(normalized.encode()).hexdigest()[:12], normalized
+
+
+def _labels(**labels: Any) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class MetricsRegistry:
+    """Счётчики и гистограммы одного процесса."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counters: dict[tuple[str, Labels], float] = {}
+        self._histograms: dict[tuple[str, Labels], dict[str, Any]] = {}
+        self._last_flush = 0.0
+
+    def inc(self, name: str, value: float = 1.0, **labels: Any) -> None:
+        key = (name, _labels(**labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, buckets: tuple = DURATION_BUCKETS, **labels: Any) -> None:
+        key = (name, _labels(**labels))
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = {"buckets": list(buckets), "counts": [0] * len(buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(hist["buckets"]):
+                if value <= bound:
+                    hist["counts"][i] += 1
+            hist["sum"] += value
+            hist["count"] += 1
+
+    def snapshot(self) -> dict[str, Any]:
+        """Снимок для сериализации в JSON (и для слияния между процессами)."""
+        with self._lock:
+            counters = [[name, list(map(list, labels)), value] for (name, labels), value in self._counters.items()]
+            histograms = [
+                [name, list(map(list, labels)), {**hist, "counts": list(hist["counts"])}]
+                for (name, labels), hist in self._histograms.items()
+            ]
+
+        # Значения, которые процесс и так считает сам (пул, кэши), снимаем в момент снимка
+        gauges = []
+        for collector in list(_collectors):
+            for name, labels, value in collector():
+                item = [name, list(map(list, _labels(**labels))), value]
+                if _HELP.get(name, ("gauge",))[0] == "counter":
+                    counters.append(item)
+                else:
+                    gauges.append(item)
+        return {"pid": os.getpid(), "counters": counters, "histograms": histograms, "gauges": gauges}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def flush(self, force: bool = False) -> None:
+        """Записываем снимок в METRICS_DIR (не чаще METRICS_FLUSH_INTERVAL)."""
+        if METRICS_DIR is None:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_flush < METRICS_FLUSH_INTERVAL:
+            return
+        self._last_flush = now
+
+        directory = Path(METRICS_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"metrics_{os.getpid()}.json"
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.snapshot()), encoding="utf-8")
+        # Атомарная замена: читатель никогда не увидит недописанный файл
+        os.replace(tmp, path)
+
+
+_collectors: list[Callable[[], list[Sample]]] = []
+
+
+def register_collector(collector: Callable[[], list[Sample]]) -> None:
+    """collector() возвращает [(имя, метки, значение)] — вызывается при каждом снимке."""
+    _collectors.append(collector)
+
+
+registry = MetricsRegistry()
+atexit.register(lambda: registry.flush(force=True))
+
+
+def _reset_after_fork() -> None:
+    # Воркер начинает с нуля: счётчики мастера уже учтены в его собственном файле
+    global registry
+    registry = MetricsRegistry()
+    atexit.register(lambda: registry.flush(force=True))
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def collect_snapshots() -> list[dict[str, Any]]:
+    """Снимки всех процессов: свой — из памяти, остальные — из METRICS_DIR."""
+    own = registry.snapshot()
+    if METRICS_DIR is None:
+        return [own]
+
+    registry.flush(force=True)
+    snapshots = [own]
+    for path in Path(METRICS_DIR).glob("metrics_*.json"):
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+        if data.get("pid") != own["pid"]:
+            snapshots.append(data)
+    return snapshots
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _format_labels(labels: list | Labels, extra: tuple[tuple[str, str], ...] = ()) -> str:
+    items = [tuple(item) for item in labels] + list(extra)
+    if not items:
+        return ""
+    escaped = (f'{k}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"' for k, v in items)
+    return "{" + ",".join(escaped) + "}"
+
+
+def render_prometheus(snapshots: list[dict[str, Any]]) -> str:
+    """
+    Текстовый формат Prometheus 0.0.4. Счётчики и гистограммы суммируются
+    по всем процессам (включая завершившиеся — иначе счётчики пойдут вниз),
+    gauge — только живых процессов, с меткой pid.
+    """
+    counters: dict[tuple[str, tuple], float] = {}
+    histograms: dict[tuple[str, tuple], dict[str, Any]] = {}
+    gauges: list[tuple[str, tuple, float]] = []
+
+    for snap in snapshots:
+        pid = snap.get("pid")
+        if pid == os.getpid() or (pid is not None and _pid_alive(pid)):
+            for name, labels, value in snap.get("gauges", ()):
+                gauges.append((name, tuple(sorted([*map(tuple, labels), ("pid", str(pid))])), value))
+        for name, labels, value in snap.get("counters", ()):
+            key = (name, tuple(tuple(label) for label in labels))
+            counters[key] = counters.get(key, 0.0) + value
+        for name, labels, hist in snap.get("histograms", ()):
+            key = (name, tuple(tuple(label) for label in labels))
+            merged = histograms.get(key)
+            if merged is None:
+                histograms[key] = {**hist, "counts": list(hist["counts"])}
+            else:
+                merged["counts"] = [a + b for a, b in zip(merged["counts"], hist["counts"])]
+                merged["sum"] += hist["sum"]
+                merged["count"] += hist["count"]
+
+    lines: list[str] = []
+    seen: set[str] = set()
+
+    def header(name: str) -> None:
+        if name in seen:
+            return
+        seen.add(name)
+        kind, text = _HELP.get(name, ("untyped", name))
+        lines.append(f"# HELP {name} {text}")
+        lines.append(f"# TYPE {name} {kind}")
+
+    for (name, labels), value in sorted(counters.items()):
+        header(name)
+        lines.append(f"{name}{_format_labels(labels)} {value:g}")
+
+    for (name, labels), hist in sorted(histograms.items()):
+        header(name)
+        for bound, count in zip(hist["buckets"], hist["counts"]):
+            lines.append(f"{name}_bucket{_format_labels(labels, (('le', f'{bound:g}'),))} {count}")
+        lines.append(f"{name}_bucket{_format_labels(labels, (('le', '+Inf'),))} {hist['count']}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {hist['sum']:.6f}")
+        lines.append(f"{name}_count{_format_labels(labels)} {hist['count']}")
+
+    for name, labels, value in sorted(gauges):
+        header(name)
+        lines.append(f"{name}{_format_labels(labels)} {value:g}")
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,124 @@
+import re
+from pathlib import Path
+
+from psycopg2 import extensions
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / "migrations"
+
+# Ключ advisory-блокировки: одновременно миграции накатывает только один процесс
+MIGRATIONS_LOCK_ID = 7_310_001
+
+_MIGRATION_FILE_RE = re.compile(r"^(\d+)_(\w+)\.sql$")
+
+
+class Migration:
+    """Одна миграция: номер версии, имя и SQL из файла."""
+
+    def __init__(self, version: int, name: str, path: Path) -> None:
+        self.version = version
+        self.name = name
+        self.path = path
+
+    def read_sql(self) -> str:
+        return self.path.read_text(encoding="utf-8")
+
+    def __repr__(self) -> str:
+        return f"Migration({self.version}, {self.name!r})"
+
+
+def discover_migrations(directory: Path = MIGRATIONS_DIR) -> list[Migration]:
+    """Файлы вида 0001_name.sql, отсортированные по номеру версии."""
+    migrations = []
+    for path in directory.glob("*.sql"):
+        match = _MIGRATION_FILE_RE.match(path.name)
+        if match is None:
+            continue
+        migrations.append(Migration(int(match.group(1)), match.group(2), path))
+
+    migrations.sort(key=lambda m: m.version)
+    versions = [m.version for m in migrations]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError(f"Дублирующиеся номера миграций в {directory}")
+    return migrations
+
+
+def get_applied_versions(conn: extensions.connection) -> set[int]:
+    cur = conn.cursor()
+    cur.execute("SELECT version FROM schema_version;")
+    versions = {row[0] for row in cur.fetchall()}
+    cur.close()
+    return versions
+
+
+def pending_versions(conn: extensions.connection, directory: Path = MIGRATIONS_DIR) -> list[int]:
+    """Номера миграций из directory, ещё не применённых в базе."""
+    cur = conn.cursor()
+    cur.execute("SELECT to_regclass('schema_version') IS NOT NULL;")
+    exists = cur.fetchone()[0]
+    cur.close()
+    applied = get_applied_versions(conn) if exists else set()
+    return [m.version for m in discover_migrations(directory) if m.version not in applied]
+
+
+def run_migrations(
+    conn: extensions.connection,
+    directory: Path = MIGRATIONS_DIR,
+    wait: bool = True,
+) -> list[Migration] | None:
+    """
+    Накатываем недостающие миграции, каждую в своей транзакции.
+
+    Держим advisory-блокировку на время работы: если несколько воркеров
+    gunicorn стартуют одновременно, остальные дождутся первого и увидят,
+    что всё уже применено. wait=False — не ждём: если блокировку держит
+    другой процесс, сразу возвращаем None (миграции накатывает он).
+    Возвращаем список применённых миграций.
+    """
+    conn.commit()
+    cur = conn.cursor()
+    if wait:
+        cur.execute("SELECT pg_advisory_lock(%s);", (MIGRATIONS_LOCK_ID,))
+    else:
+        cur.execute("SELECT pg_try_advisory_lock(%s);", (MIGRATIONS_LOCK_ID,))
+        if not cur.fetchone()[0]:
+            conn.commit()
+            cur.close()
+            return None
+    conn.commit()
+
+    applied_now: list[Migration] = []
+    try:
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+            );
+            """
+        )
+        conn.commit()
+
+        applied = get_applied_versions(conn)
+        for migration in discover_migrations(directory):
+            if migration.version in applied:
+                continue
+            print(f"[DB] Миграция {migration.version:04d}_{migration.name}")
+            try:
+                cur.execute(migration.read_sql())
+                cur.execute(
+                    "INSERT INTO schema_version (version, name) VALUES (%s, %s);",
+                    (migration.version, migration.name),
+                )
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            applied_now.append(migration)
+    finally:
+        conn.rollback()
+        cur.execute("SELECT pg_advisory_unlock(%s);", (MIGRATIONS_LOCK_ID,))
+        conn.commit()
+        cur.close()
+
+    return applied_now
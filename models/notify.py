@@ -0,0 +1,214 @@
+import json
+import os
+import select
+import threading
+import uuid
+from typing import Any, Callable
+
+import psycopg2
+from psycopg2 import extensions
+
+from . import cache
+from .database import DATABASE_REPLICA_URLS, DATABASE_URL, execute, note_write_lsn
+from .replicas import CURRENT_LSN_QUERY
+
+# Канал, в который модели пишут об изменениях данных
+CHANGES_CHANNEL = "gameevents_changes"
+
+ChangeHandler = Callable[[dict[str, Any]], None]
+
+# Уникальный идентификатор процесса: свои уведомления слушатель пропускает,
+# кэши своего процесса модели уже сбросили сами. pid не подходит —
+# в разных контейнерах он может совпадать.
+_origin = uuid.uuid4().hex
+
+_handlers: dict[str, list[ChangeHandler]] = {}
+_flush_handlers: list[Callable[[], None]] = [cache.invalidate_all]
+_handlers_lock = threading.Lock()
+
+
+def subscribe(table: str, handler: ChangeHandler) -> None:
+    """Подписываемся на изменения таблицы; handler получает payload уведомления."""
+    with _handlers_lock:
+        _handlers.setdefault(table, []).append(handler)
+
+
+def subscribe_flush(handler: Callable[[], None]) -> None:
+    """Полный сброс: вызывается, если уведомления могли быть потеряны."""
+    with _handlers_lock:
+        _flush_handlers.append(handler)
+
+
+def notify_change(table: str, op: str, row_id: int | None, **extra: Any) -> None:
+    """
+    Сообщаем остальным воркерам об изменении строки.
+    Внутри транзакции NOTIFY доставляется только после commit.
+    """
+    payload = {"table": table, "op": op, "id": row_id, "origin": _origin, **extra}
+    execute("SELECT pg_notify(%s, %s);", (CHANGES_CHANNEL, json.dumps(payload)))
+
+
+def dispatch(raw_payload: str) -> bool:
+    """Передаём уведомление подписчикам. False — если оно своё или битое."""
+    try:
+        payload = json.loads(raw_payload)
+        table = payload["table"]
+    except (ValueError, KeyError, TypeError):
+        print(f"[NOTIFY] Некорректное уведомление: {raw_payload!r}")
+        return False
+
+    if payload.get("origin") == _origin:
+        return False
+
+    with _handlers_lock:
+        handlers = list(_handlers.get(table, ()))
+    for handler in handlers:
+        handler(payload)
+    return True
+
+
+def flush_all() -> None:
+    with _handlers_lock:
+        handlers = list(_flush_handlers)
+    for handler in handlers:
+        handler()
+
+
+class ChangeListener(threading.Thread):
+    """
+    Фоновый поток: LISTEN на канале изменений через отдельное соединение
+    (не из пула) и сброс локальных кэшей по каждому уведомлению.
+
+    При обрыве соединения переподключаемся с экспоненциальной задержкой,
+    а после (пере)подключения сбрасываем все кэши целиком — за время
+    простоя уведомления могли быть потеряны.
+    """
+
+    def __init__(
+        self,
+        dsn: str = DATABASE_URL,
+        channel: str = CHANGES_CHANNEL,
+        poll_timeout: float = 5.0,
+        reconnect_delay: float = 0.5,
+        max_reconnect_delay: float = 30.0,
+    ) -> None:
+        super().__init__(name="db-change-listener", daemon=True)
+        self.dsn = dsn
+        self.channel = channel
+        self.poll_timeout = poll_timeout
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+
+        self.connected = threading.Event()
+        self.backend_pid: int | None = None
+        self.received = 0
+        self.reconnects = 0  # успешные переподключения после обрыва
+        self._stop_event = threading.Event()
+
+    def stop(self, timeout: float | None = None) -> None:
+        self._stop_event.set()
+        self.join(timeout)
+
+    def run(self) -> None:
+        delay = self.reconnect_delay
+        first_connect = True
+        while not self._stop_event.is_set():
+            try:
+                conn = self._connect()
+            except psycopg2.Error as exc:
+                print(f"[NOTIFY] Не удалось подключиться: {exc}")
+                self._stop_event.wait(delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
+                continue
+
+            delay = self.reconnect_delay
+            flush_all()
+            if not first_connect:
+                self.reconnects += 1
+            first_connect = False
+            self.connected.set()
+            try:
+                self._listen(conn)
+            except (psycopg2.Error, OSError) as exc:
+                print(f"[NOTIFY] Соединение потеряно: {exc}")
+            finally:
+                self.connected.clear()
+                self.backend_pid = None
+                try:
+                    conn.close()
+                except psycopg2.Error:
+                    pass
+
+    def _connect(self) -> extensions.connection:
+        conn = psycopg2.connect(self.dsn)
+        conn.set_isolation_level(extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        cur = conn.cursor()
+        cur.execute(f'LISTEN "{self.channel}";')
+        cur.close()
+        self.backend_pid = conn.get_backend_pid()
+        return conn
+
+    def _listen(self, conn: extensions.connection) -> None:
+        while not self._stop_event.is_set():
+            readable, _, _ = select.select([conn], [], [], self.poll_timeout)
+            if not readable:
+                # Тишина — проверяем, что соединение ещё живо
+                cur = conn.cursor()
+                cur.execute("SELECT 1;")
+                cur.close()
+            conn.poll()
+            if conn.notifies and DATABASE_REPLICA_URLS:
+                # Изменения уже на primary: пока реплики их не проиграли,
+                # обработчики (перечитывание кэшей) читают с primary
+                cur = conn.cursor()
+                cur.execute(CURRENT_LSN_QUERY)
+                note_write_lsn(int(cur.fetchone()[0]))
+                cur.close()
+            while conn.notifies:
+                notification = conn.notifies.pop(0)
+                self.received += 1
+                dispatch(notification.payload)
+
+
+_listener: ChangeListener | None = None
+_listener_lock = threading.Lock()
+
+
+def start_listener(**options: Any) -> ChangeListener:
+    """Запускаем слушателя изменений для текущего процесса (один на процесс)."""
+    global _listener
+    with _listener_lock:
+        if _listener is None or not _listener.is_alive():
+            _listener = ChangeListener(**options)
+            _listener.start()
+        return _listener
+
+
+def stop_listener() -> None:
+    global _listener
+    with _listener_lock:
+        listener, _listener = _listener, None
+    if listener is not None:
+        listener.stop()
+
+
+def _restart_after_fork() -> None:
+    # Потоки не переживают fork: если слушатель работал в мастере
+    # (gunicorn --preload), запускаем свой в каждом воркере.
+    global _origin, _listener, _listener_lock, _handlers_lock
+    _origin = uuid.uuid4().hex
+    _handlers_lock = threading.Lock()
+    _listener_lock = threading.Lock()
+    parent_listener, _listener = _listener, None
+    if parent_listener is not None:
+        start_listener(
+            dsn=parent_listener.dsn,
+            channel=parent_listener.channel,
+            poll_timeout=parent_listener.poll_timeout,
+            reconnect_delay=parent_listener.reconnect_delay,
+            max_reconnect_delay=parent_listener.max_reconnect_delay,
+        )
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_after_fork)
@@ -0,0 +1,301 @@
+import os
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from .cache import on_invalidate_all, to_naive_utc
+from .database import fetch_all, fetch_one, transaction
+from .notify import notify_change, subscribe
+
+# Разделы по месяцам: сколько месяцев вперёд создаём заранее. Ивенты дальше
+# этого срока попадают в раздел events_future
+PARTITION_MONTHS_AHEAD = int(os.environ.get("PARTITION_MONTHS_AHEAD", "12"))
+# Создание и удаление раздела ждёт блокировку родителя не дольше этого:
+# иначе встанут все запросы к таблице. Не успели — попробуем в следующий проход
+PARTITION_LOCK_TIMEOUT = os.environ.get("PARTITION_LOCK_TIMEOUT", "2s")
+
+# Таблица -> ключ разбиения. Награда лежит в разделе месяца старта своего ивента
+PARTITION_KEYS = {"events": "starts_at", "rewards": "event_starts_at"}
+
+_partitioned: bool | None = None
+
+PARTITIONED_QUERY = "SELECT relkind = 'p' AS partitioned FROM pg_class WHERE oid = to_regclass('events');"
+
+PARTITIONS_QUERY = """
+    SELECT c.relname AS name
+    FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    WHERE i.inhparent = 'events'::regclass;
+"""
+
+
+def is_partitioned() -> bool:
+    """Разбита ли events на разделы (`flask partition-events`). Проверяем один раз на процесс."""
+    global _partitioned
+    if _partitioned is None:
+        row = fetch_one(PARTITIONED_QUERY, primary=True)
+        _partitioned = bool(row and row["partitioned"])
+    return _partitioned
+
+
+def _reset() -> None:
+    global _partitioned
+    _partitioned = None
+
+
+def _on_events_changed(payload: dict[str, Any]) -> None:
+    if payload.get("op") == "partition":
+        _reset()
+
+
+on_invalidate_all(_reset)
+subscribe("events", _on_events_changed)
+
+
+def month_start(dt: datetime) -> datetime:
+    """Начало месяца (UTC) — граница раздела."""
+    return to_naive_utc(dt).replace(day=1, hour=0, minute=0, second=0, microsecond=0, tzinfo=timezone.utc)
+
+
+def next_month(month: datetime) -> datetime:
+    return (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def partition_name(table: str, month: datetime) -> str:
+    return f"{table}_p{month:%Y_%m}"
+
+
+_PARTITION_NAME_RE = re.compile(r"^events_p(\d{4})_(\d{2})$")
+
+
+def _existing_partitions() -> set[str]:
+    return {row["name"] for row in fetch_all(PARTITIONS_QUERY, primary=True)}
+
+
+def _existing_months() -> list[datetime]:
+    """Месяцы, у которых есть свой раздел, по возрастанию."""
+    matches = (_PARTITION_NAME_RE.match(name) for name in _existing_partitions())
+    return sorted(datetime(int(m[1]), int(m[2]), 1, tzinfo=timezone.utc) for m in matches if m)
+
+
+# Разделов DEFAULT нет намеренно: с ним PostgreSQL не умеет читать разделы
+# по порядку (Append) и для ORDER BY starts_at ... LIMIT сливает все разделы
+# (Merge Append), начиная каждый — окно по времени на миллионе ивентов
+# замедлялось с 2 мс до 400 мс. Вместо него — крайние диапазоны:
+# {table}_history до первого месяца и {table}_future после последнего
+def _create_range(cur: Any, name: str, lower: datetime | str, upper: datetime | str) -> None:
+    for table in PARTITION_KEYS:
+        bounds = [b if isinstance(b, str) else cur.mogrify("%s", (b,)).decode() for b in (lower, upper)]
+        cur.execute(f"CREATE TABLE {table}_{name} PARTITION OF {table} FOR VALUES FROM ({bounds[0]}) TO ({bounds[1]});")
+
+
+def _drop_ranges(cur: Any, *names: str) -> None:
+    # На разделы events ссылается внешний ключ rewards: их сначала отсоединяем
+    cur.execute(f"DROP TABLE {', '.join(f'rewards_{name}' for name in names)};")
+    for name in names:
+        cur.execute(f"ALTER TABLE events DETACH PARTITION events_{name};")
+    cur.execute(f"DROP TABLE {', '.join(f'events_{name}' for name in names)};")
+
+
+def _create_month(cur: Any, month: datetime) -> bool:
+    """
+    Отрезаем от {table}_future разделы месяца month (он начинается там, где
+    future). Если в events_future уже есть ивенты, раздел не создаём: строки
+    пришлось бы переносить — они остаются в future, где их тоже найдут.
+    """
+    cur.execute("SELECT EXISTS (SELECT 1 FROM events_future);")
+    if cur.fetchone()[0]:
+        print(f"[PARTITION] В events_future есть ивенты — раздел {month:%Y-%m} не создан")
+        return False
+    _drop_ranges(cur, "future")
+    _create_range(cur, f"p{month:%Y_%m}", month, next_month(month))
+    _create_range(cur, "future", next_month(month), "MAXVALUE")
+    return True
+
+
+def ensure_partitions(now: datetime | None = None, months_ahead: int = PARTITION_MONTHS_AHEAD) -> list[str]:
+    """
+    Досоздаём разделы до месяца на months_ahead вперёд от текущего.
+    Возвращаем имена созданных разделов events (схема без разделов — []).
+    """
+    if not is_partitioned():
+        return []
+    months = _existing_months()
+    target = month_start(now or datetime.utcnow())
+    for _ in range(months_ahead):
+        target = next_month(target)
+    created = []
+    month = next_month(months[-1])
+    while month <= target:
+        # Каждый раздел — своя короткая транзакция
+        with transaction() as uow:
+            cur = uow.connection.cursor()
+            cur.execute(f"SET LOCAL lock_timeout = '{PARTITION_LOCK_TIMEOUT}';")
+            ok = _create_month(cur, month)
+            cur.close()
+        if not ok:
+            break
+        created.append(partition_name("events", month))
+        month = next_month(month)
+    if created:
+        print(f"[PARTITION] Созданы разделы: {', '.join(created)}")
+    return created
+
+
+def drop_empty_partitions(before: datetime) -> list[str]:
+    """
+    Удаляем пустые разделы месяцев, закончившихся раньше before: после
+    переноса в архив (models/lifecycle.py) в них ничего не осталось, а
+    каждый лишний раздел удлиняет планирование запросов. Удаляем только
+    с начала — диапазон {table}_history дорастает до следующего месяца.
+    """
+    if not is_partitioned():
+        return []
+    dropped = []
+    for month in _existing_months()[:-1]:
+        if next_month(month) > month_start(before):
+            break
+        name = partition_name("events", month)
+        with transaction() as uow:
+            cur = uow.connection.cursor()
+            cur.execute(f"SET LOCAL lock_timeout = '{PARTITION_LOCK_TIMEOUT}';")
+            rewards = partition_name("rewards", month)
+            # Под блокировкой: пока проверяем, в разделы никто не пишет
+            cur.execute(f"LOCK TABLE rewards_history, {rewards}, events_history, {name} IN ACCESS EXCLUSIVE MODE;")
+            cur.execute(f"SELECT EXISTS (SELECT 1 FROM events_history) OR EXISTS (SELECT 1 FROM {name});")
+            empty = not cur.fetchone()[0]
+            if empty:
+                _drop_ranges(cur, "history", f"p{month:%Y_%m}")
+                _create_range(cur, "history", "MINVALUE", next_month(month))
+            cur.close()
+        if not empty:
+            break
+        dropped.append(name)
+    if dropped:
+        print(f"[PARTITION] Удалены пустые разделы: {', '.join(dropped)}")
+    return dropped
+
+
+def _copy_definitions(cur: Any, table: str, old: str) -> list[str]:
+    """CREATE INDEX / CREATE TRIGGER старой таблицы — для новой (кроме первичного ключа)."""
+    cur.execute(
+        """
+        SELECT pg_get_indexdef(indexrelid) FROM pg_index WHERE indrelid = %s::regclass AND NOT indisprimary
+        UNION ALL
+        SELECT pg_get_triggerdef(oid) FROM pg_trigger WHERE tgrelid = %s::regclass AND NOT tgisinternal;
+        """,
+        (old, old),
+    )
+    on_old = re.compile(rf" ON ((?:\w+\.)?){old} ")
+    return [on_old.sub(rf" ON \g<1>{table} ", row[0]) for row in cur.fetchall()]
+
+
+def _columns(cur: Any, table: str) -> list[str]:
+    # Генерируемые столбцы (search_vector) PostgreSQL заполнит сам
+    cur.execute(
+        """
+        SELECT attname FROM pg_attribute
+        WHERE attrelid = %s::regclass AND attnum > 0 AND NOT attisdropped AND attgenerated = ''
+        ORDER BY attnum;
+        """,
+        (table,),
+    )
+    return [row[0] for row in cur.fetchall()]
+
+
+def partition_tables(now: datetime | None = None, months_ahead: int = PARTITION_MONTHS_AHEAD) -> dict[str, Any]:
+    """
+    Переводим events и rewards на разделы по месяцам starts_at (rewards — по
+    event_starts_at, копии starts_at своего ивента). Одна транзакция под
+    ACCESS EXCLUSIVE: таблицы пересоздаются, данные копируются, индексы и
+    триггеры переносятся, первичные ключи становятся (id, starts_at).
+    Разделы — месяцы подряд от первого ивента до months_ahead вперёд, плюс
+    крайние диапазоны history и future.
+    Уже разбитые таблицы не трогаем — только досоздаём разделы.
+    """
+    if is_partitioned():
+        return {"converted": False, "created": ensure_partitions(now, months_ahead)}
+
+    with transaction() as uow:
+        cur = uow.connection.cursor()
+        cur.execute("LOCK TABLE events, rewards IN ACCESS EXCLUSIVE MODE;")
+        sequences = {}
+        for table in PARTITION_KEYS:
+            cur.execute("SELECT pg_get_serial_sequence(%s, 'id');", (table,))
+            sequences[table] = cur.fetchone()[0]
+            # Иначе последовательность удалится вместе со старой таблицей
+            cur.execute(f"ALTER SEQUENCE {sequences[table]} OWNED BY NONE;")
+            cur.execute(f"ALTER TABLE {table} RENAME TO {table}_unpartitioned;")
+
+        cur.execute(
+            """
+            CREATE TABLE events (LIKE events_unpartitioned INCLUDING DEFAULTS INCLUDING GENERATED INCLUDING CONSTRAINTS)
+                PARTITION BY RANGE (starts_at);
+            CREATE TABLE rewards (
+                LIKE rewards_unpartitioned INCLUDING DEFAULTS INCLUDING CONSTRAINTS,
+                event_starts_at TIMESTAMPTZ NOT NULL
+            ) PARTITION BY RANGE (event_starts_at);
+            """
+        )
+
+        # Месяцы подряд: от первого с ивентами до months_ahead вперёд (или
+        # до последнего с ивентами, если он дальше)
+        cur.execute("SELECT date_trunc('month', min(starts_at), 'UTC'), max(starts_at) FROM events_unpartitioned;")
+        first, last = cur.fetchone()
+        current = month_start(now or datetime.utcnow())
+        horizon = current
+        for _ in range(months_ahead):
+            horizon = next_month(horizon)
+        month = min(month_start(first), current) if first else current
+        horizon = max(horizon, month_start(last)) if last else horizon
+        _create_range(cur, "history", "MINVALUE", month)
+        months = 0
+        while month <= horizon:
+            _create_range(cur, f"p{month:%Y_%m}", month, next_month(month))
+            months += 1
+            month = next_month(month)
+        _create_range(cur, "future", month, "MAXVALUE")
+
+        event_columns = ", ".join(_columns(cur, "events_unpartitioned"))
+        cur.execute(f"INSERT INTO events ({event_columns}) SELECT {event_columns} FROM events_unpartitioned;")
+        events_copied = cur.rowcount
+        reward_columns = _columns(cur, "rewards_unpartitioned")
+        cur.execute(
+            f"""
+            INSERT INTO rewards ({', '.join(reward_columns)}, event_starts_at)
+            SELECT {', '.join('r.' + c for c in reward_columns)}, e.starts_at
+            FROM rewards_unpartitioned r
+            JOIN events_unpartitioned e ON e.id = r.event_id;
+            """
+        )
+        rewards_copied = cur.rowcount
+
+        definitions = _copy_definitions(cur, "events", "events_unpartitioned")
+        definitions += _copy_definitions(cur, "rewards", "rewards_unpartitioned")
+        cur.execute("DROP TABLE rewards_unpartitioned, events_unpartitioned;")
+
+        # Уникальность и внешний ключ на разделах обязаны включать ключ
+        # разбиения. ON UPDATE CASCADE: при смене starts_at награды ивента
+        # переезжают в раздел нового месяца вместе с ним
+        cur.execute(
+            """
+            ALTER TABLE events ADD PRIMARY KEY (id, starts_at);
+            ALTER TABLE rewards ADD PRIMARY KEY (id, event_starts_at);
+            ALTER TABLE rewards ADD FOREIGN KEY (event_id, event_starts_at)
+                REFERENCES events (id, starts_at) ON UPDATE CASCADE ON DELETE CASCADE;
+            """
+        )
+        for definition in definitions:
+            cur.execute(definition + ";")
+        for table, sequence in sequences.items():
+            cur.execute(f"ALTER SEQUENCE {sequence} OWNED BY {table}.id;")
+        cur.execute("ANALYZE events; ANALYZE rewards;")
+        cur.close()
+
+        uow.dirty = True
+        # Остальные воркеры перечитают схему и сбросят кэши
+        notify_change("events", "partition", None)
+        uow.on_commit(_reset)
+
+    print(f"[PARTITION] events и rewards разбиты по месяцам: {months} месяцев, ивентов {events_copied}")
+    return {"converted": True, "partitions": months, "events": events_copied, "rewards": rewards_copied}
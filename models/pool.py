@@ -0,0 +1,244 @@
+import os
+import threading
+import time
+from collections import deque
+from typing import Any
+
+import psycopg2
+from psycopg2 import extensions
+from psycopg2.pool import PoolError
+
+
+class PoolTimeoutError(PoolError):
+    """Не дождались свободного соединения за отведённое время."""
+
+
+class _PooledConn:
+    """Соединение из пула + служебные отметки времени."""
+
+    __slots__ = ("conn", "created_at", "last_used_at")
+
+    def __init__(self, conn: extensions.connection) -> None:
+        now = time.monotonic()
+        self.conn = conn
+        self.created_at = now
+        self.last_used_at = now
+
+
+class ConnectionPool:
+    """
+    Потокобезопасный пул соединений psycopg2.
+
+    - minconn / maxconn — сколько соединений держим открытыми и сколько максимум;
+    - timeout — сколько секунд ждём свободное соединение, потом PoolTimeoutError;
+    - max_lifetime — соединения старше этого возраста пересоздаются;
+    - health_check_after — если соединение простаивало дольше, перед выдачей
+      проверяем его через SELECT 1.
+
+    Пул привязан к процессу (pid): после fork (gunicorn --preload) дочерний
+    процесс не должен пользоваться сокетами родителя, см. is_owned_by_current_process().
+    """
+
+    def __init__(
+        self,
+        dsn: str,
+        minconn: int = 1,
+        maxconn: int = 10,
+        timeout: float = 5.0,
+        max_lifetime: float = 1800.0,
+        health_check_after: float = 30.0,
+    ) -> None:
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError("Некорректные размеры пула: нужно 0 <= minconn <= maxconn, maxconn >= 1")
+
+        self.dsn = dsn
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.health_check_after = health_check_after
+
+        self.pid = os.getpid()
+        self._cond = threading.Condition()
+        self._idle: deque[_PooledConn] = deque()
+        self._used: dict[int, _PooledConn] = {}
+        # Соединения вне _idle и _used: открываются, проверяются перед выдачей
+        # или сбрасываются после возврата (сеть — без блокировки пула)
+        self._reserved = 0
+        self._closed = False
+
+        # Метрики
+        self._waiting = 0
+        self._checkouts = 0
+        self._timeouts = 0
+        self._recycled = 0
+        self._checkout_time_total = 0.0
+        self._checkout_time_max = 0.0
+
+        for _ in range(minconn):
+            self._idle.append(self._connect())
+
+    # ---------- служебное ----------
+
+    def _connect(self) -> _PooledConn:
+        return _PooledConn(psycopg2.connect(self.dsn))
+
+    @staticmethod
+    def _close_quietly(item: _PooledConn) -> None:
+        try:
+            item.conn.close()
+        except Exception:
+            pass
+
+    def _size(self) -> int:
+        return len(self._idle) + len(self._used) + self._reserved
+
+    def _is_usable(self, item: _PooledConn, now: float) -> bool:
+        """Проверка соединения перед выдачей: не закрыто, не устарело, живо. Вызывается без блокировки."""
+        if item.conn.closed:
+            return False
+        if self.max_lifetime and now - item.created_at > self.max_lifetime:
+            with self._cond:
+                self._recycled += 1
+            return False
+        if self.health_check_after is not None and now - item.last_used_at > self.health_check_after:
+            try:
+                cur = item.conn.cursor()
+                cur.execute("SELECT 1;")
+                cur.close()
+                item.conn.rollback()
+            except psycopg2.Error:
+                return False
+        return True
+
+    def is_owned_by_current_process(self) -> bool:
+        return self.pid == os.getpid()
+
+    # ---------- публичное API ----------
+
+    def getconn(self) -> extensions.connection:
+        """Берём соединение из пула (или открываем новое, если есть место)."""
+        started = time.monotonic()
+        deadline = started + self.timeout
+
+        while True:
+            item = self._reserve(deadline)
+            if item is None:
+                break
+            # Проверяем вне блокировки: SELECT 1 медленного соединения не держит остальных
+            if self._is_usable(item, time.monotonic()):
+                with self._cond:
+                    if not self._closed:
+                        self._reserved -= 1
+                        return self._checkout(item, started)
+            self._close_quietly(item)
+            with self._cond:
+                self._reserved -= 1
+                self._cond.notify()
+
+        # Открываем новое соединение вне блокировки, чтобы не держать остальных
+        try:
+            item = self._connect()
+        except Exception:
+            with self._cond:
+                self._reserved -= 1
+                self._cond.notify()
+            raise
+
+        with self._cond:
+            self._reserved -= 1
+            return self._checkout(item, started)
+
+    def _reserve(self, deadline: float) -> _PooledConn | None:
+        """
+        Резервируем место в пуле: свободное соединение (его ещё надо проверить)
+        или None — можно открыть новое. Ждём не дольше deadline.
+        """
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise PoolError("Пул соединений закрыт")
+
+                if self._idle:
+                    self._reserved += 1
+                    return self._idle.pop()
+
+                if self._size() < self.maxconn:
+                    self._reserved += 1
+                    return None
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeoutError(
+                        f"Нет свободных соединений за {self.timeout} с (maxconn={self.maxconn})"
+                    )
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+    def _checkout(self, item: _PooledConn, started: float) -> extensions.connection:
+        elapsed = time.monotonic() - started
+        self._used[id(item.conn)] = item
+        self._checkouts += 1
+        self._checkout_time_total += elapsed
+        self._checkout_time_max = max(self._checkout_time_max, elapsed)
+        return item.conn
+
+    def putconn(self, conn: extensions.connection, discard: bool = False) -> None:
+        """Возвращаем соединение в пул. Незавершённая транзакция откатывается."""
+        with self._cond:
+            item = self._used.pop(id(conn), None)
+            if item is None:
+                raise PoolError("Соединение не принадлежит этому пулу")
+            self._reserved += 1
+
+        # ROLLBACK и закрытие — вне блокировки пула
+        if not discard and not conn.closed:
+            try:
+                if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except psycopg2.Error:
+                discard = True
+        if discard or conn.closed:
+            self._close_quietly(item)
+
+        with self._cond:
+            self._reserved -= 1
+            keep = not conn.closed and not self._closed
+            if keep:
+                item.last_used_at = time.monotonic()
+                self._idle.append(item)
+            self._cond.notify()
+        if not keep:
+            # Пул закрыли, пока соединение сбрасывалось
+            self._close_quietly(item)
+
+    def closeall(self) -> None:
+        """Закрываем все соединения пула."""
+        with self._cond:
+            self._closed = True
+            for item in list(self._idle) + list(self._used.values()):
+                self._close_quietly(item)
+            self._idle.clear()
+            self._used.clear()
+            self._cond.notify_all()
+
+    def stats(self) -> dict[str, Any]:
+        """Метрики пула: занято/свободно/ожидают и время получения соединения."""
+        with self._cond:
+            checkouts = self._checkouts
+            return {
+                "size": self._size(),
+                "in_use": len(self._used),
+                "idle": len(self._idle),
+                "waiting": self._waiting,
+                "max_size": self.maxconn,
+                "checkouts": checkouts,
+                "timeouts": self._timeouts,
+                "recycled": self._recycled,
+                "checkout_time_avg_ms": (self._checkout_time_total / checkouts * 1000) if checkouts else 0.0,
+                "checkout_time_max_ms": self._checkout_time_max * 1000,
+            }
@@ -0,0 +1,230 @@
+import asyncio
+import os
+import queue
+import threading
+import uuid
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable
+
+from .timeline import timeline
+
+# Очередь одного клиента: медленный клиент не тормозит остальных — при
+# переполнении получает resync и отключается
+PUSH_QUEUE_SIZE = int(os.environ.get("PUSH_QUEUE_SIZE", "256"))
+# Сколько последних сообщений помним для переподключения с Last-Event-ID
+PUSH_REPLAY_SIZE = int(os.environ.get("PUSH_REPLAY_SIZE", "1000"))
+# Комментарий-пинг в поток, если сообщений нет (чтобы прокси не рвали соединение)
+PUSH_HEARTBEAT = float(os.environ.get("PUSH_HEARTBEAT", "15"))
+# Планировщик просыпается хотя бы так часто, даже если границ впереди нет
+PUSH_MAX_SLEEP = float(os.environ.get("PUSH_MAX_SLEEP", "60"))
+
+# Типы сообщений: по времени — started/ended, по записям — created/updated/deleted,
+# resync — клиенту нужно перечитать /api/events/active (пропущены сообщения)
+OVERFLOW = object()
+
+SSE_HEARTBEAT = b": ping\n\n"
+SSE_RETRY = f"retry: {int(PUSH_HEARTBEAT * 1000)}\n\n".encode()
+
+
+class PushMessage:
+    """Одно сообщение для всех подписчиков; в SSE кодируется один раз."""
+
+    __slots__ = ("id", "type", "data", "_encoded")
+
+    def __init__(self, message_id: str, message_type: str, data: dict[str, Any]) -> None:
+        self.id = message_id
+        self.type = message_type
+        self.data = data
+        self._encoded: bytes | None = None
+
+    def encode(self, dumps: Callable[[Any], str]) -> bytes:
+        if self._encoded is None:
+            self._encoded = f"id: {self.id}\nevent: {self.type}\ndata: {dumps(self.data)}\n\n".encode()
+        return self._encoded
+
+
+class Subscription:
+    """Очередь сообщений одного клиента (поток WSGI-воркера ждёт на get())."""
+
+    def __init__(self, maxsize: int = PUSH_QUEUE_SIZE) -> None:
+        self._queue: queue.Queue = queue.Queue(maxsize)
+
+    def put(self, message: PushMessage) -> None:
+        try:
+            self._queue.put_nowait(message)
+        except queue.Full:
+            self._overflow()
+
+    def _overflow(self) -> None:
+        # Сообщения уже потеряны: очищаем очередь и оставляем только отметку
+        try:
+            while True:
+                self._queue.get_nowait()
+        except queue.Empty:
+            pass
+        self._queue.put_nowait(OVERFLOW)
+
+    def get(self, timeout: float) -> Any:
+        """Сообщение, OVERFLOW или None, если за timeout ничего не пришло."""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class AsyncSubscription:
+    """То же для asyncio: сообщения передаются в event loop потокобезопасно."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, maxsize: int = PUSH_QUEUE_SIZE) -> None:
+        self._loop = loop
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize)
+
+    def put(self, message: PushMessage) -> None:
+        try:
+            self._loop.call_soon_threadsafe(self._put, message)
+        except RuntimeError:
+            # Цикл уже закрыт — клиент ушёл, отписка вот-вот случится
+            pass
+
+    def _put(self, message: PushMessage) -> None:
+        try:
+            self._queue.put_nowait(message)
+        except asyncio.QueueFull:
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            self._queue.put_nowait(OVERFLOW)
+
+    async def get(self, timeout: float) -> Any:
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class Broadcaster:
+    """
+    Один источник сообщений на процесс, раздающий их всем подписчикам.
+
+    Планировщик (фоновый поток) спит до ближайшего старта или окончания
+    ивента по индексу models/timeline.py и рассылает started/ended;
+    записи в models/event.py рассылают created/updated/deleted.
+    Запросов к БД на клиента нет.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._subscribers: set[Any] = set()
+        # id сообщений — «эпоха процесса»-номер: Last-Event-ID от другого
+        # процесса (или до перезапуска) распознаём и отвечаем resync
+        self._epoch = uuid.uuid4().hex[:8]
+        self._seq = 0
+        self._replay: deque[PushMessage] = deque(maxlen=PUSH_REPLAY_SIZE)
+
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._scheduler: threading.Thread | None = None
+
+    @property
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+    def subscribe(self, subscription: Any, last_event_id: str | None = None) -> list[PushMessage]:
+        """
+        Подключаем клиента. Возвращаем сообщения, пропущенные после last_event_id
+        (или одно resync, если их уже не восстановить).
+        """
+        with self._lock:
+            self._subscribers.add(subscription)
+            replay = self._replay_after(last_event_id) if last_event_id else []
+        self._ensure_scheduler()
+        return replay
+
+    def unsubscribe(self, subscription: Any) -> None:
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def _replay_after(self, last_event_id: str) -> list[PushMessage]:
+        epoch, _, seq = last_event_id.partition("-")
+        resync = [PushMessage(f"{self._epoch}-{self._seq}", "resync", {})]
+        if epoch != self._epoch or not seq.isdigit():
+            return resync
+        seq = int(seq)
+        if seq >= self._seq:
+            return []
+        # Нужны все сообщения после seq; если самое старое из них уже вытеснено — resync
+        if not self._replay or int(self._replay[0].id.partition("-")[2]) > seq + 1:
+            return resync
+        return [m for m in self._replay if int(m.id.partition("-")[2]) > seq]
+
+    def publish(self, message_type: str, data: dict[str, Any]) -> PushMessage:
+        with self._lock:
+            self._seq += 1
+            message = PushMessage(f"{self._epoch}-{self._seq}", message_type, data)
+            self._replay.append(message)
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.put(message)
+        return message
+
+    def wake(self) -> None:
+        """Данные изменились — планировщику пора пересчитать ближайшую границу."""
+        self._wake.set()
+
+    def _ensure_scheduler(self) -> None:
+        with self._lock:
+            if self._scheduler is not None and self._scheduler.is_alive():
+                return
+            self._stop.clear()
+            self._scheduler = threading.Thread(target=self._run_scheduler, name="push-scheduler", daemon=True)
+            self._scheduler.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        self._stop.set()
+        self._wake.set()
+        scheduler = self._scheduler
+        if scheduler is not None:
+            scheduler.join(timeout)
+
+    def _run_scheduler(self) -> None:
+        last = datetime.utcnow()
+        while not self._stop.is_set():
+            try:
+                boundary = timeline.next_transition(last)
+            except Exception as exc:
+                print(f"[PUSH] Не удалось прочитать индекс ивентов: {exc}")
+                boundary = None
+
+            timeout = PUSH_MAX_SLEEP
+            if boundary is not None:
+                timeout = min(timeout, max(0.0, (boundary.replace(tzinfo=None) - datetime.utcnow()).total_seconds()))
+            self._wake.wait(timeout)
+            self._wake.clear()
+            if self._stop.is_set():
+                return
+
+            now = datetime.utcnow()
+            try:
+                started, ended = timeline.transitions(last, now)
+            except Exception as exc:
+                print(f"[PUSH] Не удалось прочитать индекс ивентов: {exc}")
+                continue
+            last = now
+            for row in ended:
+                self.publish("ended", row)
+            for row in started:
+                self.publish("started", row)
+
+
+broadcaster = Broadcaster()
+
+
+def _reset_after_fork() -> None:
+    # Поток планировщика не переживает fork; подписчики родителя — не наши
+    global broadcaster
+    broadcaster = Broadcaster()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
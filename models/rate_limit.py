@@ -0,0 +1,189 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+
+# Файл SQLite с корзинами токенов, общий для воркеров gunicorn на машине
+# (замена Redis). Без него у каждого процесса свои корзины — лимит
+# фактически умножается на число воркеров.
+RATE_LIMIT_STORE = os.environ.get("RATE_LIMIT_STORE") or None
+# Как часто удаляем корзины, успевшие наполниться (как будто их нет), с
+RATE_LIMIT_SWEEP_INTERVAL = float(os.environ.get("RATE_LIMIT_SWEEP_INTERVAL", "60"))
+
+_LIMIT_RE = re.compile(r"^\s*(\d+)\s*/\s*(\d+(?:\.\d+)?)\s*$")
+
+
+class Limit:
+    """
+    Лимит «capacity запросов за period секунд»: корзина на capacity токенов,
+    которая наполняется равномерно со скоростью capacity / period в секунду.
+    Всплеск до capacity запросов подряд разрешён.
+    """
+
+    __slots__ = ("capacity", "period")
+
+    def __init__(self, capacity: int, period: float) -> None:
+        if capacity < 1 or period <= 0:
+            raise ValueError("Лимит должен быть не меньше 1 запроса за положительное время")
+        self.capacity = capacity
+        self.period = period
+
+    @property
+    def rate(self) -> float:
+        return self.capacity / self.period
+
+    def __repr__(self) -> str:
+        return f"Limit({self.capacity}/{self.period:g})"
+
+
+def parse_limit(spec: str) -> Limit:
+    """'30/10' — 30 запросов за 10 секунд."""
+    match = _LIMIT_RE.match(spec)
+    if match is None:
+        raise ValueError(f"Некорректный лимит: {spec!r} (ожидается N/секунды)")
+    return Limit(int(match[1]), float(match[2]))
+
+
+def parse_rules(spec: str) -> dict[str, Limit]:
+    """'api.api_active_events=10/1, *=120/60' -> {эндпоинт: лимит}."""
+    rules = {}
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        endpoint, sep, limit = item.partition("=")
+        if not sep or not endpoint.strip():
+            raise ValueError(f"Некорректное правило лимита: {item.strip()!r} (ожидается эндпоинт=N/секунды)")
+        rules[endpoint.strip()] = parse_limit(limit)
+    return rules
+
+
+def refill(tokens: float, updated: float, now: float, limit: Limit) -> tuple[float, float]:
+    """
+    Корзина после запроса в момент now: (токены, через сколько секунд
+    повторить; 0 — запрос разрешён и токен списан).
+    """
+    tokens = min(limit.capacity, tokens + max(0.0, now - updated) * limit.rate)
+    if tokens >= 1:
+        return tokens - 1, 0.0
+    return tokens, (1 - tokens) / limit.rate
+
+
+def _full_at(tokens: float, now: float, limit: Limit) -> float:
+    # Полная корзина ничем не отличается от отсутствующей — её можно удалить
+    return now + (limit.capacity - tokens) / limit.rate
+
+
+class MemoryBucketStore:
+    """Корзины в памяти процесса."""
+
+    # take() не ждёт ввода-вывода — асинхронный API вызывает его прямо в event loop
+    blocking = False
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._buckets: dict[str, tuple[float, float, float]] = {}
+        self._last_sweep = time.time()
+
+    def take(self, key: str, limit: Limit, now: float | None = None) -> float:
+        """Списываем токен: 0 — запрос разрешён, иначе через сколько секунд повторить."""
+        now = time.time() if now is None else now
+        with self._lock:
+            tokens, updated, _ = self._buckets.get(key, (limit.capacity, now, now))
+            tokens, retry_after = refill(tokens, updated, now, limit)
+            self._buckets[key] = (tokens, now, _full_at(tokens, now, limit))
+            if now - self._last_sweep >= RATE_LIMIT_SWEEP_INTERVAL:
+                self._last_sweep = now
+                self._buckets = {k: v for k, v in self._buckets.items() if v[2] > now}
+        return retry_after
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class SQLiteBucketStore:
+    """
+    Корзины в файле SQLite: воркеры одной машины делят лимит. Каждое
+    списание — короткая транзакция BEGIN IMMEDIATE. Файл занят дольше
+    busy_timeout или недоступен — считаем по корзинам процесса (fallbacks):
+    пропускать всех нельзя, лимит нужен как раз под нагрузкой.
+    """
+
+    blocking = True
+
+    def __init__(self, path: str, busy_timeout: float = 0.2) -> None:
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._last_sweep = 0.0
+        self._fallback = MemoryBucketStore()
+        self._fallback_lock = threading.Lock()
+        self._last_warning = 0.0
+        self.fallbacks = 0
+        self._connection().execute(
+            """
+            CREATE TABLE IF NOT EXISTS buckets (
+                key TEXT PRIMARY KEY,
+                tokens REAL NOT NULL,
+                updated REAL NOT NULL,
+                full_at REAL NOT NULL
+            );
+            """
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        # Соединение на поток; после fork — новое
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode = WAL;")
+            # Потерять корзины при сбое машины не страшно
+            conn.execute("PRAGMA synchronous = OFF;")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def take(self, key: str, limit: Limit, now: float | None = None) -> float:
+        """Списываем токен: 0 — запрос разрешён, иначе через сколько секунд повторить."""
+        now = time.time() if now is None else now
+        try:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE;")
+            try:
+                row = conn.execute("SELECT tokens, updated FROM buckets WHERE key = ?;", (key,)).fetchone()
+                tokens, updated = row if row is not None else (limit.capacity, now)
+                tokens, retry_after = refill(tokens, updated, now, limit)
+                conn.execute(
+                    "INSERT OR REPLACE INTO buckets (key, tokens, updated, full_at) VALUES (?, ?, ?, ?);",
+                    (key, tokens, now, _full_at(tokens, now, limit)),
+                )
+                if now - self._last_sweep >= RATE_LIMIT_SWEEP_INTERVAL:
+                    self._last_sweep = now
+                    conn.execute("DELETE FROM buckets WHERE full_at <= ?;", (now,))
+                conn.execute("COMMIT;")
+            except BaseException:
+                conn.execute("ROLLBACK;")
+                raise
+        except sqlite3.Error as exc:
+            return self._take_fallback(key, limit, now, exc)
+        return retry_after
+
+    def _take_fallback(self, key: str, limit: Limit, now: float, exc: sqlite3.Error) -> float:
+        with self._fallback_lock:
+            self.fallbacks += 1
+            warn = now - self._last_warning >= RATE_LIMIT_SWEEP_INTERVAL
+            if warn:
+                self._last_warning = now
+        if warn:
+            # Под конкуренцией за файл — не на каждый запрос
+            print(f"[RATELIMIT] Хранилище лимитов недоступно ({exc}), лимит по процессу; обходов: {self.fallbacks}")
+        return self._fallback.take(key, limit, now)
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT count(*) FROM buckets;").fetchone()[0]
+
+
+def create_store(path: str | None = RATE_LIMIT_STORE) -> MemoryBucketStore | SQLiteBucketStore:
+    """Хранилище корзин: файл SQLite (общий для воркеров) или память процесса."""
+    if path:
+        return SQLiteBucketStore(path)
+    return MemoryBucketStore()
@@ -0,0 +1,159 @@
+import itertools
+import os
+import threading
+import time
+from typing import Any
+from urllib.parse import urlsplit
+
+import psycopg2
+
+from .pool import ConnectionPool
+
+# Позиция в WAL числом байт: LSN primary и его реплик можно сравнивать
+CURRENT_LSN_QUERY = "SELECT (pg_current_wal_lsn() - '0/0'::pg_lsn)::bigint AS lsn;"
+
+# Докуда реплика проиграла WAL и на сколько секунд отстаёт. Если всё
+# полученное уже проиграно, отставания нет, даже когда primary давно не писал.
+# Сервер не в режиме восстановления (например, та же база в тестах)
+# считается репликой без отставания.
+REPLICA_STATE_QUERY = """
+    SELECT CASE WHEN pg_is_in_recovery()
+                THEN (pg_last_wal_replay_lsn() - '0/0'::pg_lsn)::bigint
+                ELSE (pg_current_wal_lsn() - '0/0'::pg_lsn)::bigint
+           END AS lsn,
+           CASE WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn()
+                THEN 0.0
+                ELSE coalesce(extract(epoch FROM now() - pg_last_xact_replay_timestamp()), 0.0)::float8
+           END AS lag;
+"""
+
+
+def dsn_label(dsn: str) -> str:
+    """host:port/база — для логов и метрик, без пароля."""
+    parts = urlsplit(dsn)
+    if parts.hostname is None:
+        return "replica"
+    return f"{parts.hostname}:{parts.port or 5432}{parts.path}"
+
+
+class Replica:
+    """Реплика: свой пул соединений и состояние по последней проверке."""
+
+    def __init__(self, dsn: str, **pool_options: Any) -> None:
+        self.dsn = dsn
+        self.label = dsn_label(dsn)
+        self.pool = ConnectionPool(dsn, minconn=0, **pool_options)
+        self.healthy = False
+        self.lag: float | None = None
+        self.lsn = 0
+        self.checked_at = 0.0
+        self.failures = 0
+
+    def check(self) -> None:
+        """Обновляем состояние: жива ли реплика, её LSN и отставание."""
+        try:
+            conn = self.pool.getconn()
+        except psycopg2.Error as exc:
+            self.mark_down(exc)
+            return
+        try:
+            cur = conn.cursor()
+            cur.execute(REPLICA_STATE_QUERY)
+            lsn, lag = cur.fetchone()
+            cur.close()
+            conn.rollback()
+        except psycopg2.Error as exc:
+            self.pool.putconn(conn, discard=True)
+            self.mark_down(exc)
+            return
+        self.pool.putconn(conn)
+
+        self.lsn, self.lag, self.checked_at = int(lsn or 0), float(lag), time.monotonic()
+        if not self.healthy:
+            print(f"[REPLICA] {self.label} доступна, отставание {self.lag:.1f} с")
+        self.healthy = True
+
+    def mark_down(self, exc: BaseException) -> None:
+        """Реплика не ответила: до следующей удачной проверки запросы на неё не идут."""
+        if self.healthy or self.failures == 0:
+            print(f"[REPLICA] {self.label} недоступна: {exc}")
+        self.healthy = False
+        self.failures += 1
+        self.checked_at = time.monotonic()
+
+
+class ReplicaSet:
+    """
+    Реплики для чтения. Запрос получает живую реплику с отставанием не больше
+    max_lag секунд, которая проиграла WAL хотя бы до min_lsn; подходящие
+    реплики чередуются по кругу. Состояние проверяет фоновый поток раз в
+    check_interval секунд (первая проверка — сразу при создании).
+    """
+
+    def __init__(
+        self,
+        dsns: list[str],
+        max_lag: float = 5.0,
+        check_interval: float = 2.0,
+        **pool_options: Any,
+    ) -> None:
+        self.replicas = [Replica(dsn, **pool_options) for dsn in dsns]
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.pid = os.getpid()
+        self._rotation = itertools.count()
+        self._stop_event = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.check_all()
+
+    def is_owned_by_current_process(self) -> bool:
+        return self.pid == os.getpid()
+
+    def check_all(self) -> None:
+        for replica in self.replicas:
+            replica.check()
+
+    def start(self) -> None:
+        """Запускаем фоновую проверку реплик (поток-демон)."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="db-replica-monitor", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.check_interval):
+            self.check_all()
+
+    def choose(self, min_lsn: int = 0) -> Replica | None:
+        """Подходящая реплика или None — тогда читаем с primary."""
+        candidates = [
+            replica
+            for replica in self.replicas
+            if replica.healthy and replica.lag is not None and replica.lag <= self.max_lag and replica.lsn >= min_lsn
+        ]
+        if not candidates:
+            return None
+        return candidates[next(self._rotation) % len(candidates)]
+
+    def closeall(self) -> None:
+        self._stop_event.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=self.check_interval + 1)
+        self._thread = None
+        for replica in self.replicas:
+            replica.pool.closeall()
+
+    def stats(self) -> list[dict[str, Any]]:
+        """Состояние и метрики пула каждой реплики."""
+        return [
+            {
+                "replica": replica.label,
+                "healthy": replica.healthy,
+                "lag": replica.lag,
+                "lsn": replica.lsn,
+                "failures": replica.failures,
+                **replica.pool.stats(),
+            }
+            for replica in self.replicas
+        ]
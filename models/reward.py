@@ -1,6 +1,42 @@
 from typing import Any
 
-from .database import fetch_all, execute, execute_returning_id
+from . import partitions
+from .cache import get_flight
+from .database import (
+    after_commit,
+    current_unit_of_work,
+    fetch_all,
+    fetch_one,
+    execute,
+    execute_returning_id,
+    read_coalesced,
+)
+from .event import invalidate_event_caches
+from .notify import notify_change
+
+
+def _after_write(event_id: int) -> None:
+    # Сводку наград в строке ивента пересчитал триггер (миграция 0005) в той же
+    # транзакции — сбрасываем кэши ивентов сейчас и ещё раз после commit
+    invalidate_event_caches(event_id)
+    if current_unit_of_work() is not None:
+        after_commit(lambda: invalidate_event_caches(event_id))
+
+
+ADD_REWARD_QUERY = """
+    INSERT INTO rewards (event_id, reward_type, amount, description)
+    VALUES (%s, %s, %s, %s)
+    RETURNING id;
+"""
+
+# Таблицы разбиты по месяцам (models/partitions.py): награда лежит в разделе
+# месяца старта ивента. Нет ивента — NULL и ошибка NOT NULL, как ошибка
+# внешнего ключа без разделов
+ADD_PARTITIONED_REWARD_QUERY = """
+    INSERT INTO rewards (event_id, event_starts_at, reward_type, amount, description)
+    VALUES (%s, (SELECT starts_at FROM events WHERE id = %s), %s, %s, %s)
+    RETURNING id;
+"""
 
 
 def add_reward(
@@ -10,26 +46,78 @@ def add_reward(
     description: str,
 ) -> int:
     """Добавляем награду к ивенту, возвращаем id награды."""
-    query = """
-        INSERT INTO rewards (event_id, reward_type, amount, description)
-        VALUES (%s, %s, %s, %s)
-        RETURNING id;
-    """
-    return execute_returning_id(query, (event_id, reward_type, amount, description))
+    if partitions.is_partitioned():
+        params = (event_id, event_id, reward_type, amount, description)
+        reward_id = execute_returning_id(ADD_PARTITIONED_REWARD_QUERY, params)
+    else:
+        reward_id = execute_returning_id(ADD_REWARD_QUERY, (event_id, reward_type, amount, description))
+    _after_write(event_id)
+    notify_change("rewards", "insert", reward_id, event_id=event_id)
+    return reward_id
+
+
+REWARDS_FOR_EVENT_QUERY = """
+    SELECT id, reward_type, amount, description
+    FROM rewards
+    WHERE event_id = %s
+    ORDER BY id;
+"""
+
+REWARDS_FOR_EVENTS_QUERY = """
+    SELECT id, event_id, reward_type, amount, description
+    FROM rewards
+    WHERE event_id = ANY(%s)
+    ORDER BY event_id, id;
+"""
+
+
+# Награды ивента опрашивают все клиенты разом, когда он начинается
+_rewards_flight = get_flight("get_rewards_for_event")
 
 
 def get_rewards_for_event(event_id: int) -> list[dict[str, Any]]:
-    """Список наград для указанного ивента."""
-    query = """
-        SELECT id, reward_type, amount, description
-        FROM rewards
-        WHERE event_id = %s
-        ORDER BY id;
+    """Список наград для указанного ивента (изменять его нельзя — он общий для одновременных вызовов)."""
+    return read_coalesced(_rewards_flight, event_id, lambda: fetch_all(REWARDS_FOR_EVENT_QUERY, (event_id,)))
+
+
+def get_rewards_for_events(event_ids: list[int]) -> dict[int, list[dict[str, Any]]]:
     """
-    return fetch_all(query, (event_id,))
+    Награды сразу для набора ивентов одним запросом (вместо N запросов).
+    Возвращаем {event_id: [награды]}; для ивентов без наград — пустой список.
+    """
+    event_ids = list(dict.fromkeys(event_ids))
+    if not event_ids:
+        return {}
+    return group_rewards(event_ids, fetch_all(REWARDS_FOR_EVENTS_QUERY, (event_ids,)))
+
+
+def group_rewards(event_ids: list[int], rows: list[dict[str, Any]]) -> dict[int, list[dict[str, Any]]]:
+    """Строки REWARDS_FOR_EVENTS_QUERY -> {event_id: [награды]}."""
+    grouped: dict[int, list[dict[str, Any]]] = {event_id: [] for event_id in event_ids}
+    for row in rows:
+        event_id = row.pop("event_id")
+        grouped[event_id].append(row)
+    return grouped
 
 
 def delete_rewards_for_event(event_id: int) -> None:
     """Удаляем все награды ивента (обычно не нужно, т.к. CASCADE)."""
     query = "DELETE FROM rewards WHERE event_id = %s;"
     execute(query, (event_id,))
+    _after_write(event_id)
+    notify_change("rewards", "delete", None, event_id=event_id)
+
+
+def refresh_reward_summaries(event_ids: list[int] | None = None) -> int:
+    """
+    Пересчитываем сводку наград в events (reward_count, reward_totals) — для
+    всех ивентов или только для event_ids. Обычно её поддерживают триггеры;
+    это починка после ручных правок или выключенных триггеров.
+    Возвращаем число строк, где сводка разошлась с rewards.
+    """
+    row = fetch_one("SELECT refresh_reward_summary(%s) AS changed;", (event_ids,), primary=True)
+    changed = row["changed"] if row else 0
+    if changed:
+        invalidate_event_caches()
+        notify_change("rewards", "repair", None)
+    return changed
@@ -0,0 +1,357 @@
+import os
+import threading
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, timedelta, timezone
+from typing import Any, Iterator
+
+from .cache import on_invalidate_all, to_naive_utc
+from .database import iter_rows
+
+# Индекс активных ивентов в памяти процесса (TIMELINE_INDEX=0 — выключить,
+# тогда get_active_events снова читает из БД)
+TIMELINE_ENABLED = os.environ.get("TIMELINE_INDEX", "1") != "0"
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+# Та же выборка, что у ACTIVE_EVENTS_QUERY, но без условия на момент времени
+_TIMELINE_QUERY = """
+    SELECT id, title, event_type, starts_at, ends_at
+    FROM events
+    WHERE is_active
+      AND ends_at >= starts_at
+"""
+
+
+def to_us(dt: datetime) -> int:
+    """datetime -> целые микросекунды от эпохи (UTC); так сравнения точные и быстрые."""
+    return (to_naive_utc(dt) - _EPOCH) // _MICROSECOND
+
+
+def from_us(value: int) -> datetime:
+    return (_EPOCH + value * _MICROSECOND).replace(tzinfo=timezone.utc)
+
+
+class _Node:
+    """Узел центрированного дерева: интервалы, содержащие center, в двух порядках."""
+
+    __slots__ = ("center", "by_start", "by_end", "left", "right")
+
+    def __init__(self, center: int) -> None:
+        self.center = center
+        self.by_start: list[tuple[int, int, int]] = []  # (start, end, id) по возрастанию start
+        self.by_end: list[tuple[int, int, int]] = []  # (end, start, id) по возрастанию end
+        self.left: _Node | None = None
+        self.right: _Node | None = None
+
+
+class IntervalTree:
+    """
+    Центрированное дерево интервалов [start, end] (целые числа).
+
+    Запрос «какие интервалы содержат t» — O(log n + k): на каждом уровне
+    списки узла просматриваются только до первого неподходящего интервала.
+    Вставка и удаление — O(log n + m) без перестройки; после множества
+    изменений дерево стоит перестроить (см. Timeline).
+    """
+
+    def __init__(self, intervals: list[tuple[int, int, int]] = ()) -> None:
+        self.size = len(intervals)
+        self.root = self._build(list(intervals))
+
+    def _build(self, items: list[tuple[int, int, int]]) -> _Node | None:
+        if not items:
+            return None
+        endpoints = sorted([s for s, _, _ in items] + [e for _, e, _ in items])
+        node = _Node(endpoints[len(endpoints) // 2])
+        left, right = [], []
+        for item in items:
+            start, end, _ = item
+            if end < node.center:
+                left.append(item)
+            elif start > node.center:
+                right.append(item)
+            else:
+                node.by_start.append(item)
+        node.by_start.sort()
+        node.by_end = sorted((e, s, i) for s, e, i in node.by_start)
+        node.left = self._build(left)
+        node.right = self._build(right)
+        return node
+
+    def insert(self, start: int, end: int, item_id: int) -> None:
+        self.size += 1
+        if self.root is None:
+            self.root = _Node((start + end) // 2)
+        node = self.root
+        while True:
+            if end < node.center:
+                if node.left is None:
+                    node.left = _Node((start + end) // 2)
+                node = node.left
+            elif start > node.center:
+                if node.right is None:
+                    node.right = _Node((start + end) // 2)
+                node = node.right
+            else:
+                insort(node.by_start, (start, end, item_id))
+                insort(node.by_end, (end, start, item_id))
+                return
+
+    def remove(self, start: int, end: int, item_id: int) -> None:
+        node = self.root
+        while node is not None:
+            if end < node.center:
+                node = node.left
+            elif start > node.center:
+                node = node.right
+            else:
+                if _remove_sorted(node.by_start, (start, end, item_id)):
+                    _remove_sorted(node.by_end, (end, start, item_id))
+                    self.size -= 1
+                return
+
+    def stab(self, t: int) -> Iterator[int]:
+        """id интервалов, для которых start <= t <= end."""
+        node = self.root
+        while node is not None:
+            if t < node.center:
+                # Все интервалы узла заканчиваются не раньше center > t
+                for start, _, item_id in node.by_start:
+                    if start > t:
+                        break
+                    yield item_id
+                node = node.left
+            elif t > node.center:
+                # Все интервалы узла начинаются не позже center < t
+                for end, _, item_id in reversed(node.by_end):
+                    if end < t:
+                        break
+                    yield item_id
+                node = node.right
+            else:
+                for _, _, item_id in node.by_start:
+                    yield item_id
+                return
+
+
+def _remove_sorted(items: list, value: tuple) -> bool:
+    index = bisect_left(items, value)
+    if index < len(items) and items[index] == value:
+        del items[index]
+        return True
+    return False
+
+
+class Timeline:
+    """
+    Активные ивенты (is_active) в памяти: дерево интервалов для «активны в
+    момент t» и отсортированные массивы границ для окон и ближайших стартов.
+
+    Строки хранятся кортежами (title, event_type, starts_at, ends_at), а не
+    словарями; словари собираются только для ответа. Изменения применяются
+    лениво: mark_changed() запоминает id, и перед следующим запросом индекс
+    перечитывает из БД только эти строки.
+    """
+
+    def __init__(self) -> None:
+        # Condition: читатели ждут поток, который дочитывает изменения из БД
+        self._lock = threading.Condition()
+        self._rows: dict[int, tuple[str, str, datetime, datetime]] = {}
+        self._spans: dict[int, tuple[int, int]] = {}
+        self._tree = IntervalTree()
+        self._starts: list[tuple[int, int]] = []  # (start, id)
+        self._ends: list[tuple[int, int]] = []  # (end, id)
+        self._modifications = 0
+
+        self._pending: set[int] = set()
+        self._reload_all = True
+        # Отметок mark_changed() всего и сколько из них уже применено
+        self._marks = 1
+        self._applied = 0
+        self._loading = False
+
+    def __len__(self) -> int:
+        self._ensure_fresh()
+        with self._lock:
+            return len(self._rows)
+
+    def mark_changed(self, event_id: int | None = None) -> None:
+        """Ивент изменился (None — неизвестно какие, перечитать всё)."""
+        with self._lock:
+            if event_id is None:
+                self._reload_all = True
+            else:
+                self._pending.add(event_id)
+            self._marks += 1
+
+    def load(self) -> None:
+        """Полная загрузка из БД (при старте и после сброса)."""
+        self.mark_changed()
+        self._ensure_fresh()
+
+    def _ensure_fresh(self) -> None:
+        """
+        Применяем отметки, сделанные до вызова. Из БД читает один поток и без
+        блокировки индекса: mark_changed() и читатели, которым хватает уже
+        применённых изменений, его не ждут. Индекс меняем под блокировкой.
+        """
+        with self._lock:
+            target = self._marks
+            while self._applied < target and self._loading:
+                self._lock.wait()
+            if self._applied >= target:
+                return
+            # Забираем отметки до чтения: пришедшие во время чтения обработаем в следующий раз
+            self._loading = True
+            marks, reload_all, ids = self._marks, self._reload_all, sorted(self._pending)
+            self._reload_all, self._pending = False, set()
+
+        try:
+            if reload_all:
+                rows = {row["id"]: _as_tuple(row) for row in iter_rows(_TIMELINE_QUERY + ";")}
+            else:
+                rows = {row["id"]: _as_tuple(row) for row in iter_rows(_TIMELINE_QUERY + " AND id = ANY(%s);", (ids,))}
+        except BaseException:
+            with self._lock:
+                # Отметки возвращаем — перечитает следующий читатель
+                self._reload_all = self._reload_all or reload_all
+                self._pending.update(ids)
+                self._loading = False
+                self._lock.notify_all()
+            raise
+
+        with self._lock:
+            if reload_all:
+                self._rebuild(rows)
+                print(f"[TIMELINE] Индекс построен: {len(rows)} активных ивентов")
+            else:
+                for event_id in ids:
+                    self._discard(event_id)
+                    if event_id in rows:
+                        self._add(event_id, rows[event_id])
+                if self._modifications > 64 + len(self._rows) // 2:
+                    self._rebuild(self._rows)
+            self._applied = marks
+            self._loading = False
+            self._lock.notify_all()
+
+    def _rebuild(self, rows: dict[int, tuple]) -> None:
+        self._rows = rows
+        self._spans = {event_id: (to_us(row[2]), to_us(row[3])) for event_id, row in rows.items()}
+        self._tree = IntervalTree([(s, e, event_id) for event_id, (s, e) in self._spans.items()])
+        self._starts = sorted((s, event_id) for event_id, (s, _) in self._spans.items())
+        self._ends = sorted((e, event_id) for event_id, (_, e) in self._spans.items())
+        self._modifications = 0
+
+    def _add(self, event_id: int, row: tuple) -> None:
+        start, end = to_us(row[2]), to_us(row[3])
+        self._rows[event_id] = row
+        self._spans[event_id] = (start, end)
+        self._tree.insert(start, end, event_id)
+        insort(self._starts, (start, event_id))
+        insort(self._ends, (end, event_id))
+        self._modifications += 1
+
+    def _discard(self, event_id: int) -> None:
+        span = self._spans.pop(event_id, None)
+        if span is None:
+            return
+        start, end = span
+        del self._rows[event_id]
+        self._tree.remove(start, end, event_id)
+        _remove_sorted(self._starts, (start, event_id))
+        _remove_sorted(self._ends, (end, event_id))
+        self._modifications += 1
+
+    def _row(self, event_id: int) -> dict[str, Any]:
+        title, event_type, starts_at, ends_at = self._rows[event_id]
+        return {"id": event_id, "title": title, "event_type": event_type, "starts_at": starts_at, "ends_at": ends_at}
+
+    def active_at(self, at: datetime) -> list[dict[str, Any]]:
+        """Ивенты, активные в момент at (starts_at <= at <= ends_at), по ends_at."""
+        rows, _ = self.snapshot(at)
+        return rows
+
+    def snapshot(self, at: datetime) -> tuple[list[dict[str, Any]], datetime | None]:
+        """Как event.get_active_events_snapshot: активные ивенты и ближайшая граница после at."""
+        t = to_us(at)
+        self._ensure_fresh()
+        with self._lock:
+            ids = sorted(self._tree.stab(t), key=lambda i: (self._spans[i][1], i))
+            rows = [self._row(i) for i in ids]
+
+            candidates = []
+            index = bisect_right(self._starts, (t, float("inf")))
+            if index < len(self._starts):
+                candidates.append(self._starts[index][0])
+            if ids:
+                # ends_at включительно: ивент перестаёт быть активным сразу после ends_at
+                candidates.append(self._spans[ids[0]][1] + 1)
+        return rows, from_us(min(candidates)) if candidates else None
+
+    def in_window(self, start: datetime, end: datetime, limit: int | None = None) -> list[dict[str, Any]]:
+        """
+        Ивенты, пересекающиеся с окном [start, end], по (starts_at, id):
+        начавшиеся до окна и ещё идущие в его начале + стартующие внутри окна.
+        """
+        a, b = to_us(start), to_us(end)
+        if b < a:
+            return []
+        self._ensure_fresh()
+        with self._lock:
+            ids = [i for i in self._tree.stab(a) if self._spans[i][0] < a]
+            lo = bisect_left(self._starts, (a, -1))
+            hi = bisect_right(self._starts, (b, float("inf")))
+            ids.sort(key=lambda i: (self._spans[i][0], i))
+            ids.extend(event_id for _, event_id in self._starts[lo:hi])
+            if limit is not None:
+                ids = ids[:limit]
+            return [self._row(i) for i in ids]
+
+    def upcoming(self, after: datetime, limit: int, boundary: str = "start") -> list[dict[str, Any]]:
+        """Ближайшие limit ивентов, которые начнутся (boundary="start") или закончатся ("end") после after."""
+        t = to_us(after)
+        self._ensure_fresh()
+        with self._lock:
+            points = self._starts if boundary == "start" else self._ends
+            index = bisect_right(points, (t, float("inf")))
+            return [self._row(event_id) for _, event_id in points[index : index + limit]]
+
+    def next_transition(self, after: datetime) -> datetime | None:
+        """Ближайший момент после after, когда какой-то ивент начнётся или закончится (ends_at + 1 мкс)."""
+        t = to_us(after)
+        self._ensure_fresh()
+        with self._lock:
+            candidates = []
+            index = bisect_right(self._starts, (t, float("inf")))
+            if index < len(self._starts):
+                candidates.append(self._starts[index][0])
+            # Закончился — первый момент после ends_at, то есть ends_at + 1 > t
+            index = bisect_right(self._ends, (t - 1, float("inf")))
+            if index < len(self._ends):
+                candidates.append(self._ends[index][0] + 1)
+        return from_us(min(candidates)) if candidates else None
+
+    def transitions(self, after: datetime, until: datetime) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+        """Ивенты, которые начались и которые закончились в промежутке (after, until]."""
+        a, b = to_us(after), to_us(until)
+        self._ensure_fresh()
+        with self._lock:
+            lo = bisect_right(self._starts, (a, float("inf")))
+            hi = bisect_right(self._starts, (b, float("inf")))
+            started = [self._row(event_id) for _, event_id in self._starts[lo:hi]]
+            lo = bisect_right(self._ends, (a - 1, float("inf")))
+            hi = bisect_right(self._ends, (b - 1, float("inf")))
+            ended = [self._row(event_id) for _, event_id in self._ends[lo:hi]]
+        return started, ended
+
+
+def _as_tuple(row: dict[str, Any]) -> tuple[str, str, datetime, datetime]:
+    return (row["title"], row["event_type"], row["starts_at"], row["ends_at"])
+
+
+timeline = Timeline()
+
+# Полный сброс кэшей процесса (по NOTIFY-переподключению, в тестах) сбрасывает и индекс
+on_invalidate_all(timeline.mark_changed)
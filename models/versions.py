@@ -0,0 +1,39 @@
+from datetime import datetime
+from typing import Any
+
+from .cache import get_flight
+from .database import fetch_all, read_coalesced
+
+TABLE_VERSIONS_QUERY = """
+    SELECT table_name, version, updated_at
+    FROM table_versions
+    WHERE table_name = ANY(%s);
+"""
+
+# С этого чтения начинается почти каждый запрос API
+_versions_flight = get_flight("table_versions")
+
+
+def get_table_versions(*tables: str) -> dict[str, dict[str, Any]]:
+    """
+    Счётчики изменений таблиц (поддерживаются триггерами, миграция 0004):
+    {"events": {"version": 12, "updated_at": datetime}, ...}.
+    """
+    rows = read_coalesced(_versions_flight, tables, lambda: fetch_all(TABLE_VERSIONS_QUERY, (list(tables),)))
+    return versions_from_rows(rows)
+
+
+def versions_from_rows(rows: list[dict[str, Any]]) -> dict[str, dict[str, Any]]:
+    return {row["table_name"]: {"version": row["version"], "updated_at": row["updated_at"]} for row in rows}
+
+
+def data_version(*tables: str) -> tuple[str, datetime | None]:
+    """Общая версия набора таблиц: строка для ETag и время последнего изменения."""
+    return version_tag(tables, get_table_versions(*tables))
+
+
+def version_tag(tables: tuple[str, ...], versions: dict[str, dict[str, Any]]) -> tuple[str, datetime | None]:
+    """Счётчики из get_table_versions() -> (строка версии, время последнего изменения)."""
+    tag = "-".join(f"{t}.{versions[t]['version']}" if t in versions else f"{t}.0" for t in tables)
+    updated = [v["updated_at"] for v in versions.values()]
+    return tag, max(updated) if updated else None
@@ -1,6 +1,11 @@
+from datetime import datetime, timedelta
+
 import pytest
 
 from app import create_app
+from models import event as event_model
+from models.boot import current_boot
+from models.cache import invalidate_all
 from models.database import execute
 
 
@@ -8,9 +13,10 @@ from models.database import execute
 def app():
     """
     Создаём Flask-приложение один раз на всю сессию тестов.
-    create_app() внутри уже вызывает init_db().
+    БД и миграции create_app() готовит в фоне — дожидаемся.
     """
     app = create_app()
+    assert current_boot().wait(60), current_boot().status()
     # Для тестов выключим режим отладки Werkzeug
     app.config.update({"TESTING": True})
     return app
@@ -24,6 +30,28 @@ def client(app):
     return app.test_client()
 
 
+@pytest.fixture()
+def make_event():
+    """
+    Фабрика ивентов: make_event("Title") создаёт активный ивент на ближайший
+    час и возвращает его id. Время и остальные поля можно передать явно.
+    """
+
+    def make(
+        title: str = "Event",
+        starts_at: datetime | None = None,
+        ends_at: datetime | None = None,
+        description: str = "",
+        event_type: str = "Daily",
+        is_active: bool = True,
+    ) -> int:
+        starts_at = starts_at or datetime.utcnow()
+        ends_at = ends_at or starts_at + timedelta(hours=1)
+        return event_model.create_event(title, description, event_type, starts_at, ends_at, is_active)
+
+    return make
+
+
 @pytest.fixture(autouse=True)
 def db_clean():
     """
@@ -32,7 +60,12 @@ def db_clean():
     # Сначала дочерние таблицы (rewards), затем events
     execute("DELETE FROM rewards;")
     execute("DELETE FROM events;")
+    execute("DELETE FROM events_archive;")
+    # Таблицы чистим в обход моделей — кэши сбрасываем вручную
+    invalidate_all()
     yield
     # На всякий случай ещё раз почистим после теста
     execute("DELETE FROM rewards;")
     execute("DELETE FROM events;")
+    execute("DELETE FROM events_archive;")
+    invalidate_all()
@@ -0,0 +1,210 @@
+import asyncio
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from controllers import async_api_controller, compression
+from controllers.async_api_controller import create_asgi_app
+from models import event as event_model
+from models import reward as reward_model
+from models.aio import database as aio_db
+from models.aio import reward as aio_reward
+from models.database import execute
+from models.rate_limit import MemoryBucketStore, SQLiteBucketStore
+
+
+@pytest.fixture()
+def asgi_app(app):
+    return create_asgi_app(app)
+
+
+def call(asgi_app, path, headers=None):
+    """Один HTTP-запрос к ASGI-приложению: (status, headers, body)."""
+    raw_path, _, query = path.partition("?")
+    scope = {
+        "type": "http",
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": raw_path,
+        "raw_path": raw_path.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()],
+        "server": ("testserver", 80),
+        "client": ("127.0.0.1", 12345),
+    }
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    async def run():
+        try:
+            await asgi_app(scope, receive, send)
+        finally:
+            await aio_db.close_pool()
+
+    asyncio.run(run())
+    start = messages[0]
+    body = b"".join(m.get("body", b"") for m in messages[1:])
+    return start["status"], {k.decode(): v.decode() for k, v in start["headers"]}, body
+
+
+def _seed():
+    now = datetime.utcnow()
+    ids = []
+    for i in range(3):
+        event_id = event_model.create_event(
+            title=f"Event {i}",
+            description="",
+            event_type="Daily",
+            starts_at=now - timedelta(hours=i + 1),
+            ends_at=now + timedelta(hours=i + 1),
+        )
+        reward_model.add_reward(event_id, "Gold", 10 * (i + 1), "")
+        ids.append(event_id)
+    return ids
+
+
+def test_async_events_match_sync_api(asgi_app, client):
+    _seed()
+    path = "/api/events?limit=2&include=rewards"
+
+    status, headers, body = call(asgi_app, path)
+    sync = client.get(path)
+    assert status == 200
+    assert body == sync.data
+    assert headers["etag"] == sync.headers["ETag"]
+    assert headers["x-next-cursor"] == sync.headers["X-Next-Cursor"]
+
+    cursor = headers["x-next-cursor"]
+    status, _, body = call(asgi_app, f"/api/events?limit=2&cursor={cursor}")
+    assert status == 200
+    assert body == client.get(f"/api/events?limit=2&cursor={cursor}").data
+
+    status, _, _ = call(asgi_app, "/api/events?limit=0")
+    assert status == 400
+
+
+def test_async_detail_conditional_and_not_found(asgi_app):
+    event_id = _seed()[0]
+
+    status, headers, body = call(asgi_app, f"/api/events/{event_id}")
+    assert status == 200
+    assert b'"title":"Event 0"' in body
+
+    status, _, body = call(asgi_app, f"/api/events/{event_id}", {"If-None-Match": headers["etag"]})
+    assert status == 304
+    assert body == b""
+
+    status, _, _ = call(asgi_app, "/api/events/999999999")
+    assert status == 404
+
+
+def test_async_bodies_for_new_version_are_not_built_from_stale_caches(asgi_app):
+    event_id = _seed()[0]
+    assert event_model.get_event_by_id(event_id)["title"] == "Event 0"
+    assert b'"title":"Event 0"' in call(asgi_app, "/api/events/active")[2]
+
+    # Запись другого воркера, уведомление о которой ещё не дошло: ETag уже новый
+    execute("UPDATE events SET title = 'Renamed' WHERE id = %s;", (event_id,))
+    assert event_model.get_event_by_id(event_id)["title"] == "Event 0"
+    for path in (f"/api/events/{event_id}", "/api/events/active"):
+        status, _, body = call(asgi_app, path)
+        assert status == 200
+        assert b'"title":"Renamed"' in body
+
+
+def test_async_active_and_rewards(asgi_app, client):
+    ids = _seed()
+
+    status, headers, body = call(asgi_app, "/api/events/active?include=rewards")
+    assert status == 200
+    assert body == client.get("/api/events/active?include=rewards").data
+    assert headers["cache-control"].startswith("public, max-age=")
+
+    path = f"/api/rewards?event_ids={ids[0]},{ids[1]}"
+    status, _, body = call(asgi_app, path)
+    assert status == 200
+    assert body == client.get(path).data
+
+    status, _, body = call(asgi_app, f"/api/events/{ids[2]}/rewards")
+    assert status == 200
+    assert b"Gold" in body
+
+
+def test_other_routes_served_by_flask(asgi_app):
+    _seed()
+    status, headers, body = call(asgi_app, "/")
+    assert status == 200
+    assert headers["content-type"].startswith("text/html")
+
+    status, _, body = call(asgi_app, "/api/events/export?format=ndjson")
+    assert status == 200
+    assert body.count(b"\n") == 3
+
+
+def test_async_response_compressed_like_sync(asgi_app, client, monkeypatch):
+    # Три ивента меньше порога сжатия — снижаем его для обоих режимов
+    monkeypatch.setattr(async_api_controller, "COMPRESS_MIN_SIZE", 0)
+    monkeypatch.setattr(compression, "COMPRESS_MIN_SIZE", 0)
+    _seed()
+    path = "/api/events?include=rewards"
+    headers = {"Accept-Encoding": "gzip"}
+
+    status, resp_headers, body = call(asgi_app, path, headers)
+    sync = client.get(path, headers=headers)
+    assert status == 200
+    assert resp_headers["content-encoding"] == "gzip"
+    assert body == sync.data
+
+
+def test_async_rewards_reads_are_coalesced(asgi_app):
+    event_id = _seed()[0]
+    flight = aio_reward._rewards_flight
+    before = flight.stats()
+
+    async def run():
+        try:
+            return await asyncio.gather(*(aio_reward.get_rewards_for_event(event_id) for _ in range(5)))
+        finally:
+            await aio_db.close_pool()
+
+    results = asyncio.run(run())
+    assert [[r["amount"] for r in rows] for rows in results] == [[10]] * 5
+    stats = flight.stats()
+    assert (stats["leaders"] - before["leaders"], stats["shared"] - before["shared"]) == (1, 4)
+
+
+def test_async_api_applies_rate_limits(app, asgi_app, monkeypatch):
+    monkeypatch.setitem(app.config, "RATE_LIMITS", "api.api_active_events=1/60")
+    monkeypatch.setitem(app.extensions, "rate_limit", MemoryBucketStore())
+
+    assert call(asgi_app, "/api/events/active")[0] == 200
+    status, headers, body = call(asgi_app, "/api/events/active")
+    assert status == 429 and headers["retry-after"] == "60"
+    assert call(asgi_app, "/api/events")[0] == 200
+
+
+def test_async_api_takes_file_tokens_off_event_loop(app, asgi_app, monkeypatch, tmp_path):
+    store = SQLiteBucketStore(str(tmp_path / "buckets.db"))
+    threads = []
+    take = store.take
+
+    def recording_take(*args, **kwargs):
+        threads.append(threading.current_thread())
+        return take(*args, **kwargs)
+
+    monkeypatch.setattr(store, "take", recording_take)
+    monkeypatch.setitem(app.config, "RATE_LIMITS", "api.api_active_events=1/60")
+    monkeypatch.setitem(app.extensions, "rate_limit", store)
+
+    assert call(asgi_app, "/api/events/active")[0] == 200
+    assert call(asgi_app, "/api/events/active")[0] == 429
+    # Event loop работает в главном потоке — ожидание блокировки файла не в нём
+    assert len(threads) == 2 and threading.main_thread() not in threads
@@ -0,0 +1,181 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import event as event_model
+from models import reward as reward_model
+from models.cache import FunctionCache, MISSING, SingleFlight, cache_stats
+from models.database import add_query_listener, pool_stats, remove_query_listener, transaction
+
+
+def test_function_cache_ttl_window_and_lru():
+    cache = FunctionCache("test", ttl=60.0, maxsize=2)
+    now = datetime(2030, 1, 1, 12, 0)
+
+    cache.set("a", 1, valid_from=now, valid_until=now + timedelta(minutes=5))
+    assert cache.get("a", at=now + timedelta(minutes=1)) == 1
+    # За границей окна запись уже не годится
+    assert cache.get("a", at=now + timedelta(minutes=5)) is MISSING
+
+    cache.set("b", 2)
+    cache.set("c", 3)
+    cache.set("d", 4)
+    assert cache.get("b") is MISSING
+    assert cache.get("d") == 4
+
+    cache.ttl = 0
+    cache.set("e", 5)
+    assert cache.get("e") is MISSING
+
+    stats = cache.stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 3
+
+
+def test_active_events_cached_until_next_boundary():
+    now = datetime.utcnow()
+    current_id = event_model.create_event(
+        title="Now",
+        description="",
+        event_type="Daily",
+        starts_at=now - timedelta(hours=1),
+        ends_at=now + timedelta(hours=2),
+    )
+    upcoming_id = event_model.create_event(
+        title="Soon",
+        description="",
+        event_type="Daily",
+        starts_at=now + timedelta(hours=1),
+        ends_at=now + timedelta(hours=3),
+    )
+
+    assert [e["id"] for e in event_model.get_active_events(now)] == [current_id]
+
+    # Повторный запрос до ближайшей границы в БД не ходит
+    before = pool_stats()["checkouts"]
+    assert [e["id"] for e in event_model.get_active_events(now + timedelta(minutes=30))] == [current_id]
+    assert pool_stats()["checkouts"] == before
+    assert cache_stats()["get_active_events"]["hits"] >= 1
+
+    # После старта следующего ивента кэш истекает сам
+    later = {e["id"] for e in event_model.get_active_events(now + timedelta(hours=1, minutes=30))}
+    assert later == {current_id, upcoming_id}
+
+    # После окончания текущего — тоже
+    after_end = [e["id"] for e in event_model.get_active_events(now + timedelta(hours=2, minutes=30))]
+    assert after_end == [upcoming_id]
+
+
+def test_writes_invalidate_event_caches():
+    now = datetime.utcnow()
+    event_id = event_model.create_event(
+        title="Before",
+        description="",
+        event_type="Daily",
+        starts_at=now - timedelta(hours=1),
+        ends_at=now + timedelta(hours=1),
+    )
+    assert event_model.get_event_by_id(event_id)["title"] == "Before"
+    assert len(event_model.get_active_events(now)) == 1
+
+    event_model.update_event(
+        event_id=event_id,
+        title="After",
+        description="",
+        event_type="Daily",
+        starts_at=now - timedelta(hours=1),
+        ends_at=now + timedelta(hours=1),
+        is_active=False,
+    )
+    assert event_model.get_event_by_id(event_id)["title"] == "After"
+    assert event_model.get_active_events(now) == []
+
+    event_model.delete_event(event_id)
+    assert event_model.get_event_by_id(event_id) is None
+
+
+def test_cache_is_bypassed_inside_dirty_transaction():
+    now = datetime.utcnow()
+    assert event_model.get_all_events() == []
+
+    try:
+        with transaction():
+            event_model.create_event(
+                title="Uncommitted",
+                description="",
+                event_type="Daily",
+                starts_at=now,
+                ends_at=now + timedelta(hours=1),
+            )
+            assert len(event_model.get_all_events()) == 1
+            raise RuntimeError("rollback")
+    except RuntimeError:
+        pass
+
+    # Незафиксированные данные в кэш не попали
+    assert event_model.get_all_events() == []
+
+
+def _run_concurrently(callers: int, call) -> list:
+    """callers потоков одновременно вызывают call(); результаты в порядке завершения."""
+    results: list = []
+    threads = [threading.Thread(target=lambda: results.append(call())) for _ in range(callers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    return results
+
+
+def test_single_flight_shares_result_and_error():
+    flight = SingleFlight("test")
+    calls = []
+
+    def load():
+        calls.append(1)
+        deadline = time.monotonic() + 5
+        while flight.stats()["shared"] < 3 and time.monotonic() < deadline:
+            time.sleep(0.001)
+        return ["row"]
+
+    results = _run_concurrently(4, lambda: flight.do("key", load))
+    assert results == [["row"]] * 4 and len(calls) == 1
+    assert flight.stats() == {"in_flight": 0, "leaders": 1, "shared": 3}
+
+    def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        flight.do("key", fail)
+    # Ошибка не запоминается: следующий вызов выполняется заново
+    assert flight.do("key", lambda: 42) == 42
+
+
+def test_concurrent_reward_reads_share_one_query():
+    event_id = event_model.create_event("E", "", "Daily", datetime.utcnow(), datetime.utcnow() + timedelta(hours=1))
+    reward_model.add_reward(event_id, "Gold", 10, "")
+    flight = reward_model._rewards_flight
+    before = flight.stats()["shared"]
+    queries = []
+
+    def on_query(query: str, duration: float, rowcount: int) -> None:
+        if query == reward_model.REWARDS_FOR_EVENT_QUERY:
+            queries.append(query)
+            # Ведущий отвечает, когда остальные уже ждут его результата
+            deadline = time.monotonic() + 5
+            while flight.stats()["shared"] < before + 3 and time.monotonic() < deadline:
+                time.sleep(0.001)
+
+    add_query_listener(on_query)
+    try:
+        results = _run_concurrently(4, lambda: reward_model.get_rewards_for_event(event_id))
+    finally:
+        remove_query_listener(on_query)
+    assert len(queries) == 1
+    assert [[r["amount"] for r in rows] for rows in results] == [[10]] * 4
+
+    # После записи новые чтения не присоединяются к уже идущим
+    reward_model.add_reward(event_id, "XP", 5, "")
+    assert [r["amount"] for r in reward_model.get_rewards_for_event(event_id)] == [10, 5]
@@ -0,0 +1,91 @@
+import gzip
+import json
+import re
+from datetime import datetime, timedelta
+
+import brotli
+import pytest
+
+from controllers import compression
+from models import event as event_model
+from models.cache import get_cache
+from models.notify import dispatch
+
+
+@pytest.fixture()
+def many_events():
+    now = datetime.utcnow()
+    for i in range(30):
+        event_model.create_event(
+            title=f"Compressed event {i}",
+            description="Описание " * 5,
+            event_type="Daily",
+            starts_at=now - timedelta(hours=1),
+            ends_at=now + timedelta(hours=i + 1),
+        )
+
+
+def test_choose_encoding():
+    assert compression.choose_encoding("gzip, deflate, br") == "br"
+    assert compression.choose_encoding("gzip;q=1, br;q=0") == "gzip"
+    assert compression.choose_encoding("identity") is None
+    assert compression.choose_encoding(None) is None
+
+
+def test_api_response_compressed_and_cached(client, many_events):
+    plain = client.get("/api/events?limit=30")
+    assert "Content-Encoding" not in plain.headers
+    assert "Accept-Encoding" in plain.headers["Vary"]
+
+    cache = get_cache("compressed_bodies")
+    misses = cache.misses
+    for encoding, decompress in (("br", brotli.decompress), ("gzip", gzip.decompress)):
+        resp = client.get("/api/events?limit=30", headers={"Accept-Encoding": encoding})
+        assert resp.headers["Content-Encoding"] == encoding
+        assert len(resp.data) < len(plain.data)
+        assert decompress(resp.data) == plain.data
+        assert resp.headers["ETag"] == plain.headers["ETag"]
+
+        # Повторный опрос той же версии — сжатое тело из кэша
+        hits = cache.hits
+        again = client.get("/api/events?limit=30", headers={"Accept-Encoding": encoding})
+        assert again.data == resp.data
+        assert cache.hits == hits + 1
+    assert cache.misses == misses + 2
+
+    # Маленькие ответы не сжимаем
+    small = client.get("/api/events?limit=1", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in small.headers
+
+
+def test_compressed_cache_follows_body_and_notifications():
+    key = '"etag"'
+    stale = compression.compressed_body(b"Stale" * 100, "gzip", key)
+    # Под тем же ETag другое тело — сжимаем его, а не отдаём запомненное
+    assert gzip.decompress(compression.compressed_body(b"Fresh" * 100, "gzip", key)) == b"Fresh" * 100
+
+    cache = get_cache("compressed_bodies")
+    hits = cache.hits
+    assert compression.compressed_body(b"Stale" * 100, "gzip", key) == stale
+    assert cache.hits == hits + 1
+    # Уведомление другого воркера сбрасывает кэш
+    dispatch(json.dumps({"table": "events", "op": "update", "id": 1, "origin": "other-worker"}))
+    compression.compressed_body(b"Stale" * 100, "gzip", key)
+    assert cache.hits == hits + 1
+
+
+def test_static_assets_hashed_and_precompressed(client):
+    html = client.get("/").get_data(as_text=True)
+    url = re.search(r'href="(/static/css/styles\.[0-9a-f]{12}\.css)"', html).group(1)
+
+    resp = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert resp.status_code == 200
+    assert resp.headers["Content-Encoding"] == "gzip"
+    assert "immutable" in resp.headers["Cache-Control"]
+    original = client.get("/static/css/styles.css")
+    assert gzip.decompress(resp.data) == original.data
+    assert original.headers["Cache-Control"] == "no-cache"
+
+    again = client.get(url, headers={"Accept-Encoding": "gzip", "If-None-Match": resp.headers["ETag"]})
+    assert again.status_code == 304
+    assert client.get("/static/css/missing.css").status_code == 404
@@ -0,0 +1,108 @@
+import json
+from datetime import datetime
+
+from models import event as event_model
+from models import importer
+from models import reward as reward_model
+
+
+def _event(ref: str, title: str = "Imported", **extra) -> dict:
+    return {
+        "kind": "event",
+        "ref": ref,
+        "title": title,
+        "event_type": "Seasonal",
+        "starts_at": "2031-01-01T10:00:00",
+        "ends_at": "2031-01-02T10:00:00",
+        **extra,
+    }
+
+
+def test_import_json_with_nested_rewards_maps_refs(client):
+    payload = [
+        _event("a", "Winter", rewards=[{"reward_type": "Gold", "amount": 100}]),
+        _event("b", "Spring", description='Кавычки "внутри", запятые', is_active=False),
+        {"kind": "reward", "event_ref": "b", "reward_type": "XP"},
+    ]
+
+    resp = client.post("/api/import", json=payload)
+    assert resp.status_code == 200
+    report = resp.get_json()
+    assert report["committed"] is True
+    assert report["events_created"] == 2
+    assert report["rewards_created"] == 2
+    assert report["errors"] == []
+
+    ids = report["event_ids"]
+    spring = event_model.get_event_by_id(ids["b"])
+    assert spring["title"] == "Spring"
+    assert spring["description"] == 'Кавычки "внутри", запятые'
+    assert spring["is_active"] is False
+
+    winter_rewards = reward_model.get_rewards_for_event(ids["a"])
+    assert [(r["reward_type"], r["amount"]) for r in winter_rewards] == [("Gold", 100)]
+    spring_rewards = reward_model.get_rewards_for_event(ids["b"])
+    assert [(r["reward_type"], r["amount"]) for r in spring_rewards] == [("XP", None)]
+    # Сводку наград для COPY посчитал триггер уровня оператора
+    assert event_model.get_event_by_id(ids["a"])["reward_totals"] == {"Gold": 100}
+    assert spring["reward_count"] == 1
+
+
+def test_import_csv_reports_row_errors_and_is_atomic(client):
+    csv_data = (
+        "kind,ref,event_ref,title,event_type,starts_at,ends_at,reward_type,amount\n"
+        "event,e1,,Good,PvP,2031-01-01T10:00,2031-01-01T12:00,,\n"
+        "event,e2,,Bad dates,PvP,2031-01-01T12:00,2031-01-01T10:00,,\n"
+        "reward,,e2,,,,,Gold,10\n"
+        "reward,,e1,,,,,Gold,abc\n"
+    )
+
+    resp = client.post("/api/import?format=csv", data=csv_data, content_type="text/csv")
+    assert resp.status_code == 422
+    report = resp.get_json()
+    assert report["committed"] is False
+    assert [e["row"] for e in report["errors"]] == [2, 3, 4]
+    assert event_model.get_all_events() == []
+
+    resp = client.post("/api/import?format=csv&skip_invalid=true", data=csv_data)
+    report = resp.get_json()
+    assert resp.status_code == 200
+    assert report["events_created"] == 1
+    assert report["rewards_created"] == 0
+    assert [e["title"] for e in event_model.get_all_events()] == ["Good"]
+
+
+def test_import_rewards_for_existing_events_ndjson():
+    existing_id = event_model.create_event(
+        title="Existing",
+        description="",
+        event_type="Daily",
+        starts_at=datetime(2031, 1, 1),
+        ends_at=datetime(2031, 1, 2),
+    )
+    # Ивент в кэше: сводку наград в нём пересчитает триггер, кэш должен сброситься
+    assert event_model.get_event_by_id(existing_id)["reward_count"] == 0
+    lines = [
+        {"kind": "reward", "event_id": existing_id, "reward_type": "Gem", "amount": 5},
+        {"kind": "reward", "event_id": 987654321, "reward_type": "Gem"},
+    ]
+    records = importer.parse_records("\n".join(json.dumps(line) for line in lines), "ndjson")
+
+    report = importer.import_records(records)
+    assert report["committed"] is False
+    assert report["errors"] == [{"row": 2, "error": "ивент 987654321 не существует"}]
+
+    report = importer.import_records(records, skip_invalid=True)
+    assert report["rewards_created"] == 1
+    assert [r["reward_type"] for r in reward_model.get_rewards_for_event(existing_id)] == ["Gem"]
+    assert event_model.get_event_by_id(existing_id)["reward_count"] == 1
+
+
+def test_import_cli_command(app, tmp_path):
+    path = tmp_path / "drop.json"
+    path.write_text(json.dumps([_event("x", "From CLI")]), encoding="utf-8")
+
+    result = app.test_cli_runner().invoke(args=["import-events", str(path)])
+    assert result.exit_code == 0, result.output
+    assert "Ивентов: 1" in result.output
+    assert [e["title"] for e in event_model.get_all_events()] == ["From CLI"]
@@ -0,0 +1,68 @@
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+
+from controllers import json_provider
+from models import event as event_model
+from models.database import add_query_listener, remove_query_listener
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_provider_encodes_iso_dates_in_both_modes(app, monkeypatch, use_orjson):
+    if use_orjson and json_provider.orjson is None:
+        pytest.skip("orjson не установлен")
+    monkeypatch.setattr(json_provider, "USE_ORJSON", use_orjson)
+
+    data = {
+        "title": "Ивент",
+        "starts_at": datetime(2030, 1, 2, 3, 4, 5, 678),
+        "ends_at": datetime(2030, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+        "amount": Decimal("1.50"),
+    }
+    body = app.json.response_body(data)
+    assert body == (
+        '{"amount":"1.50","ends_at":"2030-01-02T03:04:05+00:00",'
+        '"starts_at":"2030-01-02T03:04:05.000678","title":"Ивент"}\n'
+    ).encode()
+    assert app.json.dumps(data) + "\n" == body.decode()
+    assert app.json.loads(bytes(body))["title"] == "Ивент"
+
+
+def test_api_returns_iso_dates_and_caches_encoded_pages(client):
+    now = datetime.utcnow().replace(microsecond=0)
+    event_model.create_event(
+        title="Json",
+        description="",
+        event_type="Daily",
+        starts_at=now - timedelta(hours=1),
+        ends_at=now + timedelta(hours=1),
+    )
+
+    resp = client.get("/api/events")
+    assert resp.status_code == 200
+    assert resp.get_json()[0]["starts_at"] == (now - timedelta(hours=1)).replace(tzinfo=timezone.utc).isoformat()
+
+    queries = []
+
+    def listener(query, duration, rowcount):
+        queries.append(query)
+
+    add_query_listener(listener)
+    try:
+        again = client.get("/api/events")
+    finally:
+        remove_query_listener(listener)
+    # Тот же ETag — готовые байты из кэша: только чтение версии таблиц
+    assert again.data == resp.data
+    assert again.headers["ETag"] == resp.headers["ETag"]
+    assert not any("FROM events" in q for q in queries)
+
+    event_model.create_event(
+        title="Json 2",
+        description="",
+        event_type="Daily",
+        starts_at=now,
+        ends_at=now + timedelta(hours=1),
+    )
+    assert len(client.get("/api/events").get_json()) == 2
@@ -0,0 +1,71 @@
+import time
+from datetime import datetime, timedelta
+
+from models import event as event_model
+from models import lifecycle
+from models import reward as reward_model
+from models.database import fetch_one
+
+
+def test_deactivate_expired_in_batches(app, make_event):
+    now = datetime.utcnow()
+    expired = [make_event(f"Old {i}", now - timedelta(days=2), now - timedelta(hours=i + 1)) for i in range(5)]
+    current = make_event("Current", now - timedelta(hours=1), now + timedelta(hours=1))
+    # Ивент в кэше — после прохода он должен перечитаться
+    assert event_model.get_event_by_id(expired[0])["is_active"] is True
+
+    assert lifecycle.deactivate_expired(now, batch_size=2) == 5
+    assert all(event_model.get_event_by_id(i)["is_active"] is False for i in expired)
+    assert event_model.get_event_by_id(current)["is_active"] is True
+    assert lifecycle.deactivate_expired(now, batch_size=2) == 0
+
+    # Следующая граница — сразу после окончания текущего ивента
+    boundary = lifecycle.next_lifecycle_boundary(now, archive_after_days=0)
+    assert boundary == event_model.get_event_by_id(current)["ends_at"].replace(tzinfo=None) + timedelta(microseconds=1)
+
+
+def test_archive_moves_events_with_rewards(client, make_event):
+    now = datetime.utcnow()
+    old_id = make_event("Ancient", now - timedelta(days=40), now - timedelta(days=31))
+    reward_model.add_reward(old_id, "gold", 100, "")
+    reward_model.add_reward(old_id, "gold", 50, "")
+    recent_id = make_event("Recent", now - timedelta(days=3), now - timedelta(days=2))
+
+    result = lifecycle.run_lifecycle(now, batch_size=10, archive_after_days=30)
+    assert result == {"partitions_created": 0, "deactivated": 2, "archived": 1, "partitions_dropped": 0}
+
+    # В горячих таблицах остался только недавний ивент
+    assert client.get(f"/api/events/{old_id}").status_code == 404
+    assert fetch_one("SELECT count(*) AS n FROM rewards;")["n"] == 0
+    assert event_model.get_event_by_id(recent_id) is not None
+
+    resp = client.get("/api/archive/events?include=rewards")
+    assert resp.status_code == 200
+    items = resp.get_json()
+    assert [e["id"] for e in items] == [old_id]
+    assert items[0]["reward_count"] == 2 and items[0]["reward_totals"] == {"gold": 150}
+    assert [r["amount"] for r in items[0]["rewards"]] == [100, 50]
+
+    resp = client.get(f"/api/archive/events/{old_id}")
+    assert resp.status_code == 200
+    assert resp.get_json()["title"] == "Ancient" and len(resp.get_json()["rewards"]) == 2
+    assert client.get(f"/api/archive/events/{old_id}", headers={"If-None-Match": resp.headers["ETag"]}).status_code == 304
+    assert client.get(f"/api/archive/events/{recent_id}").status_code == 404
+
+
+def test_worker_sleeps_until_next_end(app, make_event):
+    now = datetime.utcnow()
+    event_id = make_event("Short", now - timedelta(minutes=1), now + timedelta(seconds=0.5))
+    worker = lifecycle.LifecycleWorker(archive_after_days=0, max_sleep=30)
+    worker.start()
+    try:
+        assert worker.idle.wait(5)
+        # Первый проход ничего не нашёл и ждёт окончания ивента, а не max_sleep
+        assert worker.next_run < datetime.utcnow() + timedelta(seconds=1)
+        deadline = time.monotonic() + 5
+        while worker.deactivated == 0 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert worker.deactivated == 1
+        assert event_model.get_event_by_id(event_id)["is_active"] is False
+    finally:
+        worker.stop(5)
@@ -0,0 +1,82 @@
+import json
+import os
+from datetime import datetime, timedelta
+
+from controllers import metrics_controller
+from models import event as event_model
+from models import metrics
+
+
+def test_fingerprint_ignores_literals_and_whitespace():
+    fp1, normalized = metrics.fingerprint("SELECT *  FROM events\n WHERE id = 42 AND title = 'a''b';")
+    fp2, _ = metrics.fingerprint("SELECT * FROM events WHERE id = 7 AND title = 'x'")
+    assert fp1 == fp2
+    assert normalized == "SELECT * FROM events WHERE id = ? AND title = ?"
+
+
+def test_render_merges_processes_and_drops_dead_gauges():
+    first = metrics.MetricsRegistry()
+    second = metrics.MetricsRegistry()
+    for registry in (first, second):
+        registry.inc("gameevents_http_requests_total", endpoint="/api/events", method="GET", status=200)
+        registry.observe("gameevents_http_request_duration_seconds", 0.003, endpoint="/api/events", method="GET")
+
+    dead = second.snapshot()
+    dead["pid"] = 2**22 + 12345  # заведомо несуществующий процесс
+    dead["gauges"] = [["gameevents_db_pool_connections", [["state", "idle"]], 3]]
+
+    text = metrics.render_prometheus([first.snapshot(), dead])
+    assert 'gameevents_http_requests_total{endpoint="/api/events",method="GET",status="200"} 2' in text
+    assert 'gameevents_http_request_duration_seconds_bucket{endpoint="/api/events",method="GET",le="0.005"} 2' in text
+    assert 'gameevents_http_request_duration_seconds_bucket{endpoint="/api/events",method="GET",le="0.001"} 0' in text
+    assert 'gameevents_http_request_duration_seconds_count{endpoint="/api/events",method="GET"} 2' in text
+    assert f'pid="{dead["pid"]}"' not in text
+
+
+def test_server_timing_and_metrics_endpoint(client):
+    now = datetime.utcnow()
+    event_model.create_event(
+        title="Timed",
+        description="",
+        event_type="Daily",
+        starts_at=now - timedelta(hours=1),
+        ends_at=now + timedelta(hours=1),
+    )
+
+    resp = client.get("/api/events?include=rewards")
+    assert resp.status_code == 200
+    timing = resp.headers["Server-Timing"]
+    # Версия таблиц, страница ивентов и награды одним запросом
+    assert 'desc="3 queries"' in timing
+    assert "pool;dur=" in timing and "app;dur=" in timing
+
+    resp = client.get("/metrics")
+    assert resp.status_code == 200
+    assert resp.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+    text = resp.get_data(as_text=True)
+    assert "# TYPE gameevents_http_request_duration_seconds histogram" in text
+    assert 'gameevents_http_request_db_queries_bucket{endpoint="/api/events",le="3"}' in text
+    assert "gameevents_db_query_duration_seconds_bucket{fingerprint=" in text
+    assert f'gameevents_db_pool_connections{{pid="{os.getpid()}",state="in_use"}}' in text
+    assert 'gameevents_cache_requests_total{cache="get_event_by_id",result="hit"}' in text
+
+
+def test_slow_query_log(client, capsys, monkeypatch):
+    monkeypatch.setattr(metrics_controller, "_slow_query_ms", 0.0)
+    client.get("/api/events/1")
+    out = capsys.readouterr().out
+    assert "[SLOW SQL]" in out
+    assert "/api/events/<int:event_id>" in out
+
+
+def test_snapshots_shared_through_directory(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_DIR", str(tmp_path))
+    other = metrics.MetricsRegistry().snapshot()
+    other["pid"] = os.getpid() + 1
+    other["counters"] = [["gameevents_db_slow_queries_total", [["fingerprint", "abc"]], 5]]
+    (tmp_path / f"metrics_{other['pid']}.json").write_text(json.dumps(other), encoding="utf-8")
+
+    snapshots = metrics.collect_snapshots()
+    assert {s["pid"] for s in snapshots} == {os.getpid(), other["pid"]}
+    assert (tmp_path / f"metrics_{os.getpid()}.json").exists()
+    assert 'gameevents_db_slow_queries_total{fingerprint="abc"} 5' in metrics.render_prometheus(snapshots)
@@ -2,6 +2,7 @@ from datetime import datetime, timedelta
 
 from models import event as event_model
 from models import reward as reward_model
+from models.database import execute
 
 
 def test_create_and_get_event():
@@ -94,3 +95,106 @@ def test_rewards_add_and_get():
     types = {r["reward_type"] for r in rewards}
     assert "Gold" in types
     assert "XP" in types
+
+
+def test_events_page_keyset_pagination_and_filters():
+    base = datetime.utcnow()
+    ids = []
+    for i in range(5):
+        ids.append(
+            event_model.create_event(
+                title=f"Page {i}",
+                description="",
+                event_type="PvP" if i % 2 else "Daily",
+                starts_at=base + timedelta(hours=i),
+                ends_at=base + timedelta(hours=i + 1),
+                is_active=True,
+            )
+        )
+    # От новых к старым
+    expected = list(reversed(ids))
+
+    page1 = event_model.get_events_page(limit=2)
+    assert [e["id"] for e in page1["items"]] == expected[:2]
+    assert page1["prev_cursor"] is None
+
+    page2 = event_model.get_events_page(limit=2, cursor=page1["next_cursor"])
+    assert [e["id"] for e in page2["items"]] == expected[2:4]
+
+    page3 = event_model.get_events_page(limit=2, cursor=page2["next_cursor"])
+    assert [e["id"] for e in page3["items"]] == expected[4:]
+    assert page3["next_cursor"] is None
+
+    # Назад со второй страницы — снова первая
+    back = event_model.get_events_page(limit=2, cursor=page2["prev_cursor"])
+    assert [e["id"] for e in back["items"]] == expected[:2]
+
+    pvp = event_model.get_events_page(event_type="PvP")
+    assert {e["id"] for e in pvp["items"]} == {ids[1], ids[3]}
+
+    window = event_model.get_events_page(
+        window_start=base + timedelta(hours=3, minutes=30),
+        window_end=base + timedelta(hours=10),
+    )
+    assert {e["id"] for e in window["items"]} == {ids[3], ids[4]}
+
+
+def test_rewards_for_events_batch():
+    starts_at = datetime.utcnow()
+    ids = [
+        event_model.create_event(
+            title=f"Batch {i}",
+            description="",
+            event_type="Quest",
+            starts_at=starts_at,
+            ends_at=starts_at + timedelta(hours=1),
+            is_active=True,
+        )
+        for i in range(3)
+    ]
+    reward_model.add_reward(ids[0], "Gold", 100, "")
+    reward_model.add_reward(ids[0], "XP", 10, "")
+    reward_model.add_reward(ids[2], "Gem", 1, "")
+
+    grouped = reward_model.get_rewards_for_events(ids)
+
+    assert [r["reward_type"] for r in grouped[ids[0]]] == ["Gold", "XP"]
+    assert grouped[ids[1]] == []
+    assert [r["reward_type"] for r in grouped[ids[2]]] == ["Gem"]
+    assert reward_model.get_rewards_for_events([]) == {}
+
+
+def test_reward_summary_maintained_and_repaired(app):
+    starts_at = datetime.utcnow()
+    event_id = event_model.create_event(
+        title="Summary",
+        description="",
+        event_type="Quest",
+        starts_at=starts_at,
+        ends_at=starts_at + timedelta(hours=1),
+        is_active=True,
+    )
+    assert event_model.get_all_events()[0]["reward_count"] == 0
+
+    reward_model.add_reward(event_id, "Gold", 100, "")
+    reward_model.add_reward(event_id, "Gold", 50, "")
+    reward_model.add_reward(event_id, "XP", None, "")
+
+    # Кэш списка сброшен записью награды — сводка видна сразу
+    ev = event_model.get_all_events()[0]
+    assert ev["reward_count"] == 3
+    assert ev["reward_totals"] == {"Gold": 150, "XP": 0}
+    assert event_model.get_event_by_id(event_id)["reward_totals"] == {"Gold": 150, "XP": 0}
+
+    reward_model.delete_rewards_for_event(event_id)
+    assert event_model.get_event_by_id(event_id)["reward_count"] == 0
+
+    # Сводка испорчена в обход триггеров — команда находит и чинит
+    reward_model.add_reward(event_id, "Gem", 5, "")
+    execute("UPDATE events SET reward_count = 42, reward_totals = '{}' WHERE id = %s;", (event_id,))
+    result = app.test_cli_runner().invoke(args=["refresh-reward-summary"])
+    assert result.exit_code == 0, result.output
+    assert "Исправлено ивентов: 1" in result.output
+    ev = event_model.get_event_by_id(event_id)
+    assert (ev["reward_count"], ev["reward_totals"]) == (1, {"Gem": 5})
+    assert reward_model.refresh_reward_summaries([event_id]) == 0
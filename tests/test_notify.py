@@ -0,0 +1,57 @@
+import json
+import time
+
+import pytest
+
+from models import event as event_model
+from models.database import execute
+from models.notify import CHANGES_CHANNEL, ChangeListener
+
+
+def _wait_for(predicate, timeout: float = 3.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+@pytest.fixture()
+def listener():
+    listener = ChangeListener(poll_timeout=0.1, reconnect_delay=0.05)
+    listener.start()
+    assert listener.connected.wait(3)
+    yield listener
+    listener.stop(timeout=3)
+
+
+def _rename_behind_cache(event_id: int, title: str) -> None:
+    # Имитируем запись другим воркером: меняем строку в обход моделей
+    execute("UPDATE events SET title = %s WHERE id = %s;", (title, event_id))
+
+
+def test_foreign_notification_invalidates_cache(listener, make_event):
+    event_id = make_event("Original")
+    assert event_model.get_event_by_id(event_id)["title"] == "Original"
+
+    _rename_behind_cache(event_id, "Changed elsewhere")
+    # Кэш ещё отдаёт старое значение
+    assert event_model.get_event_by_id(event_id)["title"] == "Original"
+
+    payload = {"table": "events", "op": "update", "id": event_id, "origin": "other-worker"}
+    execute("SELECT pg_notify(%s, %s);", (CHANGES_CHANNEL, json.dumps(payload)))
+
+    assert _wait_for(lambda: event_model.get_event_by_id(event_id)["title"] == "Changed elsewhere")
+
+
+def test_listener_reconnects_and_flushes_caches(listener, make_event):
+    event_id = make_event("Before reconnect")
+    assert event_model.get_event_by_id(event_id)["title"] == "Before reconnect"
+
+    _rename_behind_cache(event_id, "Missed while offline")
+    execute("SELECT pg_terminate_backend(%s);", (listener.backend_pid,))
+
+    assert _wait_for(lambda: listener.reconnects == 1 and listener.connected.is_set())
+    # Уведомление было потеряно, но после переподключения кэш сброшен целиком
+    assert event_model.get_event_by_id(event_id)["title"] == "Missed while offline"
@@ -0,0 +1,155 @@
+import json
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlsplit
+
+import psycopg2
+import pytest
+
+from models import database
+from models import event as event_model
+from models import importer
+from models import lifecycle
+from models import partitions
+from models import reward as reward_model
+from models.cache import invalidate_all
+from models.database import close_pool, fetch_all, fetch_one, migrate_schema
+
+PARTITIONS_DB = "gameevents_partitions_test"
+
+
+@pytest.fixture()
+def partitioned_db(monkeypatch):
+    """
+    Отдельная база: перевод на разделы необратим, а общая база тестов
+    должна остаться обычной.
+    """
+    base_url = database.DATABASE_URL
+    admin = psycopg2.connect(base_url)
+    admin.autocommit = True
+    cur = admin.cursor()
+    cur.execute(f"DROP DATABASE IF EXISTS {PARTITIONS_DB};")
+    cur.execute(f"CREATE DATABASE {PARTITIONS_DB} TEMPLATE template0 ENCODING 'UTF8';")
+    close_pool()
+    monkeypatch.setattr(database, "DATABASE_URL", urlsplit(base_url)._replace(path=f"/{PARTITIONS_DB}").geturl())
+    invalidate_all()
+    try:
+        migrate_schema()
+        yield
+    finally:
+        close_pool()
+        monkeypatch.undo()
+        invalidate_all()
+        cur.execute(f"DROP DATABASE IF EXISTS {PARTITIONS_DB} WITH (FORCE);")
+        admin.close()
+
+
+def _partition_of(table: str, condition: str, params: tuple) -> str:
+    return fetch_one(f"SELECT tableoid::regclass::text AS part FROM {table} WHERE {condition};", params)["part"]
+
+
+def test_partition_tables_keeps_data_and_constraints(partitioned_db):
+    now = datetime(2031, 5, 15, 12, 0)
+    old_id = event_model.create_event("Old", "", "Daily", now - timedelta(days=60), now - timedelta(days=59))
+    current_id = event_model.create_event("Now", "", "PvP", now - timedelta(hours=1), now + timedelta(hours=1))
+    reward_model.add_reward(old_id, "Gold", 10, "")
+    reward_model.add_reward(current_id, "XP", 5, "")
+
+    result = partitions.partition_tables(now=now, months_ahead=2)
+    assert result["converted"] is True
+    assert (result["events"], result["rewards"]) == (2, 2)
+    assert partitions.is_partitioned()
+    assert _partition_of("events", "id = %s", (old_id,)) == "events_p2031_03"
+    assert _partition_of("rewards", "event_id = %s", (old_id,)) == "rewards_p2031_03"
+
+    # Индексы, триггеры сводки и счётчиков версий перенесены
+    indexes = {row["indexname"] for row in fetch_all("SELECT indexname FROM pg_indexes WHERE tablename = 'events';")}
+    assert {"idx_events_active_range", "idx_events_search", "idx_events_ends_at"} <= indexes
+    version = fetch_one("SELECT version FROM table_versions WHERE table_name = 'events';")["version"]
+    new_id = event_model.create_event("Next", "", "Daily", now + timedelta(days=20), now + timedelta(days=21))
+    assert fetch_one("SELECT version FROM table_versions WHERE table_name = 'events';")["version"] > version
+    reward_model.add_reward(new_id, "Gem", 3, "")
+    assert event_model.get_event_by_id(new_id)["reward_totals"] == {"Gem": 3}
+    assert _partition_of("rewards", "event_id = %s", (new_id,)) == "rewards_p2031_06"
+
+    # Новый starts_at — ивент и его награды переезжают в раздел другого месяца
+    event_model.update_event(new_id, "Next", "", "Daily", now + timedelta(days=50), now + timedelta(days=51), True)
+    assert _partition_of("events", "id = %s", (new_id,)) == "events_p2031_07"
+    assert _partition_of("rewards", "event_id = %s", (new_id,)) == "rewards_p2031_07"
+
+    records = importer.parse_records(
+        json.dumps(
+            [
+                {"kind": "event", "ref": "a", "title": "Imported", "event_type": "Quest",
+                 "starts_at": "2031-05-01T00:00:00", "ends_at": "2031-05-02T00:00:00",
+                 "rewards": [{"reward_type": "Gold", "amount": 1}]},
+                {"kind": "reward", "event_id": old_id, "reward_type": "XP", "amount": 2},
+            ]
+        ).encode(),
+        "json",
+    )
+    report = importer.import_records(records)
+    assert report["committed"] is True
+    assert event_model.get_event_by_id(old_id)["reward_count"] == 2
+
+    event_model.delete_event(old_id)
+    assert fetch_one("SELECT count(*) AS n FROM rewards WHERE event_id = %s;", (old_id,))["n"] == 0
+
+
+def test_queries_prune_partitions(partitioned_db):
+    now = datetime(2031, 5, 15, 12, 0)
+    for days in (-60, -30, 0, 30, 60):
+        event_model.create_event("E", "", "Daily", now + timedelta(days=days), now + timedelta(days=days, hours=1))
+    partitions.partition_tables(now=now, months_ahead=2)
+
+    def plan(query: str, params: tuple) -> dict:
+        return fetch_all("EXPLAIN (FORMAT JSON) " + query, params)[0]["QUERY PLAN"][0]["Plan"]
+
+    def scanned(query: str, params: tuple) -> set[str]:
+        return set(_relations(plan(query, params)))
+
+    # Активные сейчас: разделы будущих месяцев отсечены
+    active = scanned(event_model.ACTIVE_EVENTS_QUERY, (now, now))
+    assert "events_p2031_06" not in active and "events_p2031_07" not in active
+    assert [e["title"] for e in fetch_all(event_model.ACTIVE_EVENTS_QUERY, (now, now))] == ["E"]
+
+    # Следующая страница списка читает только разделы не позже курсора
+    first = event_model.get_events_page(limit=2)
+    assert [e["starts_at"].month for e in first["items"]] == [7, 6]
+    query, params, _ = event_model.events_page_query(2, first["next_cursor"], None, None, None, None)
+    assert "events_p2031_07" not in scanned(query, params)
+    items = event_model.get_events_page(limit=2, cursor=first["next_cursor"])["items"]
+    assert [e["starts_at"].month for e in items] == [5, 4]
+
+    # Окно по времени читает разделы по порядку (Append), а не сливает все
+    query, params, _ = event_model.events_page_query(2, None, None, None, now - timedelta(days=40), now)
+    assert "Merge Append" not in json.dumps(plan(query, params))
+
+
+def _relations(node: dict) -> list[str]:
+    names = [node["Relation Name"]] if "Relation Name" in node else []
+    for child in node.get("Plans", ()):
+        names += _relations(child)
+    return names
+
+
+def test_ensure_and_drop_partitions(partitioned_db):
+    now = datetime(2031, 5, 15, 12, 0)
+    event_model.create_event("Old", "", "Daily", now - timedelta(days=90), now - timedelta(days=89))
+    partitions.partition_tables(now=now, months_ahead=0)
+    assert partitions._existing_months()[0] == datetime(2031, 2, 1, tzinfo=timezone.utc)
+
+    assert partitions.ensure_partitions(now, months_ahead=2) == ["events_p2031_06", "events_p2031_07"]
+    assert partitions.ensure_partitions(now, months_ahead=2) == []
+
+    # Ивент далеко в будущем — в events_future; пока он там, месяцы не отрезаем
+    far_id = event_model.create_event("Far", "", "Daily", datetime(2031, 9, 3), datetime(2031, 9, 4))
+    assert _partition_of("events", "id = %s", (far_id,)) == "events_future"
+    assert partitions.ensure_partitions(now, months_ahead=4) == []
+
+    # Архивация опустошает февраль и март — проход планировщика их удаляет
+    result = lifecycle.run_lifecycle(now, archive_after_days=30)
+    assert (result["archived"], result["partitions_dropped"]) == (1, 2)
+    assert partitions._existing_months()[0] == datetime(2031, 4, 1, tzinfo=timezone.utc)
+    # Старые ивенты по-прежнему можно добавить — они попадут в history
+    late_id = event_model.create_event("Late", "", "Daily", datetime(2031, 2, 1), datetime(2031, 2, 2))
+    assert _partition_of("events", "id = %s", (late_id,)) == "events_history"
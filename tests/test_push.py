@@ -0,0 +1,125 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from controllers.async_api_controller import create_asgi_app
+from models import event as event_model
+from models import push
+
+
+@pytest.fixture()
+def subscription():
+    sub = push.Subscription()
+    push.broadcaster.subscribe(sub)
+    yield sub
+    push.broadcaster.unsubscribe(sub)
+
+
+def wait_for(sub, message_type, timeout=3.0):
+    """Первое сообщение нужного типа (остальные — например, от чужих тестов — пропускаем)."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        message = sub.get(timeout=0.1)
+        if message is not None and message is not push.OVERFLOW and message.type == message_type:
+            return message
+    raise AssertionError(f"нет сообщения {message_type}")
+
+
+def test_writes_are_pushed(subscription, make_event):
+    now = datetime.utcnow()
+    event_id = make_event("Pushed", now - timedelta(hours=1), now + timedelta(hours=1))
+    created = wait_for(subscription, "created")
+    assert created.data["id"] == event_id
+    assert created.data["title"] == "Pushed"
+    # Даты с часовым поясом — как в started/ended от индекса
+    assert created.data["starts_at"].tzinfo is not None
+
+    event_model.update_event(
+        event_id=event_id,
+        title="Renamed",
+        description="",
+        event_type="Daily",
+        starts_at=now - timedelta(hours=1),
+        ends_at=now + timedelta(hours=1),
+        is_active=True,
+    )
+    assert wait_for(subscription, "updated").data["title"] == "Renamed"
+
+    event_model.delete_event(event_id)
+    assert wait_for(subscription, "deleted").data == {"id": event_id}
+
+
+def test_scheduler_pushes_start_and_end(subscription, make_event):
+    now = datetime.utcnow()
+    event_id = make_event("Flash", now + timedelta(milliseconds=300), now + timedelta(milliseconds=600))
+
+    started = wait_for(subscription, "started")
+    assert started.data["id"] == event_id
+    ended = wait_for(subscription, "ended")
+    assert ended.data["id"] == event_id
+    assert datetime.utcnow() > now + timedelta(milliseconds=600)
+
+
+def test_replay_after_last_event_id():
+    broadcaster = push.Broadcaster()
+    first = broadcaster.publish("updated", {"id": 1})
+    broadcaster.publish("updated", {"id": 2})
+    broadcaster.publish("deleted", {"id": 3})
+
+    replay = broadcaster.subscribe(push.Subscription(), first.id)
+    assert [m.data["id"] for m in replay] == [2, 3]
+
+    # id чужого процесса не восстановить — только resync
+    assert [m.type for m in broadcaster.subscribe(push.Subscription(), "deadbeef-1")] == ["resync"]
+    broadcaster.stop(timeout=1)
+
+
+def test_slow_subscriber_overflows():
+    sub = push.Subscription(maxsize=2)
+    for i in range(3):
+        sub.put(push.PushMessage(str(i), "updated", {"id": i}))
+    assert sub.get(timeout=0.1) is push.OVERFLOW
+    assert sub.get(timeout=0.01) is None
+
+
+def test_sse_endpoint(client):
+    resp = client.get("/api/events/stream")
+    assert resp.status_code == 200
+    assert resp.mimetype == "text/event-stream"
+
+    chunks = resp.iter_encoded()
+    assert next(chunks).startswith(b"retry:")
+    message = push.broadcaster.publish("updated", {"id": 42})
+    chunk = next(chunks)
+    assert chunk.startswith(f"id: {message.id}\nevent: updated\ndata: ".encode())
+    resp.close()
+    assert push.broadcaster.subscriber_count == 0
+
+
+def test_async_sse_endpoint(app):
+    asgi_app = create_asgi_app(app)
+    scope = {"type": "http", "method": "GET", "path": "/api/events/stream", "query_string": b"", "headers": []}
+
+    async def run():
+        sent = asyncio.Queue()
+        disconnect = asyncio.Event()
+
+        async def receive():
+            await disconnect.wait()
+            return {"type": "http.disconnect"}
+
+        task = asyncio.create_task(asgi_app(scope, receive, sent.put))
+        assert (await sent.get())["status"] == 200
+        assert (await sent.get())["body"].startswith(b"retry:")
+
+        push.broadcaster.publish("deleted", {"id": 7})
+        body = (await asyncio.wait_for(sent.get(), 2))["body"]
+        assert b"event: deleted" in body
+
+        disconnect.set()
+        await asyncio.wait_for(task, 2)
+
+    asyncio.run(run())
+    assert push.broadcaster.subscriber_count == 0
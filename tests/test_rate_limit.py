@@ -0,0 +1,76 @@
+import sqlite3
+
+import pytest
+
+from models.rate_limit import MemoryBucketStore, SQLiteBucketStore, parse_limit, parse_rules
+
+
+def test_token_bucket_bursts_then_refills():
+    store = MemoryBucketStore()
+    limit = parse_limit("3/6")
+    assert [store.take("client", limit, now=100.0) for _ in range(3)] == [0.0, 0.0, 0.0]
+    # Корзина пуста, токен возвращается раз в 2 секунды
+    assert store.take("client", limit, now=100.5) == pytest.approx(1.5)
+    assert store.take("other", limit, now=100.5) == 0.0
+    assert store.take("client", limit, now=102.0) == 0.0
+    assert store.take("client", limit, now=102.0) == pytest.approx(2.0)
+
+
+def test_parse_rules():
+    rules = parse_rules("api.api_active_events=10/1, *=120/60")
+    assert (rules["api.api_active_events"].capacity, rules["*"].rate) == (10, 2.0)
+    for spec in ("api.api_active_events", "=1/1", "x=0/1", "x=1/0", "x=fast"):
+        with pytest.raises(ValueError):
+            parse_rules(spec)
+
+
+def test_sqlite_store_is_shared_between_workers(tmp_path):
+    path = str(tmp_path / "buckets.db")
+    # Два хранилища на одном файле — как два воркера gunicorn
+    first, second = SQLiteBucketStore(path), SQLiteBucketStore(path)
+    limit = parse_limit("2/10")
+    assert first.take("client", limit, now=100.0) == 0.0
+    assert second.take("client", limit, now=100.0) == 0.0
+    assert first.take("client", limit, now=100.0) == pytest.approx(5.0)
+    assert len(second) == 1
+
+
+def test_sqlite_store_falls_back_to_process_buckets_when_locked(tmp_path):
+    path = str(tmp_path / "buckets.db")
+    store = SQLiteBucketStore(path, busy_timeout=0.01)
+    limit = parse_limit("2/10")
+    assert store.take("client", limit, now=100.0) == 0.0
+
+    # Другой воркер держит файл: лимит не снимается, а считается в процессе
+    other = sqlite3.connect(path, isolation_level=None)
+    other.execute("BEGIN IMMEDIATE;")
+    try:
+        assert store.take("client", limit, now=100.0) == 0.0
+        assert store.take("client", limit, now=100.0) == 0.0
+        assert store.take("client", limit, now=100.0) == pytest.approx(5.0)
+        assert store.fallbacks == 3
+    finally:
+        other.execute("ROLLBACK;")
+        other.close()
+
+    # Файл свободен — снова общая корзина (в ней один токен уже списан)
+    assert store.take("client", limit, now=100.0) == 0.0
+    assert store.take("client", limit, now=100.0) == pytest.approx(5.0)
+    assert store.fallbacks == 3
+
+
+def test_api_returns_429_with_retry_after(app, client, monkeypatch):
+    monkeypatch.setitem(app.config, "RATE_LIMITS", "api.api_active_events=2/60, *=100/1")
+    monkeypatch.setitem(app.extensions, "rate_limit", MemoryBucketStore())
+
+    assert [client.get("/api/events/active").status_code for _ in range(2)] == [200, 200]
+    resp = client.get("/api/events/active")
+    assert resp.status_code == 429
+    assert resp.headers["Retry-After"] == "30"
+    assert "error" in resp.get_json()
+
+    # Другой клиент и другой эндпоинт — свои корзины; страницы админки без лимита
+    other = client.get("/api/events/active", environ_base={"REMOTE_ADDR": "10.0.0.2"})
+    assert other.status_code == 200
+    assert client.get("/api/events").status_code == 200
+    assert client.get("/").status_code == 200
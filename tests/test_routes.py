@@ -1,6 +1,12 @@
+import json
 from datetime import datetime, timedelta
 
+from controllers import api_controller
 from models import event as event_model
+from models import reward as reward_model
+from models.cache import get_cache
+from models.database import execute
+from models.notify import dispatch
 
 
 def _dt_to_html(dt: datetime) -> str:
@@ -89,3 +95,225 @@ def test_api_events_and_active(client):
     ids_active = {e["id"] for e in data_active}
     assert active_id in ids_active
     assert inactive_id not in ids_active
+
+
+def test_api_events_cursor_pagination(client):
+    now = datetime.utcnow()
+    for i in range(3):
+        event_model.create_event(
+            title=f"Paged {i}",
+            description="",
+            event_type="Daily",
+            starts_at=now + timedelta(hours=i),
+            ends_at=now + timedelta(hours=i + 1),
+            is_active=True,
+        )
+
+    resp = client.get("/api/events?limit=2")
+    assert resp.status_code == 200
+    assert len(resp.get_json()) == 2
+    assert 'rel="next"' in resp.headers["Link"]
+
+    cursor = resp.headers["X-Next-Cursor"]
+    resp_next = client.get(f"/api/events?limit=2&cursor={cursor}")
+    assert [e["title"] for e in resp_next.get_json()] == ["Paged 0"]
+    assert "X-Next-Cursor" not in resp_next.headers
+    assert "X-Prev-Cursor" in resp_next.headers
+
+    assert client.get("/api/events?cursor=garbage").status_code == 400
+    assert client.get("/api/events?limit=0").status_code == 400
+
+
+def test_api_conditional_get(client):
+    now = datetime.utcnow()
+    event_id = event_model.create_event(
+        title="Cached",
+        description="",
+        event_type="Daily",
+        starts_at=now - timedelta(minutes=10),
+        ends_at=now + timedelta(minutes=10),
+        is_active=True,
+    )
+
+    for url in ("/api/events", f"/api/events/{event_id}", f"/api/events/{event_id}/rewards"):
+        first = client.get(url)
+        assert first.status_code == 200
+        etag = first.headers["ETag"]
+
+        again = client.get(url, headers={"If-None-Match": etag})
+        assert again.status_code == 304
+        assert again.data == b""
+
+        since = client.get(url, headers={"If-Modified-Since": first.headers["Last-Modified"]})
+        assert since.status_code == 304
+
+    # Изменение данных меняет ETag
+    etag_before = client.get("/api/events").headers["ETag"]
+    event_model.delete_event(event_id)
+    changed = client.get("/api/events", headers={"If-None-Match": etag_before})
+    assert changed.status_code == 200
+    assert changed.get_json() == []
+
+
+def test_api_active_events_cache_control(client):
+    now = datetime.utcnow()
+    event_model.create_event(
+        title="Ends soon",
+        description="",
+        event_type="Daily",
+        starts_at=now - timedelta(minutes=10),
+        ends_at=now + timedelta(seconds=10),
+        is_active=True,
+    )
+
+    resp = client.get("/api/events/active")
+    assert resp.status_code == 200
+    # max-age не выходит за момент окончания ивента
+    max_age = int(resp.headers["Cache-Control"].split("max-age=")[1])
+    assert 0 <= max_age <= 10
+
+    again = client.get("/api/events/active", headers={"If-None-Match": resp.headers["ETag"]})
+    assert again.status_code == 304
+
+
+def test_api_body_for_new_version_is_not_built_from_stale_caches(client):
+    now = datetime.utcnow()
+    event_id = event_model.create_event("Before", "", "Daily", now - timedelta(minutes=5), now + timedelta(hours=1))
+    first = client.get("/api/events/active")
+    assert [e["title"] for e in first.get_json()] == ["Before"]
+    detail = client.get(f"/api/events/{event_id}")
+    assert detail.get_json()["title"] == "Before"
+    assert event_model.get_event_by_id(event_id)["title"] == "Before"
+
+    # Запись другого воркера, уведомление о которой сюда ещё не дошло:
+    # версия таблиц уже новая, а кэши моделей — старые
+    execute("UPDATE events SET title = 'After' WHERE id = %s;", (event_id,))
+    second = client.get("/api/events/active")
+    assert second.headers["ETag"] != first.headers["ETag"]
+    assert [e["title"] for e in second.get_json()] == ["After"]
+    # И под новым ETag в кэше ответов лежит новое тело
+    assert [e["title"] for e in client.get("/api/events/active").get_json()] == ["After"]
+
+    assert event_model.get_event_by_id(event_id)["title"] == "Before"
+    resp = client.get(f"/api/events/{event_id}", headers={"If-None-Match": detail.headers["ETag"]})
+    assert resp.status_code == 200
+    assert resp.get_json()["title"] == "After"
+
+
+def test_api_include_rewards_and_bulk(client):
+    now = datetime.utcnow()
+    event_id = event_model.create_event(
+        title="With rewards",
+        description="",
+        event_type="Daily",
+        starts_at=now - timedelta(minutes=10),
+        ends_at=now + timedelta(minutes=10),
+        is_active=True,
+    )
+    reward_model.add_reward(event_id, "Gold", 100, "")
+
+    for url in ("/api/events?include=rewards", "/api/events/active?include=rewards"):
+        data = client.get(url).get_json()
+        assert [r["reward_type"] for r in data[0]["rewards"]] == ["Gold"]
+
+    # Без include наград в ответе нет
+    assert "rewards" not in client.get("/api/events").get_json()[0]
+    assert client.get("/api/events?include=bogus").status_code == 400
+
+    bulk = client.get(f"/api/rewards?event_ids={event_id},999999")
+    assert bulk.status_code == 200
+    data = bulk.get_json()
+    assert [r["reward_type"] for r in data[str(event_id)]] == ["Gold"]
+    assert data["999999"] == []
+    assert client.get("/api/rewards?event_ids=abc").status_code == 400
+
+
+def test_api_events_export_streams_all_rows(client, monkeypatch):
+    # Маленькие порции, чтобы проверить склейку нескольких кусков
+    monkeypatch.setattr(api_controller, "EXPORT_CHUNK_ROWS", 2)
+
+    now = datetime.utcnow()
+    ids = {
+        event_model.create_event(
+            title=f"Export {i}",
+            description="",
+            event_type="Daily",
+            starts_at=now,
+            ends_at=now + timedelta(hours=1),
+            is_active=i % 2 == 0,
+        )
+        for i in range(5)
+    }
+
+    resp = client.get("/api/events/export")
+    assert resp.status_code == 200
+    assert resp.is_streamed
+    assert {e["id"] for e in resp.get_json()} == ids
+
+    resp_nd = client.get("/api/events/export?format=ndjson&is_active=true")
+    assert resp_nd.mimetype == "application/x-ndjson"
+    lines = resp_nd.data.decode().splitlines()
+    assert len(lines) == 3
+
+    empty = client.get("/api/events/export?event_type=Nothing")
+    assert empty.get_json() == []
+    assert client.get("/api/events/export?format=xml").status_code == 400
+
+
+def test_index_shows_reward_summary(client):
+    now = datetime.utcnow()
+    event_id = event_model.create_event(
+        title="With rewards",
+        description="",
+        event_type="Daily",
+        starts_at=now,
+        ends_at=now + timedelta(hours=1),
+    )
+    reward_model.add_reward(event_id, "Gold", 100, "")
+    reward_model.add_reward(event_id, "XP", 5, "")
+
+    html = client.get("/").get_data(as_text=True)
+    assert "Gold: 100, XP: 5" in html
+
+
+def test_admin_pages_served_from_fragment_cache(client):
+    now = datetime.utcnow()
+    event_id = event_model.create_event(
+        title="Cached page",
+        description="",
+        event_type="Daily",
+        starts_at=now,
+        ends_at=now + timedelta(hours=1),
+    )
+    list_cache = get_cache("admin_list_fragments")
+    detail_cache = get_cache("admin_detail_fragments")
+
+    first = client.get(f"/events/{event_id}").get_data(as_text=True)
+    hits = detail_cache.hits
+    assert client.get(f"/events/{event_id}").get_data(as_text=True) == first
+    assert detail_cache.hits == hits + 1
+
+    client.get("/")
+    hits = list_cache.hits
+    assert "Cached page" in client.get("/").get_data(as_text=True)
+    assert list_cache.hits == hits + 1
+
+    # Награда через форму: страница ивента и список перерисованы
+    resp = client.post(f"/events/{event_id}/rewards/add", data={"reward_type": "Gem", "amount": "3"}, follow_redirects=True)
+    assert "Награда добавлена." in resp.get_data(as_text=True)
+    assert "Gem" in resp.get_data(as_text=True)
+    assert "Gem: 3" in client.get("/").get_data(as_text=True)
+
+    # Изменение в обход этого процесса (другой воркер): версия данных уже другая
+    event_model.get_event_by_id(event_id)
+    execute("UPDATE events SET title = 'Renamed elsewhere' WHERE id = %s;", (event_id,))
+    assert "Renamed elsewhere" in client.get("/").get_data(as_text=True)
+    # Страница ивента тоже — хотя get_event_by_id ещё в кэше со старым названием
+    assert event_model.get_event_by_id(event_id)["title"] == "Cached page"
+    assert "Renamed elsewhere" in client.get(f"/events/{event_id}").get_data(as_text=True)
+
+    # Уведомление другого воркера сбрасывает фрагменты
+    hits = detail_cache.hits
+    dispatch(json.dumps({"table": "rewards", "op": "insert", "id": 0, "event_id": event_id, "origin": "other-worker"}))
+    client.get(f"/events/{event_id}")
+    assert detail_cache.hits == hits
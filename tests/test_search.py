@@ -0,0 +1,76 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import event as event_model
+
+
+def test_search_ranks_prefixes_and_filters(make_event):
+    in_title = make_event("Зимний фестиваль драконов", description="Снежные битвы")
+    in_description = make_event("Ежедневное задание", description="Победи дракона", event_type="Quest")
+    english = make_event("Dragon Raid", description="Fight the dragons together", event_type="PvP")
+    make_event("Летний марафон", description="Без чудовищ")
+
+    # Название весит больше описания; неполное слово — префикс, стемминг для русского и английского
+    assert [r["id"] for r in event_model.search_events("драк")["items"]] == [in_title, in_description]
+    assert [r["id"] for r in event_model.search_events("снежн")["items"]] == [in_title]
+    assert [r["id"] for r in event_model.search_events("dragons raid")["items"]] == [english]
+    assert [r["id"] for r in event_model.search_events("pvp")["items"]] == [english]
+
+    assert [r["id"] for r in event_model.search_events("дракон", event_type="Quest")["items"]] == [in_description]
+    assert event_model.search_events("дракон", is_active=False)["items"] == []
+
+    # Операторы tsquery из ввода не попадают в запрос
+    assert event_model.search_events("дракон & | ! :*")["items"]
+    with pytest.raises(ValueError):
+        event_model.search_events("!!!")
+
+
+def test_search_pagination_by_rank(make_event):
+    ids = {make_event(f"Турнир {i}", description="турнир " * (i + 1)) for i in range(5)}
+
+    first = event_model.search_events("турнир", limit=3)
+    assert len(first["items"]) == 3
+    ranks = [r["rank"] for r in first["items"]]
+    assert ranks == sorted(ranks, reverse=True)
+
+    second = event_model.search_events("турнир", limit=3, cursor=first["next_cursor"])
+    assert second["next_cursor"] is None
+    assert {r["id"] for r in first["items"] + second["items"]} == ids
+
+
+def test_search_pagination_with_tied_ranks(make_event):
+    # Одинаковый текст — одинаковый rank: порядок решает id
+    ids = [make_event("Логово дракона", description="Дракон спит") for _ in range(12)]
+
+    seen, cursor = [], None
+    for _ in range(len(ids)):
+        page = event_model.search_events("дракон", limit=5, cursor=cursor)
+        seen += [r["id"] for r in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert cursor is None
+    assert seen == sorted(ids, reverse=True)
+
+
+def test_search_api_and_admin_box(client, make_event):
+    event_id = make_event("Осенний турнир", event_type="PvP")
+    make_event("Весенний турнир", datetime.utcnow() + timedelta(hours=48), event_type="Daily")
+
+    resp = client.get("/api/events/search?q=турнир&event_type=PvP")
+    assert resp.status_code == 200
+    data = resp.get_json()
+    assert [e["id"] for e in data] == [event_id]
+    assert data[0]["rank"] > 0
+
+    resp = client.get("/api/events/search?q=турнир&limit=1")
+    assert "X-Next-Cursor" in resp.headers
+    assert 'rel="next"' in resp.headers["Link"]
+
+    assert client.get("/api/events/search").status_code == 400
+    assert client.get("/api/events/search?q=x&cursor=garbage").status_code == 400
+
+    html = client.get("/?q=осенний").get_data(as_text=True)
+    assert "Осенний турнир" in html
+    assert "Весенний турнир" not in html
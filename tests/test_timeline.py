@@ -0,0 +1,148 @@
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+
+from models import event as event_model
+from models import timeline as timeline_module
+from models.database import execute, fetch_all, fresh_reads
+from models.timeline import IntervalTree, Timeline, timeline
+
+
+def test_interval_tree_matches_brute_force():
+    rnd = random.Random(42)
+    intervals = {}
+    for i in range(300):
+        start = rnd.randint(0, 1000)
+        intervals[i] = (start, start + rnd.randint(0, 200))
+    tree = IntervalTree([(s, e, i) for i, (s, e) in intervals.items()])
+
+    # Инкрементальные изменения без перестройки
+    for i in range(300, 400):
+        start = rnd.randint(0, 1200)
+        intervals[i] = (start, start + rnd.randint(0, 50))
+        tree.insert(*intervals[i], i)
+    for i in rnd.sample(sorted(intervals), 120):
+        tree.remove(*intervals.pop(i), i)
+
+    assert tree.size == len(intervals)
+    # Удаление отсутствующего интервала размер не меняет
+    tree.remove(*intervals[min(intervals)], 10_000)
+    assert tree.size == len(intervals)
+    for t in range(-5, 1300, 7):
+        expected = {i for i, (s, e) in intervals.items() if s <= t <= e}
+        assert set(tree.stab(t)) == expected
+
+
+def test_timeline_queries_and_incremental_updates(make_event):
+    now = datetime.utcnow().replace(microsecond=0)
+    running = make_event("Running", now - timedelta(hours=2), now + timedelta(hours=1))
+    soon = make_event("Soon", now + timedelta(hours=1), now + timedelta(hours=3))
+    later = make_event("Later", now + timedelta(hours=5), now + timedelta(hours=6))
+    past = make_event("Past", now - timedelta(hours=5), now - timedelta(hours=4))
+    make_event("Inactive", now - timedelta(hours=1), now + timedelta(hours=1), is_active=False)
+
+    rows, valid_until = timeline.snapshot(now)
+    assert [r["id"] for r in rows] == [running]
+    # Ближайшая граница — старт Soon (одновременно с окончанием Running + 1 мкс)
+    assert valid_until.replace(tzinfo=None) == now + timedelta(hours=1)
+
+    # Тот же ответ, что и у запроса к БД
+    db_rows = fetch_all(event_model.ACTIVE_EVENTS_QUERY, (now, now))
+    assert rows == db_rows
+
+    window = timeline.in_window(now - timedelta(hours=4, minutes=30), now + timedelta(hours=1))
+    assert [r["id"] for r in window] == [past, running, soon]
+    assert [r["id"] for r in timeline.upcoming(now, 10)] == [soon, later]
+    assert [r["id"] for r in timeline.upcoming(now, 1, boundary="end")] == [running]
+
+    # Изменения через модель сразу видны в индексе
+    event_model.update_event(
+        event_id=soon,
+        title="Soon",
+        description="",
+        event_type="Daily",
+        starts_at=now + timedelta(hours=1),
+        ends_at=now + timedelta(hours=3),
+        is_active=False,
+    )
+    event_model.delete_event(later)
+    moved = make_event("Moved", now - timedelta(minutes=10), now + timedelta(minutes=10))
+    assert [r["id"] for r in timeline.active_at(now)] == [moved, running]
+    assert timeline.upcoming(now, 10) == []
+
+
+def test_timeline_reads_database_outside_index_lock(monkeypatch, make_event):
+    index = Timeline()
+    index.load()
+    event_id = make_event("Slow")
+    loading, release = threading.Event(), threading.Event()
+    iter_rows = timeline_module.iter_rows
+
+    def slow_iter_rows(*args):
+        if threading.current_thread() is reader:
+            loading.set()
+            release.wait(3)
+        return iter_rows(*args)
+
+    monkeypatch.setattr(timeline_module, "iter_rows", slow_iter_rows)
+    index.mark_changed(event_id)
+    reader = threading.Thread(target=index.snapshot, args=(datetime.utcnow(),))
+    reader.start()
+    assert loading.wait(3)
+    # Пока читатель ждёт БД, индекс не заблокирован
+    started = time.monotonic()
+    index.mark_changed(event_id)
+    assert time.monotonic() - started < 0.5
+    release.set()
+    reader.join(3)
+    assert [r["id"] for r in index.active_at(datetime.utcnow())] == [event_id]
+
+
+def test_api_upcoming_and_window(client, make_event):
+    now = datetime.utcnow()
+    first = make_event("First", now + timedelta(minutes=30), now + timedelta(hours=2))
+    second = make_event("Second", now + timedelta(hours=1), now + timedelta(hours=2))
+
+    resp = client.get("/api/events/upcoming?limit=1")
+    assert resp.status_code == 200
+    assert [e["id"] for e in resp.get_json()] == [first]
+    max_age = int(resp.headers["Cache-Control"].split("max-age=")[1])
+    assert 0 < max_age <= 30
+
+    again = client.get("/api/events/upcoming?limit=1", headers={"If-None-Match": resp.headers["ETag"]})
+    assert again.status_code == 304
+
+    resp = client.get(
+        "/api/events/window",
+        query_string={"from": (now + timedelta(minutes=45)).isoformat(), "to": (now + timedelta(hours=3)).isoformat()},
+    )
+    assert resp.status_code == 200
+    assert [e["id"] for e in resp.get_json()] == [first, second]
+
+    assert client.get("/api/events/window?from=2030-01-01T00:00:00").status_code == 400
+    assert client.get("/api/events/window?from=2030-01-02T00:00:00&to=2030-01-01T00:00:00").status_code == 400
+    assert client.get("/api/events/upcoming?boundary=middle").status_code == 400
+
+
+def test_api_bodies_for_new_version_are_read_past_index(client, make_event):
+    now = datetime.utcnow()
+    event_id = make_event("Before", now + timedelta(minutes=30), now + timedelta(hours=2))
+    make_event("Other", now - timedelta(hours=1), now + timedelta(hours=3))
+    window = {"from": now.isoformat(), "to": (now + timedelta(hours=1)).isoformat()}
+    assert [e["title"] for e in client.get("/api/events/upcoming").get_json()] == ["Before"]
+    assert [e["title"] for e in client.get("/api/events/window", query_string=window).get_json()] == ["Other", "Before"]
+
+    # Запись другого воркера, уведомление о которой ещё не дошло: индекс старый, версия новая
+    execute("UPDATE events SET title = 'After' WHERE id = %s;", (event_id,))
+    assert [r["title"] for r in timeline.upcoming(now, 10)] == ["Before"]
+    assert [e["title"] for e in client.get("/api/events/upcoming").get_json()] == ["After"]
+    assert [e["title"] for e in client.get("/api/events/window", query_string=window).get_json()] == ["Other", "After"]
+
+    # Запросы мимо индекса отвечают так же, как индекс
+    timeline.mark_changed(event_id)
+    with fresh_reads():
+        for boundary in ("start", "end"):
+            assert event_model.get_upcoming_events(now, 10, boundary) == timeline.upcoming(now, 10, boundary)
+        for start, end in ((now, now + timedelta(hours=1)), (now + timedelta(hours=2), now + timedelta(hours=3))):
+            assert event_model.get_events_in_window(start, end, 10) == timeline.in_window(start, end, 10)